@@ -0,0 +1,66 @@
+# benchmarks/bench_data_layer.py
+#
+# Not collected by the default test run. Run with, for example:
+#   python -m pytest benchmarks/bench_data_layer.py --bench-scale large
+# and add --bench-save to record the timings as the baseline later runs are
+# compared against.
+import pytest
+from benchmarks.synthetic import ANCHOR_DATE
+
+TODAY = ANCHOR_DATE.toordinal()
+WINDOW = 42  # The calendar's default six-week view
+
+def test_get_projects(benchmark, synthetic_db):
+    benchmark(synthetic_db.get_projects)
+
+def test_get_artisans(benchmark, synthetic_db):
+    benchmark(synthetic_db.get_artisans)
+
+def test_get_assignments(benchmark, synthetic_db):
+    benchmark(synthetic_db.get_assignments)
+
+def test_get_project_spans(benchmark, synthetic_db):
+    benchmark(synthetic_db.get_project_spans, "Active")
+
+def test_get_assignment_spans(benchmark, synthetic_db):
+    benchmark(synthetic_db.get_assignment_spans, 1)
+
+def test_get_projects_in_range(benchmark, synthetic_db):
+    assert benchmark(synthetic_db.get_projects_in_range, TODAY, TODAY + WINDOW - 1, "Active")
+
+def test_get_assignments_in_range(benchmark, synthetic_db):
+    assert benchmark(synthetic_db.get_assignments_in_range, TODAY, TODAY + WINDOW - 1)
+
+def test_load_gantt_view(benchmark, synthetic_db):
+    assert benchmark(synthetic_db.load_gantt_view, TODAY, TODAY + WINDOW - 1)
+
+def test_get_recent_activities(benchmark, synthetic_db):
+    benchmark(synthetic_db.get_recent_activities, 10)
+
+def test_get_activities_deep_page(benchmark, synthetic_db):
+    # A page from the middle of the history costs the same as the first
+    middle = synthetic_db.get_activities(limit=500)[-1]
+    assert benchmark(synthetic_db.get_activities, (middle[3], middle[0]), 50)
+
+def test_search(benchmark, synthetic_db):
+    # A short prefix, as typed into the calendar search box
+    assert benchmark(synthetic_db.search, "pr")
+
+def test_search_ids(benchmark, synthetic_db):
+    # The calendar filter's lookup, for a query matching every project
+    assert benchmark(synthetic_db.search_ids, "project")["project"]
+
+def test_export_snapshot(benchmark, synthetic_db, tmp_path):
+    counts = benchmark(synthetic_db.export_snapshot, str(tmp_path / "schedule.snap"))
+    assert counts["projects"] == len(synthetic_db.get_projects())
+
+def test_calendar_data_phase(benchmark, synthetic_db):
+    pytest.importorskip("PyQt6")
+    from ui.tabs.calendar import CalendarTab
+    assert benchmark(CalendarTab.collect_gantt_data, synthetic_db, TODAY, WINDOW)
+
+def test_dashboard_data_phase(benchmark, synthetic_db):
+    pytest.importorskip("PyQt6")
+    from ui.tabs.dashboard import DashboardTab
+    data = benchmark(DashboardTab.collect_dashboard_data, synthetic_db, TODAY)
+    assert data["total_artisans"] == len(synthetic_db.get_artisans())
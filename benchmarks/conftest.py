@@ -0,0 +1,81 @@
+# benchmarks/conftest.py
+import json
+import os
+import statistics
+import time
+import pytest
+from benchmarks.synthetic import SCALES, generate
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption("--bench-scale", choices=SCALES, default="small", help="Synthetic data size to benchmark against")
+    group.addoption("--bench-rounds", type=int, default=5, help="Timed rounds per benchmark, after one warm-up")
+    group.addoption("--bench-baseline", help="Baseline JSON file (default: benchmarks/baseline_<scale>.json)")
+    group.addoption("--bench-save", action="store_true", help="Write this run's timings as the new baseline")
+    group.addoption("--bench-tolerance", type=float, default=0.5,
+                    help="Fail when the fastest round is this fraction slower than the baseline's")
+    group.addoption("--bench-min-delta", type=float, default=1.0,
+                    help="Ignore slowdowns smaller than this many milliseconds, which are mostly timer noise")
+
+def _baseline_path(config):
+    scale = config.getoption("--bench-scale")
+    return config.getoption("--bench-baseline") or os.path.join(BENCHMARK_DIR, f"baseline_{scale}.json")
+
+@pytest.fixture(scope="session")
+def bench_results(request):
+    results = {}
+    yield results
+    if request.config.getoption("--bench-save") and results:
+        with open(_baseline_path(request.config), "w") as f:
+            json.dump({"scale": request.config.getoption("--bench-scale"), "results": results}, f, indent=2, sort_keys=True)
+
+@pytest.fixture(scope="session")
+def baseline(request):
+    path = _baseline_path(request.config)
+    if request.config.getoption("--bench-save") or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)["results"]
+
+@pytest.fixture(scope="session")
+def synthetic_db(request, tmp_path_factory):
+    """A database filled by benchmarks.synthetic at the chosen scale, shared by the whole session."""
+    scale = request.config.getoption("--bench-scale")
+    db = generate(str(tmp_path_factory.mktemp("bench") / "gantt.db"), **SCALES[scale])
+    yield db
+    db.close()
+
+@pytest.fixture
+def benchmark(request, bench_results, baseline):
+    """Time fn(*args) over --bench-rounds rounds and return its result.
+
+    Timings are recorded under the test's name. When a baseline exists, the
+    fastest round (the least noisy figure) is compared with the baseline's
+    and a slowdown beyond --bench-tolerance and --bench-min-delta fails the test.
+    """
+    rounds = request.config.getoption("--bench-rounds")
+    tolerance = request.config.getoption("--bench-tolerance")
+    min_delta = request.config.getoption("--bench-min-delta") / 1000
+
+    def run(fn, *args):
+        result = fn(*args)  # warm-up, also primes the page cache
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            fn(*args)
+            timings.append(time.perf_counter() - started)
+        stats = {"min": min(timings), "median": statistics.median(timings),
+                 "mean": statistics.fmean(timings), "rounds": rounds}
+        bench_results[request.node.name] = stats
+        previous = baseline.get(request.node.name)
+        if previous:
+            limit = max(previous["min"] * (1 + tolerance), previous["min"] + min_delta)
+            assert stats["min"] <= limit, (
+                f"{request.node.name} regressed: {stats['min'] * 1000:.2f} ms "
+                f"vs baseline {previous['min'] * 1000:.2f} ms"
+            )
+        return result
+
+    return run
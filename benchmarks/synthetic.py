@@ -0,0 +1,133 @@
+# benchmarks/synthetic.py
+import argparse
+import random
+from datetime import date, timedelta
+from db.conflicts import ArtisanLoad
+from db.database import Database
+from db.dates import from_day
+import config
+
+# Named sizes for generate(); "large" is the target the hot paths are tuned for
+SCALES = {
+    "small": {"projects": 1000, "artisans": 100, "teams": 20, "assignments": 20000},
+    "medium": {"projects": 5000, "artisans": 500, "teams": 100, "assignments": 100000},
+    "large": {"projects": 10000, "artisans": 1000, "teams": 200, "assignments": 200000},
+}
+
+# Day every generated schedule is centred on, so runs are comparable
+ANCHOR_DATE = date(2025, 6, 1)
+
+STATUSES = (("Active", 60), ("Completed", 25), ("On Hold", 10), ("Delayed", 5))
+SKILLS = ("Carpenter", "Electrician", "Plumber", "Painter", "Mason", "Roofer", "Welder", "Tiler")
+AVAILABILITY = (("Available", 70), ("Busy", 20), ("On Leave", 10))
+HOURS_PER_DAY = ((8, 50), (4, 30), (2, 20))
+
+# Artisans tried for an assignment before it is dropped for breaking the daily hours cap
+ARTISAN_ATTEMPTS = 20
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+def generate(db_path, projects=1000, artisans=100, teams=20, assignments=20000,
+             activities=1000, seed=0, anchor=ANCHOR_DATE):
+    """Fill db_path with a reproducible schedule and return the Database.
+
+    Projects start across the two years around anchor and mostly run a few
+    weeks, with a long tail of multi-month jobs. Assignments fall inside
+    their project's span and are spread unevenly across artisans, so some
+    artisans are much busier than others. Assignments are booked against
+    config.DEFAULT_HOURS_CAP as add_assignment() would: one that would
+    break it goes to another artisan, or is dropped after
+    ARTISAN_ATTEMPTS tries, so a few percent fewer than assignments may be
+    made. The same arguments always produce the same rows.
+    """
+    rng = random.Random(seed)
+    db = Database(db_path=db_path)
+    anchor_day = anchor.toordinal()
+
+    team_rows = [(f"Team {i + 1}",) for i in range(teams)]
+    artisan_rows = []
+    for i in range(artisans):
+        # About one artisan in ten is not on a team
+        team_id = rng.randint(1, teams) if teams and rng.random() > 0.1 else None
+        artisan_rows.append((f"Artisan {i + 1}", rng.choice(SKILLS), _weighted(rng, AVAILABILITY), None, team_id))
+
+    project_rows = []
+    spans = []
+    for i in range(projects):
+        start_day = anchor_day + rng.randint(-365, 365)
+        length = min(int(rng.lognormvariate(2.7, 0.8)), 180)  # median around two weeks
+        end_day = start_day + length
+        spans.append((start_day, end_day))
+        project_rows.append((f"Project {i + 1}", from_day(start_day), from_day(end_day), _weighted(rng, STATUSES),
+                             f"J{i + 1:06d}", f"Synthetic project {i + 1}", start_day, end_day))
+
+    assignment_rows = []
+    artisan_weights = [rng.paretovariate(1.5) for _ in range(artisans)]
+    artisan_ids = rng.choices(range(1, artisans + 1), artisan_weights, k=assignments) if artisans and projects else []
+    loads = [ArtisanLoad() for _ in range(artisans + 1)]
+    for artisan_id in artisan_ids:
+        project_id = rng.randint(1, projects)
+        project_start, project_end = spans[project_id - 1]
+        start_day = rng.randint(project_start, project_end)
+        end_day = rng.randint(start_day, project_end)
+        hours_per_day = min(_weighted(rng, HOURS_PER_DAY), config.DEFAULT_HOURS_CAP)
+        for _ in range(ARTISAN_ATTEMPTS):
+            if loads[artisan_id].peak(start_day, end_day)[2] + hours_per_day <= config.DEFAULT_HOURS_CAP:
+                break
+            artisan_id = rng.randint(1, artisans)
+        else:
+            continue
+        loads[artisan_id].add(start_day, end_day, 1, hours_per_day)
+        assignment_rows.append((artisan_id, project_id, from_day(start_day), from_day(end_day), start_day, end_day,
+                                hours_per_day))
+
+    activity_rows = []
+    for i in range(activities):
+        stamp = anchor + timedelta(seconds=rng.randint(-365 * 86400, 0))
+        activity_rows.append(("Project Updated", f"Project 'Project {rng.randint(1, max(projects, 1))}' updated",
+                              stamp.strftime("%Y-%m-%d %H:%M:%S")))
+
+    with db.transaction():
+        db.conn.executemany("INSERT INTO teams (name) VALUES (?)", team_rows)
+        db.conn.executemany(
+            "INSERT INTO artisans (name, skill, availability, profile_picture, team_id) VALUES (?, ?, ?, ?, ?)",
+            artisan_rows
+        )
+        db.conn.executemany(
+            "INSERT INTO projects (name, start_date, end_date, status, job_number, description, start_day, end_day) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            project_rows
+        )
+        db.conn.executemany(
+            "INSERT INTO assignments (artisan_id, project_id, start_date, end_date, start_day, end_day, hours_per_day) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            assignment_rows
+        )
+        db.conn.executemany("INSERT INTO activity_log (action, details, timestamp) VALUES (?, ?, ?)", activity_rows)
+        db.rebuild_artisan_day_load()
+    # Settle now what the background archiver would otherwise move mid-benchmark
+    if config.ACTIVITY_RETENTION_DAYS is not None:
+        while db.archive_activities() == config.ACTIVITY_ARCHIVE_BATCH_SIZE:
+            pass
+    return db
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a scratch database with a synthetic schedule.")
+    parser.add_argument("db_path")
+    parser.add_argument("--scale", choices=SCALES, default="small", help="Preset sizes; the options below override them")
+    for name in ("projects", "artisans", "teams", "assignments"):
+        parser.add_argument(f"--{name}", type=int)
+    parser.add_argument("--activities", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sizes = dict(SCALES[args.scale])
+    sizes.update({name: getattr(args, name) for name in sizes if getattr(args, name) is not None})
+    db = generate(args.db_path, activities=args.activities, seed=args.seed, **sizes)
+    db.close()
+    print(f"Generated {', '.join(f'{count} {name}' for name, count in sizes.items())} in {args.db_path}")
+
+if __name__ == "__main__":
+    main()
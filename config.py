@@ -5,7 +5,46 @@ DATABASE_PATH = "gantt.db"  # Path to the SQLite database file
 
 # Application settings
 AUTOSAVE_INTERVAL = 300000  # Autosave interval in milliseconds (5 minutes)
+BUFFER_EDITS = False        # Hold calendar drag edits and write them together every AUTOSAVE_INTERVAL
+EDIT_JOURNAL_PATH = None    # Journal of edits not yet written; None means "<database>_edits.jsonl" beside the database
 DEFAULT_HOURS_CAP = 12      # Maximum hours per day for assignments
+DEFAULT_HOURS_PER_DAY = 8   # Hours an assignment books per day unless given
 THEME = "light"             # UI theme: "light" or "dark"
+GANTT_ENGINE = "matplotlib"  # Calendar renderer: "matplotlib", or "scene" for the native Qt view (large schedules)
 SESSION_TIMEOUT = 1800      # Session timeout in seconds (30 minutes)
 BACKUP_INTERVAL = 86400000  # Backup interval in milliseconds (24 hours)
+BCRYPT_ROUNDS = 12          # bcrypt cost factor for stored passwords; each step doubles the time to check one
+
+# Activity log settings
+ACTIVITY_LOG_BATCH_SIZE = 100      # Queued entries that trigger an immediate write
+ACTIVITY_LOG_FLUSH_INTERVAL = 500  # Maximum delay before queued entries are written, in milliseconds
+ACTIVITY_RETENTION_DAYS = 90       # Entries older than this move to the archive database; None keeps them all in place
+ACTIVITY_ARCHIVE_PATH = None       # Archive database file; None means "<database>_archive.db" beside the main file
+ACTIVITY_ARCHIVE_BATCH_SIZE = 1000  # Entries moved per archive transaction
+ACTIVITY_ARCHIVE_INTERVAL = 3600000  # How often old entries are archived, in milliseconds (1 hour)
+
+# Backup settings (the interval is BACKUP_INTERVAL above)
+BACKUP_DIR = None             # Folder for backups; None means a "backups" folder beside the database
+BACKUP_KEEP = 7               # Newest verified backups kept; older ones are deleted
+BACKUP_PAGES_PER_STEP = 256   # Database pages copied per backup step
+BACKUP_STEP_PAUSE = 5         # Pause between steps, in milliseconds, leaving the writer free for edits
+
+# Bulk import settings
+IMPORT_CHUNK_SIZE = 5000  # Rows validated and committed per transaction
+
+# Snapshot settings
+SNAPSHOT_CHUNK_SIZE = 65536  # Rows per compressed block in export_snapshot() files
+
+# Avatar settings
+AVATAR_CACHE_DIR = None   # Folder for artisan avatar thumbnails; None means an "avatars" folder beside the database
+AVATAR_SIZE = 32          # Thumbnail width and height in pixels
+AVATAR_CACHE_SIZE = 256   # Thumbnails kept in memory; the least recently used are dropped first
+
+# Search settings
+SEARCH_LIMIT = 200        # Most matches Database.search() returns
+SEARCH_DELAY = 250        # Typing pause before the calendar search box filters, in milliseconds
+
+# Query instrumentation settings
+QUERY_STATS = False       # Record per-statement counts, latencies and rows (see Database.stats()); times every fetched row, so off unless profiling
+SLOW_QUERY_MS = 100       # With QUERY_STATS on, log queries slower than this with their parameters and caller; None to disable
+QUERY_STATS_DUMP = None   # File to write Database.stats() to as JSON on exit, or None
@@ -0,0 +1,146 @@
+# db/activity_log.py
+import json
+import threading
+from collections import deque
+import config
+
+# Tables holding the names that activity details refer to by id
+REFERENCE_TABLES = {"artisan": "artisans", "project": "projects", "team": "teams"}
+
+class ActivityLogWriter:
+    """Writes activity_log entries in batches from a background thread.
+
+    Entries are queued by submit() and written with one executemany per
+    batch, either when batch_size entries are waiting or every
+    flush_interval milliseconds. Details may be templates such as
+    "Artisan '{artisan}' ..." whose names are looked up by id at flush
+    time, one query per table per batch, instead of on the caller's thread.
+    """
+
+    def __init__(self, db, batch_size=config.ACTIVITY_LOG_BATCH_SIZE,
+                 flush_interval=config.ACTIVITY_LOG_FLUSH_INTERVAL):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval / 1000
+        self._pending = deque()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, entries):
+        """Queue (action, details, timestamp, refs) entries for writing."""
+        self._pending.extend(entries)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write everything queued so far before returning."""
+        # The writer lock doubles as the drain lock, so a batch taken by the
+        # background thread is committed before a caller's flush returns
+        with self.db.pool.write_lock:
+            if self.db._transaction_depth:
+                # Never fold committed entries into a caller's open transaction,
+                # which could still roll back; the next flush picks them up
+                return
+            batch = []
+            while self._pending:
+                batch.append(self._pending.popleft())
+            if not batch:
+                return
+            try:
+                with self.db.transaction():
+                    rows = self._resolve(batch)
+                    self.db.conn.executemany(
+                        "INSERT INTO activity_log (action, details, timestamp) VALUES (?, ?, ?)", rows
+                    )
+            except Exception:
+                # Put the batch back so a later flush can retry it
+                self._pending.extendleft(reversed(batch))
+                raise
+
+    def close(self):
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error writing activity log: {e}")
+
+    def _resolve(self, batch):
+        refs = [entry[3] for entry in batch if entry[3]]
+        # Assignment references stand in for their artisan and project
+        assignment_ids = {r["assignment_id"] for r in refs if "assignment_id" in r}
+        assignments = self._lookup(
+            "SELECT id, artisan_id, project_id FROM assignments WHERE id IN (SELECT value FROM json_each(?))",
+            assignment_ids, lambda row: (row[1], row[2])
+        )
+        for r in refs:
+            if "assignment_id" in r and r["assignment_id"] in assignments:
+                r.setdefault("artisan_id", assignments[r["assignment_id"]][0])
+                r.setdefault("project_id", assignments[r["assignment_id"]][1])
+        names = {}
+        for key, table in REFERENCE_TABLES.items():
+            ids = {r[f"{key}_id"] for r in refs if f"{key}_id" in r}
+            names[key] = self._lookup(
+                f"SELECT id, name FROM {table} WHERE id IN (SELECT value FROM json_each(?))",
+                ids, lambda row: row[1]
+            )
+        rows = []
+        for action, details, timestamp, entry_refs in batch:
+            if entry_refs:
+                values = dict(entry_refs)
+                for key in REFERENCE_TABLES:
+                    if f"{key}_id" in entry_refs:
+                        ref_id = entry_refs[f"{key}_id"]
+                        values[key] = names[key].get(ref_id, f"#{ref_id}")
+                    # e.g. an assignment deleted before its entry was written
+                    values.setdefault(key, "unknown")
+                details = details.format(**values)
+            rows.append((action, details, timestamp))
+        return rows
+
+    def _lookup(self, sql, ids, value):
+        if not ids:
+            return {}
+        return {row[0]: value(row) for row in self.db.conn.execute(sql, (json.dumps(sorted(ids)),))}
+
+class ActivityArchiver:
+    """Moves activity_log entries past the retention period into the archive database.
+
+    Runs on a background thread: once at startup and then every interval
+    milliseconds, it calls Database.archive_activities() until a batch
+    comes back short. Each batch is its own short transaction, so writes
+    from the UI interleave with a long backlog instead of waiting for it.
+    """
+
+    def __init__(self, db, retention_days=config.ACTIVITY_RETENTION_DAYS,
+                 batch_size=config.ACTIVITY_ARCHIVE_BATCH_SIZE, interval=config.ACTIVITY_ARCHIVE_INTERVAL):
+        self.db = db
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.interval = interval / 1000
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="activity-archiver", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stopping.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                while not self._stopping.is_set():
+                    if self.db.archive_activities(self.retention_days, self.batch_size) < self.batch_size:
+                        break
+            except Exception as e:
+                print(f"Error archiving activity log: {e}")
+            self._stopping.wait(self.interval)
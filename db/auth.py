@@ -0,0 +1,28 @@
+# db/auth.py
+import hmac
+import bcrypt
+import config
+
+# Stored passwords starting with one of these are bcrypt hashes; anything
+# else is a plaintext password from before passwords were hashed
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+def hash_password(password, rounds=None):
+    """Return the bcrypt hash to store for password, at config.BCRYPT_ROUNDS unless rounds is given."""
+    salt = bcrypt.gensalt(rounds or config.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("ascii")
+
+def is_hashed(stored):
+    return stored.startswith(BCRYPT_PREFIXES)
+
+def verify_password(password, stored):
+    """Check password against a stored hash, or against a legacy plaintext password."""
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    return bcrypt.checkpw(password.encode("utf-8"), stored.encode("ascii"))
+
+def needs_rehash(stored, rounds=None):
+    """True for plaintext passwords and for hashes made at a different cost factor."""
+    if not is_hashed(stored):
+        return True
+    return int(stored.split("$")[2]) != (rounds or config.BCRYPT_ROUNDS)
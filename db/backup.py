@@ -0,0 +1,114 @@
+# db/backup.py
+import glob
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+import config
+
+# Backups are named <database name>-<timestamp>.db, which sorts oldest first
+TIMESTAMP_FORMAT = "%Y%m%d-%H%M%S"
+
+class BackupScheduler:
+    """Backs the database up every interval milliseconds on a background thread.
+
+    Each backup is written with Database.backup() to a temporary file,
+    checked with PRAGMA integrity_check, and only then renamed into place;
+    the newest keep backups are kept. The first backup is due interval
+    after the newest existing one, or straight away if there is none.
+    status() reports the outcome of the latest attempt.
+    """
+
+    def __init__(self, db, directory=None, interval=config.BACKUP_INTERVAL, keep=config.BACKUP_KEEP):
+        self.db = db
+        self.directory = directory or config.BACKUP_DIR or os.path.join(
+            os.path.dirname(os.path.abspath(db.db_path)), "backups")
+        self.prefix = os.path.splitext(os.path.basename(db.db_path))[0]
+        self.interval = interval / 1000
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._status = {"running": False, "progress": None, "last_backup": None,
+                        "last_backup_time": None, "last_error": None}
+        self._stopping = threading.Event()
+        self._thread = None
+        backups = self.backups()
+        if backups:
+            self._status["last_backup"] = backups[-1]
+            self._status["last_backup_time"] = datetime.fromtimestamp(os.path.getmtime(backups[-1]))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+
+    def status(self):
+        """Return a dict of running, progress (fraction done or None), last_backup (path),
+        last_backup_time (datetime of the last good backup) and last_error (message or None)."""
+        with self._lock:
+            return dict(self._status)
+
+    def backups(self):
+        """Return the paths of the existing backups, oldest first."""
+        return sorted(glob.glob(os.path.join(glob.escape(self.directory), f"{glob.escape(self.prefix)}-*.db")))
+
+    def backup_now(self):
+        """Take, verify and rotate in one backup; return its path. Errors are raised and kept in status()."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{self.prefix}-{datetime.now().strftime(TIMESTAMP_FORMAT)}.db")
+        temporary = f"{path}.tmp"
+        self._update(running=True, progress=0.0)
+        try:
+            self.db.backup(temporary, progress=self._progress)
+            self._verify(temporary)
+            os.replace(temporary, path)
+        except Exception as e:
+            self._remove(temporary)
+            self._update(running=False, progress=None, last_error=str(e))
+            raise
+        self._update(running=False, progress=None, last_backup=path,
+                     last_backup_time=datetime.now(), last_error=None)
+        for old in self.backups()[:-self.keep]:
+            self._remove(old)
+        return path
+
+    def _run(self):
+        last = self.status()["last_backup_time"]
+        delay = max(0.0, last.timestamp() + self.interval - time.time()) if last else 0.0
+        while not self._stopping.wait(delay):
+            try:
+                self.backup_now()
+            except Exception as e:
+                print(f"Error backing up database: {e}")
+            delay = self.interval
+
+    def _progress(self, remaining, total):
+        if self._stopping.is_set():
+            # Raising from the progress callback abandons the copy
+            raise RuntimeError("Backup cancelled")
+        self._update(progress=(total - remaining) / total if total else 1.0)
+
+    def _update(self, **values):
+        with self._lock:
+            self._status.update(values)
+
+    @staticmethod
+    def _verify(path):
+        conn = sqlite3.connect(path)
+        try:
+            result = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        finally:
+            conn.close()
+        if result != ["ok"]:
+            raise sqlite3.DatabaseError(f"Backup failed its integrity check: {'; '.join(result[:5])}")
+
+    @staticmethod
+    def _remove(path):
+        # A backup opened in WAL mode can leave -wal/-shm files beside it
+        for name in (path, f"{path}-wal", f"{path}-shm"):
+            if os.path.exists(name):
+                os.remove(name)
@@ -0,0 +1,145 @@
+# db/conflicts.py
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from db.dates import from_day
+import config
+
+# A booking that would push an artisan past the daily hours cap: on day the
+# artisan would work hours, with overlapping other assignments already there
+Conflict = namedtuple("Conflict", "artisan_id day hours overlapping cap")
+
+class ConflictError(ValueError):
+    """Raised by a write that would book an artisan beyond the daily hours cap."""
+
+    def __init__(self, conflict, artisan_name=None):
+        self.conflict = conflict
+        who = artisan_name or f"Artisan #{conflict.artisan_id}"
+        super().__init__(
+            f"{who} would be booked for {conflict.hours:g} hours on {from_day(conflict.day)} "
+            f"({conflict.overlapping} other assignment(s) that day); the daily cap is {conflict.cap:g} hours"
+        )
+
+class ArtisanLoad:
+    """One artisan's booked assignments and hours per day, as a step function.
+
+    days holds sorted breakpoints; counts[i] and hours[i] apply from days[i]
+    up to the next breakpoint (and nothing is booked before days[0]).
+    Finding a day is a binary search, and adding or checking a span only
+    touches the steps inside it, of which there are few while the artisan
+    stays within the cap. Adjacent equal steps are merged, so the lists
+    stay proportional to the artisan's assignments, not to the days covered.
+    """
+
+    def __init__(self):
+        self.days = []
+        self.counts = []
+        self.hours = []
+        self.bookings = {}  # assignment_id -> (start_day, end_day, hours_per_day)
+
+    def add(self, start_day, end_day, count, hours):
+        i = self._split(start_day)
+        j = self._split(end_day + 1)
+        for k in range(i, j):
+            self.counts[k] += count
+            self.hours[k] += hours
+        self._merge(j)
+        self._merge(i)
+
+    def peak(self, start_day, end_day):
+        """Return (day, assignment count, hours) for the busiest day in the inclusive span."""
+        best = (start_day, 0, 0)
+        k = bisect_right(self.days, start_day) - 1
+        if k < 0:
+            k = 0
+        while k < len(self.days) and self.days[k] <= end_day:
+            if self.hours[k] > best[2]:
+                best = (max(self.days[k], start_day), self.counts[k], self.hours[k])
+            k += 1
+        return best
+
+    def _split(self, day):
+        # Make day a breakpoint, carrying over the value of the step it falls in
+        i = bisect_left(self.days, day)
+        if i < len(self.days) and self.days[i] == day:
+            return i
+        count, hours = (self.counts[i - 1], self.hours[i - 1]) if i else (0, 0)
+        self.days.insert(i, day)
+        self.counts.insert(i, count)
+        self.hours.insert(i, hours)
+        return i
+
+    def _merge(self, i):
+        # Drop breakpoint i when it no longer changes the value
+        if 0 <= i < len(self.days):
+            previous = (self.counts[i - 1], self.hours[i - 1]) if i else (0, 0)
+            if previous == (self.counts[i], self.hours[i]):
+                del self.days[i], self.counts[i], self.hours[i]
+
+class ConflictEngine:
+    """Checks bookings against config.DEFAULT_HOURS_CAP using in-memory per-artisan load.
+
+    An artisan's ArtisanLoad is built from the database the first time it
+    is needed and then kept in step by book()/unbook(). Artisans touched by
+    a transaction that rolls back are dropped and rebuilt on next use.
+    """
+
+    def __init__(self, db, cap=config.DEFAULT_HOURS_CAP):
+        self.db = db
+        self.cap = cap
+        self._loads = {}
+        self.journal = []  # Artisans changed in the open transaction
+
+    def check(self, artisan_id, start_day, end_day, hours_per_day=None, assignment_id=None):
+        """Return a Conflict if booking the span would exceed the cap on any day, else None.
+
+        When assignment_id is given, that assignment's current booking is
+        left out (it is the one being moved) and its hours are used by
+        default.
+        """
+        load = self._load(artisan_id)
+        current = load.bookings.get(assignment_id)
+        if hours_per_day is None:
+            hours_per_day = current[2] if current else config.DEFAULT_HOURS_PER_DAY
+        if current:
+            load.add(current[0], current[1], -1, -current[2])
+        try:
+            day, count, hours = load.peak(start_day, end_day)
+        finally:
+            if current:
+                load.add(current[0], current[1], 1, current[2])
+        if hours + hours_per_day > self.cap:
+            return Conflict(artisan_id, day, hours + hours_per_day, count, self.cap)
+        return None
+
+    def book(self, artisan_id, assignment_id, start_day, end_day, hours_per_day):
+        load = self._load(artisan_id)
+        self.journal.append(artisan_id)
+        if assignment_id is not None:
+            load.bookings[assignment_id] = (start_day, end_day, hours_per_day)
+        load.add(start_day, end_day, 1, hours_per_day)
+
+    def unbook(self, artisan_id, assignment_id):
+        load = self._loads.get(artisan_id)
+        self.journal.append(artisan_id)
+        if load is None:
+            return
+        booking = load.bookings.pop(assignment_id, None)
+        if booking:
+            load.add(booking[0], booking[1], -1, -booking[2])
+
+    def invalidate(self, artisan_ids):
+        for artisan_id in artisan_ids:
+            self._loads.pop(artisan_id, None)
+
+    def clear(self):
+        """Forget every loaded artisan, e.g. after their assignments were replaced wholesale."""
+        self._loads.clear()
+
+    def _load(self, artisan_id):
+        load = self._loads.get(artisan_id)
+        if load is None:
+            load = self._loads[artisan_id] = ArtisanLoad()
+            for assignment_id, start_day, end_day, hours in self.db.get_artisan_bookings(artisan_id):
+                load.bookings[assignment_id] = (start_day, end_day, hours)
+                load.add(start_day, end_day, 1, hours)
+        return load
@@ -0,0 +1,89 @@
+# db/connection.py
+import sqlite3
+import threading
+
+# Applied to every connection the pool opens. WAL lets readers run alongside
+# the writer; NORMAL sync is durable across application crashes in WAL mode.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -20000",    # ~20 MB page cache per connection
+    "PRAGMA mmap_size = 268435456",  # 256 MB memory-mapped reads
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+)
+
+class ConnectionPool:
+    """One serialized writer connection plus one read connection per thread.
+
+    Writes must hold ``write_lock`` for the whole transaction. Reads go
+    through ``reader()``, which hands each thread its own connection so a
+    long report on a worker thread never waits for (or blocks) the UI
+    thread's writes. A short-lived thread should call ``release_reader()``
+    when it is done; failing that, its reader is closed once the thread
+    has ended and another thread opens one.
+    """
+
+    def __init__(self, db_path, factory=sqlite3.Connection):
+        self.db_path = db_path
+        self.factory = factory
+        self.write_lock = threading.RLock()
+        self._local = threading.local()
+        self._readers = {}  # Thread -> its read connection
+        self._readers_lock = threading.Lock()
+        self._attached = {}  # Schema name -> database file, attached on every connection
+        self.writer = self._connect()
+
+    def _connect(self, read_only=False):
+        # Connections are shared with close() and worker threads, so thread
+        # affinity is enforced by the pool rather than by sqlite3.
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False, factory=self.factory)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        for name, path in self._attached.items():
+            conn.execute(f"ATTACH DATABASE ? AS {name}", (path,))
+        return conn
+
+    def attach(self, name, path):
+        """Attach another database file as schema name on the writer and every reader, current and future."""
+        with self.write_lock, self._readers_lock:
+            self._attached[name] = path
+            for conn in [self.writer, *self._readers.values()]:
+                conn.execute(f"ATTACH DATABASE ? AS {name}", (path,))
+            self.writer.execute(f"PRAGMA {name}.journal_mode = WAL")
+
+    def reader(self):
+        """Return the calling thread's read connection, opening it on first use."""
+        if self.db_path == ":memory:":
+            # Every connection to :memory: is a separate database
+            return self.writer
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect(read_only=True)
+            self._local.conn = conn
+            with self._readers_lock:
+                for thread in [t for t in self._readers if not t.is_alive()]:
+                    self._readers.pop(thread).close()
+                self._readers[threading.current_thread()] = conn
+        return conn
+
+    def release_reader(self):
+        """Close the calling thread's read connection, if it has one; the next reader() opens a new one."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._readers_lock:
+            self._readers.pop(threading.current_thread(), None)
+        conn.close()
+
+    def close(self):
+        with self._readers_lock:
+            for conn in self._readers.values():
+                conn.close()
+            self._readers.clear()
+        self._local = threading.local()
+        with self.write_lock:
+            self.writer.close()
@@ -1,15 +1,134 @@
 # db/database.py
+import atexit
+import json
+import os
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from db.activity_log import ActivityArchiver, ActivityLogWriter
+from db.auth import hash_password, is_hashed, needs_rehash, verify_password
+from db.conflicts import ConflictEngine, ConflictError
+from db.connection import ConnectionPool
+from db.dates import JULIAN_DAY_OFFSET, to_day
+from db.importer import BulkImporter
+from db.instrumentation import QueryStats, instrumented_factory
+from db.snapshot import export_snapshot, import_snapshot
+import config
+
+# Bumped whenever _migrate() gains a step; stored in PRAGMA user_version
+SCHEMA_VERSION = 4
+
+# Rows indexed for search: table -> (kind number, title column, body columns).
+# A row's search_index rowid is id * 4 + kind number, so the triggers can
+# find it again and search() can tell what a hit refers to.
+SEARCH_SOURCES = {
+    "projects": (1, "name", ("job_number", "description")),
+    "artisans": (2, "name", ("skill",)),
+    "teams": (3, "name", ()),
+}
+SEARCH_KINDS = {1: "project", 2: "artisan", 3: "team"}
 
 class Database:
     def __init__(self, db_path="gantt.db"):
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
+        # With config.QUERY_STATS on, every statement on every pooled connection is measured; see stats()
+        self.query_stats = QueryStats(config.SLOW_QUERY_MS) if config.QUERY_STATS else None
+        factory = instrumented_factory(self.query_stats) if self.query_stats else sqlite3.Connection
+        # WAL-mode pool: self.conn is the single writer, reads use per-thread
+        # connections. Autocommit mode; transactions are opened by transaction().
+        self.pool = ConnectionPool(self.db_path, factory)
+        self.conn = self.pool.writer
         self.cursor = self.conn.cursor()
+        # Activity past the retention period lives in an attached archive file
+        self.archive_path = self._archive_path()
+        if self.archive_path:
+            self.pool.attach("archive", self.archive_path)
+        self._transaction_depth = 0
+        self._transaction_thread = None
+        self._pending_activity = []  # Activity entries held until the transaction commits
+        self.has_fts = True  # Cleared by create_tables() when SQLite lacks FTS5; search() then uses LIKE
+        # Daily hours cap check for assignment writes; loads artisans lazily
+        self.conflicts = ConflictEngine(self)
         self.create_tables()
+        self.activity_writer = ActivityLogWriter(self)
+        self.activity_archiver = None
+        if self.archive_path and config.ACTIVITY_RETENTION_DAYS is not None:
+            self.activity_archiver = ActivityArchiver(self)
+        if self.query_stats and config.QUERY_STATS_DUMP:
+            atexit.register(self.dump_stats, config.QUERY_STATS_DUMP)
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed writes as one atomic commit.
+
+        Nested calls become savepoints, so a method that opens its own
+        transaction can be composed into a larger unit of work. Any exception
+        rolls back the innermost level and is re-raised. The writer lock is
+        held throughout, so transactions from different threads serialize.
+        """
+        with self.pool.write_lock:
+            if self._transaction_depth == 0:
+                self.conn.execute("BEGIN IMMEDIATE")
+                self._transaction_thread = threading.get_ident()
+            else:
+                self.conn.execute(f"SAVEPOINT sp_{self._transaction_depth}")
+            self._transaction_depth += 1
+            activity_marker = len(self._pending_activity)
+            conflicts_marker = len(self.conflicts.journal)
+            try:
+                yield self
+            except BaseException:
+                # Activity logged by the rolled-back work is discarded with it,
+                # and the artisans it booked are reloaded on next use
+                del self._pending_activity[activity_marker:]
+                self.conflicts.invalidate(set(self.conflicts.journal[conflicts_marker:]))
+                del self.conflicts.journal[conflicts_marker:]
+                self._transaction_depth -= 1
+                if self._transaction_depth == 0:
+                    self._transaction_thread = None
+                    self.conn.execute("ROLLBACK")
+                else:
+                    self.conn.execute(f"ROLLBACK TO sp_{self._transaction_depth}")
+                    self.conn.execute(f"RELEASE sp_{self._transaction_depth}")
+                raise
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self._transaction_thread = None
+                activity, self._pending_activity = self._pending_activity, []
+                self.conflicts.journal.clear()
+                self.conn.execute("COMMIT")
+                if activity:
+                    self.activity_writer.submit(activity)
+            else:
+                self.conn.execute(f"RELEASE sp_{self._transaction_depth}")
+
+    def _archive_path(self):
+        if self.db_path == ":memory:":
+            return None
+        return config.ACTIVITY_ARCHIVE_PATH or f"{os.path.splitext(self.db_path)[0]}_archive.db"
+
+    def _reader(self):
+        # Inside a transaction, read through the writer to see its own changes
+        if self._transaction_thread == threading.get_ident():
+            return self.conn
+        return self.pool.reader()
+
+    def release_reader(self):
+        """Close the calling thread's read connection; worker threads call this before they finish."""
+        self.pool.release_reader()
 
     def create_tables(self):
+        with self.transaction():
+            self._create_tables()
+            self._migrate()
+            self._create_indexes()
+
+        # Ensure the default user exists
+        self.ensure_default_user()
+
+    def _create_tables(self):
         # Users table
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -76,10 +195,132 @@ class Database:
             )
         ''')
 
-        self.conn.commit()
+        # Archived activity: same columns, ids carried over from activity_log
+        if self.archive_path:
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS archive.activity_log (
+                    id INTEGER PRIMARY KEY,
+                    action TEXT NOT NULL,
+                    details TEXT NOT NULL,
+                    timestamp TEXT NOT NULL
+                )
+            ''')
 
-        # Ensure the default user exists
-        self.ensure_default_user()
+        # Artisan day load: per artisan and day, the number of assignments
+        # and hours booked. Derived from assignments and kept in step by
+        # every assignment write (see _apply_day_load)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS artisan_day_load (
+                artisan_id INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                assignment_count INTEGER NOT NULL,
+                hours REAL NOT NULL,
+                PRIMARY KEY (artisan_id, day)
+            ) WITHOUT ROWID
+        ''')
+
+        # Import checkpoints: how far an interrupted bulk import got
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS import_checkpoints (
+                source TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                line INTEGER NOT NULL,
+                imported INTEGER NOT NULL,
+                skipped INTEGER NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (source, kind)
+            )
+        ''')
+
+        self._create_search_index()
+
+    def _create_search_index(self):
+        # Full-text index over project, artisan and team names (plus job
+        # numbers, descriptions and skills), kept in step by triggers so
+        # every write path, bulk imports included, updates it
+        try:
+            self.cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+                    title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+                )
+            ''')
+        except sqlite3.OperationalError:
+            # This SQLite was built without FTS5
+            self.has_fts = False
+            return
+        for table, (kind, title, body) in SEARCH_SOURCES.items():
+            columns = ", ".join((title, *body))
+            insert = (f"INSERT INTO search_index (rowid, title, body) "
+                      f"VALUES (new.id * 4 + {kind}, new.{title}, {self._search_body(body, 'new')});")
+            delete = f"DELETE FROM search_index WHERE rowid = old.id * 4 + {kind};"
+            self.cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} BEGIN {insert} END")
+            self.cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} BEGIN {delete} END")
+            self.cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF {columns} ON {table} "
+                                f"BEGIN {delete} {insert} END")
+
+    @staticmethod
+    def _search_body(columns, alias):
+        return " || ' ' || ".join(f"coalesce({alias}.{column}, '')" for column in columns) or "''"
+
+    def rebuild_search_index(self):
+        """Re-fill search_index from the projects, artisans and teams tables."""
+        if not self.has_fts:
+            return
+        with self.transaction():
+            self.cursor.execute("DELETE FROM search_index")
+            for table, (kind, title, body) in SEARCH_SOURCES.items():
+                self.cursor.execute(f'''
+                    INSERT INTO search_index (rowid, title, body)
+                    SELECT t.id * 4 + {kind}, t.{title}, {self._search_body(body, 't')} FROM {table} t
+                ''')
+
+    def _migrate(self):
+        version = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            self._migrate_day_columns()
+        if version < 2:
+            self._migrate_day_load()
+        if version < 3:
+            self.hash_plaintext_passwords()
+        if version < 4:
+            self.rebuild_search_index()
+        if version < SCHEMA_VERSION:
+            self.cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _migrate_day_columns(self):
+        # Integer day numbers (date.toordinal()) mirroring the TEXT dates, so
+        # comparisons and overlaps need no per-row date parsing
+        for table in ("projects", "assignments"):
+            self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN start_day INTEGER")
+            self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN end_day INTEGER")
+            self.cursor.execute(f'''
+                UPDATE {table}
+                SET start_day = CAST(julianday(start_date) - {JULIAN_DAY_OFFSET} AS INTEGER),
+                    end_day = CAST(julianday(end_date) - {JULIAN_DAY_OFFSET} AS INTEGER)
+            ''')
+        # Superseded by the day-number indexes in _create_indexes()
+        self.cursor.execute("DROP INDEX IF EXISTS idx_assignments_artisan_dates")
+        self.cursor.execute("DROP INDEX IF EXISTS idx_projects_status_end")
+
+    def _migrate_day_load(self):
+        # Hours each assignment books per day, feeding artisan_day_load
+        self.cursor.execute(f"ALTER TABLE assignments ADD COLUMN hours_per_day REAL NOT NULL DEFAULT {config.DEFAULT_HOURS_PER_DAY}")
+        self.rebuild_artisan_day_load()
+
+    def _create_indexes(self):
+        # Secondary indexes for the Gantt, dashboard and activity feed lookups.
+        # idx_assignments_artisan_days also serves plain artisan_id lookups.
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_assignments_project ON assignments (project_id)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_assignments_artisan_days ON assignments (artisan_id, start_day, end_day)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_artisans_team ON artisans (team_id)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_projects_status_end_day ON projects (status, end_day)")
+        # Window overlap tests (end_day >= window start AND start_day <= window end)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_assignments_days ON assignments (end_day, start_day)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_projects_days ON projects (end_day, start_day)")
+        # Being on a rowid table, this also orders by id, which the (timestamp, id) pages rely on
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_activity_log_timestamp ON activity_log (timestamp)")
+        if self.archive_path:
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS archive.idx_activity_log_timestamp ON activity_log (timestamp)")
 
     def ensure_default_user(self):
         # Check if the default user 'cm_user' exists, if not, create it
@@ -88,115 +329,624 @@ class Database:
             self.add_user("cm_user", "pass123")
 
     def add_user(self, username, password):
+        password_hash = hash_password(password)
         try:
-            self.cursor.execute('''
-                INSERT INTO users (username, password)
-                VALUES (?, ?)
-            ''', (username, password))
-            self.conn.commit()
-            return self.cursor.lastrowid
+            with self.transaction():
+                self.cursor.execute('''
+                    INSERT INTO users (username, password)
+                    VALUES (?, ?)
+                ''', (username, password_hash))
+                return self.cursor.lastrowid
         except sqlite3.IntegrityError:
             raise ValueError("Username already exists")
 
     def get_user(self, username, password):
-        self.cursor.execute('''
-            SELECT * FROM users WHERE username = ? AND password = ?
-        ''', (username, password))
-        user = self.cursor.fetchone()
-        if user:
-            return {"id": user[0], "username": user[1]}
-        return None
+        """Return {"id", "username"} if the password matches, else None.
+
+        Checking a bcrypt hash takes a noticeable fraction of a second at the
+        configured cost, so call this off the UI thread. A plaintext password,
+        or a hash at an outdated cost factor, is replaced with a fresh hash
+        on successful login.
+        """
+        user = self._reader().execute(
+            "SELECT id, username, password FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        if not user or not verify_password(password, user[2]):
+            return None
+        if needs_rehash(user[2]):
+            password_hash = hash_password(password)  # Before taking the write lock
+            with self.transaction():
+                # Only if nobody changed it meanwhile
+                self.cursor.execute("UPDATE users SET password = ? WHERE id = ? AND password = ?",
+                                    (password_hash, user[0], user[2]))
+        return {"id": user[0], "username": user[1]}
+
+    def hash_plaintext_passwords(self):
+        """Replace every plaintext password in users with its bcrypt hash; return how many were hashed."""
+        with self.transaction():
+            rows = [(id, password) for id, password in self.cursor.execute("SELECT id, password FROM users").fetchall()
+                    if not is_hashed(password)]
+            self.cursor.executemany("UPDATE users SET password = ? WHERE id = ?",
+                                    [(hash_password(password), id) for id, password in rows])
+        return len(rows)
 
     def add_project(self, name, start_date, end_date, status, job_number, description):
-        self.cursor.execute('''
-            INSERT INTO projects (name, start_date, end_date, status, job_number, description)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (name, start_date, end_date, status, job_number, description))
-        project_id = self.cursor.lastrowid
-        self.conn.commit()
-        # Log the activity
-        self.log_activity("Project Added", f"Project '{name}' (ID: {project_id}) added")
+        with self.transaction():
+            self.cursor.execute('''
+                INSERT INTO projects (name, start_date, end_date, status, job_number, description, start_day, end_day)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (name, start_date, end_date, status, job_number, description, to_day(start_date), to_day(end_date)))
+            project_id = self.cursor.lastrowid
+            # Log the activity
+            self.log_activity("Project Added", f"Project '{name}' (ID: {project_id}) added")
         return project_id
 
+    def update_project(self, project_id, name, start_date, end_date, job_number, description):
+        with self.transaction():
+            self.cursor.execute('''
+                UPDATE projects SET name = ?, start_date = ?, end_date = ?, job_number = ?, description = ?,
+                                    start_day = ?, end_day = ?
+                WHERE id = ?
+            ''', (name, start_date, end_date, job_number, description, to_day(start_date), to_day(end_date), project_id))
+            # Log the activity
+            self.log_activity("Project Updated", f"Project '{name}' (ID: {project_id}) updated")
+
+    def delete_project(self, project_id):
+        with self.transaction():
+            project = self.cursor.execute("SELECT name FROM projects WHERE id = ?", (project_id,)).fetchone()
+            self.delete_project_assignments(project_id)
+            self.cursor.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+            # Log the activity
+            self.log_activity("Project Deleted", f"Project '{project[0]}' (ID: {project_id}) deleted")
+
+    def delete_project_assignments(self, project_id):
+        with self.transaction():
+            removed = self.cursor.execute(
+                "SELECT id, artisan_id, start_day, end_day, hours_per_day FROM assignments WHERE project_id = ?", (project_id,)
+            ).fetchall()
+            self.cursor.execute("DELETE FROM assignments WHERE project_id = ?", (project_id,))
+            self._apply_day_load([span for _, *span in removed], -1)
+            for assignment_id, artisan_id, *_ in removed:
+                self.conflicts.unbook(artisan_id, assignment_id)
+
+    def _apply_day_load(self, spans, sign):
+        """Add (sign=1) or remove (sign=-1) (artisan_id, start_day, end_day, hours_per_day) spans from artisan_day_load."""
+        if not spans:
+            return
+        # Expands each span into its days and upserts them; triggers cannot
+        # do this because they do not allow recursive CTEs
+        self.cursor.executemany('''
+            WITH RECURSIVE span(day) AS (
+                SELECT :start UNION ALL SELECT day + 1 FROM span WHERE day < :end
+            )
+            INSERT INTO artisan_day_load (artisan_id, day, assignment_count, hours)
+            SELECT :artisan, day, :count, :hours FROM span WHERE true
+            ON CONFLICT (artisan_id, day) DO UPDATE SET
+                assignment_count = assignment_count + excluded.assignment_count,
+                hours = hours + excluded.hours
+        ''', [{"artisan": artisan_id, "start": start_day, "end": end_day, "count": sign, "hours": sign * hours}
+              for artisan_id, start_day, end_day, hours in spans])
+        if sign < 0:
+            self.cursor.executemany(
+                "DELETE FROM artisan_day_load WHERE artisan_id = ? AND day BETWEEN ? AND ? AND assignment_count <= 0",
+                [(artisan_id, start_day, end_day) for artisan_id, start_day, end_day, _ in spans]
+            )
+
+    def rebuild_artisan_day_load(self):
+        """Recompute artisan_day_load from the assignments table."""
+        with self.transaction():
+            self.cursor.execute("DELETE FROM artisan_day_load")
+            self.cursor.execute('''
+                WITH RECURSIVE days(artisan_id, day, end_day, hours) AS (
+                    SELECT artisan_id, start_day, end_day, hours_per_day FROM assignments
+                    UNION ALL
+                    SELECT artisan_id, day + 1, end_day, hours FROM days WHERE day < end_day
+                )
+                INSERT INTO artisan_day_load (artisan_id, day, assignment_count, hours)
+                SELECT artisan_id, day, COUNT(*), SUM(hours) FROM days GROUP BY artisan_id, day
+            ''')
+
+    def get_artisan_day_load(self, artisan_id, start, end):
+        """Return (day, assignment_count, hours) for each booked day of the artisan in the inclusive window."""
+        return self._reader().execute(
+            "SELECT day, assignment_count, hours FROM artisan_day_load WHERE artisan_id = ? AND day BETWEEN ? AND ? ORDER BY day",
+            (artisan_id, to_day(start), to_day(end))
+        ).fetchall()
+
     def add_artisan(self, name, skill, availability, profile_picture=None):
-        self.cursor.execute('''
-            INSERT INTO artisans (name, skill, availability, profile_picture)
-            VALUES (?, ?, ?, ?)
-        ''', (name, skill, availability, profile_picture))
-        artisan_id = self.cursor.lastrowid
-        self.conn.commit()
-        # Log the activity
-        self.log_activity("Artisan Added", f"Artisan '{name}' (ID: {artisan_id}) added")
+        with self.transaction():
+            self.cursor.execute('''
+                INSERT INTO artisans (name, skill, availability, profile_picture)
+                VALUES (?, ?, ?, ?)
+            ''', (name, skill, availability, profile_picture))
+            artisan_id = self.cursor.lastrowid
+            # Log the activity
+            self.log_activity("Artisan Added", f"Artisan '{name}' (ID: {artisan_id}) added")
         return artisan_id
 
     def add_team(self, name):
-        self.cursor.execute('''
-            INSERT INTO teams (name) VALUES (?)
-        ''', (name,))
-        team_id = self.cursor.lastrowid
-        self.conn.commit()
-        # Log the activity
-        self.log_activity("Team Added", f"Team '{name}' (ID: {team_id}) added")
+        with self.transaction():
+            self.cursor.execute('''
+                INSERT INTO teams (name) VALUES (?)
+            ''', (name,))
+            team_id = self.cursor.lastrowid
+            # Log the activity
+            self.log_activity("Team Added", f"Team '{name}' (ID: {team_id}) added")
         return team_id
 
-    def add_assignment(self, artisan_id, project_id, start_date, end_date):
-        self.cursor.execute('''
-            INSERT INTO assignments (artisan_id, project_id, start_date, end_date)
-            VALUES (?, ?, ?, ?)
-        ''', (artisan_id, project_id, start_date, end_date))
-        assignment_id = self.cursor.lastrowid
-        self.conn.commit()
-        # Log the activity
-        project = self.cursor.execute("SELECT name FROM projects WHERE id = ?", (project_id,)).fetchone()
-        artisan = self.cursor.execute("SELECT name FROM artisans WHERE id = ?", (artisan_id,)).fetchone()
-        self.log_activity("Assignment Added", f"Artisan '{artisan[0]}' assigned to project '{project[0]}' (Assignment ID: {assignment_id})")
+    def add_assignment(self, artisan_id, project_id, start_date, end_date, hours_per_day=None):
+        if hours_per_day is None:
+            hours_per_day = config.DEFAULT_HOURS_PER_DAY
+        start_day, end_day = to_day(start_date), to_day(end_date)
+        with self.transaction():
+            self.ensure_no_conflict(artisan_id, start_day, end_day, hours_per_day)
+            self.cursor.execute('''
+                INSERT INTO assignments (artisan_id, project_id, start_date, end_date, start_day, end_day, hours_per_day)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (artisan_id, project_id, start_date, end_date, start_day, end_day, hours_per_day))
+            assignment_id = self.cursor.lastrowid
+            self._apply_day_load([(artisan_id, start_day, end_day, hours_per_day)], 1)
+            self.conflicts.book(artisan_id, assignment_id, start_day, end_day, hours_per_day)
+            # Log the activity
+            self.log_activity("Assignment Added",
+                              f"Artisan '{{artisan}}' assigned to project '{{project}}' (Assignment ID: {assignment_id})",
+                              artisan_id=artisan_id, project_id=project_id)
         return assignment_id
 
     def update_assignment(self, assignment_id, start_date, end_date):
-        self.cursor.execute('''
-            UPDATE assignments SET start_date = ?, end_date = ?
-            WHERE id = ?
-        ''', (start_date, end_date, assignment_id))
-        self.conn.commit()
-        # Log the activity
-        assignment = self.cursor.execute("SELECT artisan_id, project_id FROM assignments WHERE id = ?", (assignment_id,)).fetchone()
-        project = self.cursor.execute("SELECT name FROM projects WHERE id = ?", (assignment[1],)).fetchone()
-        artisan = self.cursor.execute("SELECT name FROM artisans WHERE id = ?", (assignment[0],)).fetchone()
-        self.log_activity("Assignment Updated", f"Assignment for artisan '{artisan[0]}' on project '{project[0]}' updated (ID: {assignment_id})")
+        start_day, end_day = to_day(start_date), to_day(end_date)
+        with self.transaction():
+            old = self.cursor.execute(
+                "SELECT artisan_id, start_day, end_day, hours_per_day FROM assignments WHERE id = ?", (assignment_id,)
+            ).fetchall()
+            for artisan_id, _, _, hours in old:
+                self.ensure_no_conflict(artisan_id, start_day, end_day, hours, assignment_id)
+            self.cursor.execute('''
+                UPDATE assignments SET start_date = ?, end_date = ?, start_day = ?, end_day = ?
+                WHERE id = ?
+            ''', (start_date, end_date, start_day, end_day, assignment_id))
+            self._apply_day_load(old, -1)
+            self._apply_day_load([(artisan_id, start_day, end_day, hours) for artisan_id, _, _, hours in old], 1)
+            for artisan_id, _, _, hours in old:
+                self.conflicts.unbook(artisan_id, assignment_id)
+                self.conflicts.book(artisan_id, assignment_id, start_day, end_day, hours)
+            # Log the activity
+            self.log_activity("Assignment Updated",
+                              f"Assignment for artisan '{{artisan}}' on project '{{project}}' updated (ID: {assignment_id})",
+                              assignment_id=assignment_id)
+
+    def check_conflict(self, artisan_id, start, end, hours_per_day=None, assignment_id=None):
+        """Return the Conflict booking the artisan for start..end would cause, or None.
+
+        Pass assignment_id when moving an existing assignment so its current
+        span is not counted against itself.
+        """
+        return self.conflicts.check(artisan_id, to_day(start), to_day(end), hours_per_day, assignment_id)
+
+    def ensure_no_conflict(self, artisan_id, start, end, hours_per_day=None, assignment_id=None):
+        """Raise ConflictError if the booking would exceed the daily hours cap."""
+        conflict = self.check_conflict(artisan_id, start, end, hours_per_day, assignment_id)
+        if conflict:
+            artisan = self.get_artisan(artisan_id)
+            raise ConflictError(conflict, artisan[1] if artisan else None)
 
     def update_artisan_team(self, artisan_id, team_id):
-        self.cursor.execute('''
-            UPDATE artisans SET team_id = ? WHERE id = ?
-        ''', (team_id, artisan_id))
-        self.conn.commit()
-        # Log the activity
-        artisan = self.cursor.execute("SELECT name FROM artisans WHERE id = ?", (artisan_id,)).fetchone()
-        team = self.cursor.execute("SELECT name FROM teams WHERE id = ?", (team_id,)).fetchone()
-        self.log_activity("Artisan Team Updated", f"Artisan '{artisan[0]}' assigned to team '{team[0]}' (Team ID: {team_id})")
+        with self.transaction():
+            self.cursor.execute('''
+                UPDATE artisans SET team_id = ? WHERE id = ?
+            ''', (team_id, artisan_id))
+            # Log the activity
+            self.log_activity("Artisan Team Updated",
+                              f"Artisan '{{artisan}}' assigned to team '{{team}}' (Team ID: {team_id})",
+                              artisan_id=artisan_id, team_id=team_id)
 
     def get_projects(self):
-        self.cursor.execute("SELECT * FROM projects")
-        return self.cursor.fetchall()
+        return self._reader().execute("SELECT * FROM projects").fetchall()
+
+    def get_project(self, project_id):
+        return self._reader().execute("SELECT * FROM projects WHERE id = ?", (project_id,)).fetchone()
+
+    def get_project_artisans(self, project_id):
+        """Return (id, name) for each artisan assigned to the project."""
+        return self._reader().execute(
+            "SELECT a.id, a.name FROM artisans a JOIN assignments ass ON a.id = ass.artisan_id WHERE ass.project_id = ?",
+            (project_id,)
+        ).fetchall()
 
     def get_artisans(self):
-        self.cursor.execute("SELECT * FROM artisans")
-        return self.cursor.fetchall()
+        return self._reader().execute("SELECT * FROM artisans").fetchall()
+
+    def get_artisan(self, artisan_id):
+        return self._reader().execute("SELECT * FROM artisans WHERE id = ?", (artisan_id,)).fetchone()
+
+    def get_teams(self):
+        return self._reader().execute("SELECT * FROM teams").fetchall()
+
+    def get_team(self, team_id):
+        return self._reader().execute("SELECT * FROM teams WHERE id = ?", (team_id,)).fetchone()
 
     def get_assignments(self):
-        self.cursor.execute("SELECT * FROM assignments")
-        return self.cursor.fetchall()
+        return self._reader().execute("SELECT * FROM assignments").fetchall()
+
+    def get_assignment(self, assignment_id):
+        return self._reader().execute("SELECT * FROM assignments WHERE id = ?", (assignment_id,)).fetchone()
+
+    def get_project_spans(self, status=None):
+        """Return (id, name, status, start_day, end_day) rows, optionally for one status."""
+        sql = "SELECT id, name, status, start_day, end_day FROM projects"
+        if status is None:
+            return self._reader().execute(sql).fetchall()
+        return self._reader().execute(f"{sql} WHERE status = ?", (status,)).fetchall()
+
+    def get_assignment_spans(self, artisan_id=None):
+        """Return (id, artisan_id, project_id, start_day, end_day) rows, optionally for one artisan."""
+        sql = "SELECT id, artisan_id, project_id, start_day, end_day FROM assignments"
+        if artisan_id is None:
+            return self._reader().execute(sql).fetchall()
+        return self._reader().execute(f"{sql} WHERE artisan_id = ? ORDER BY start_day", (artisan_id,)).fetchall()
+
+    def get_artisan_bookings(self, artisan_id):
+        """Return (id, start_day, end_day, hours_per_day) for each of the artisan's assignments."""
+        return self._reader().execute(
+            "SELECT id, start_day, end_day, hours_per_day FROM assignments WHERE artisan_id = ?", (artisan_id,)
+        ).fetchall()
+
+    def get_assignments_in_range(self, start, end, project_ids=None, artisan_ids=None):
+        """Return assignment rows overlapping the inclusive [start, end] window.
+
+        start/end accept anything to_day() does. project_ids/artisan_ids
+        narrow the result to those projects/artisans.
+        """
+        sql = "SELECT * FROM assignments WHERE end_day >= ? AND start_day <= ?"
+        params = [to_day(start), to_day(end)]
+        if project_ids is not None:
+            sql += " AND project_id IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(project_ids)))
+        if artisan_ids is not None:
+            sql += " AND artisan_id IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(artisan_ids)))
+        return self._reader().execute(sql, params).fetchall()
+
+    def get_projects_in_range(self, start, end, status=None):
+        """Return project rows with anything visible in the inclusive [start, end] window.
+
+        A project qualifies when its own span or any of its assignments
+        overlaps the window, since assignments can be dragged outside the
+        project dates.
+        """
+        start, end = to_day(start), to_day(end)
+        # The outer status test is written +status so SQLite drives the
+        # lookup from the id list rather than scanning every project of
+        # that status
+        status_filter = "" if status is None else "status = ? AND "
+        outer_filter = "" if status is None else "AND +status = ?"
+        status_params = [] if status is None else [status]
+        sql = f'''
+            SELECT * FROM projects
+            WHERE id IN (
+                SELECT id FROM projects WHERE {status_filter}end_day >= ? AND start_day <= ?
+                UNION
+                SELECT project_id FROM assignments WHERE end_day >= ? AND start_day <= ?
+            ) {outer_filter}
+            ORDER BY id
+        '''
+        params = status_params + [start, end, start, end] + status_params
+        return self._reader().execute(sql, params).fetchall()
+
+    def load_gantt_view(self, start, end, status="Active"):
+        """Return the Gantt rows for the inclusive [start, end] window from one joined query.
+
+        Each row is a dict with the project's id, name, job_number,
+        description, start_day, end_day and team_name, plus an
+        "assignments" list of the window's assignments with their artisan's
+        name and profile picture. Rows are ordered by project id.
+        """
+        start, end = to_day(start), to_day(end)
+        cursor = self._reader().execute('''
+            WITH visible(id) AS (
+                SELECT id FROM projects WHERE status = ? AND end_day >= ? AND start_day <= ?
+                UNION
+                SELECT project_id FROM assignments WHERE end_day >= ? AND start_day <= ?
+            )
+            SELECT p.id, p.name, p.job_number, p.description, p.start_day, p.end_day,
+                   a.id, a.artisan_id, a.start_day, a.end_day,
+                   ar.name, ar.profile_picture, t.name
+            FROM visible
+            JOIN projects p ON p.id = visible.id AND +p.status = ?
+            LEFT JOIN assignments a ON a.project_id = p.id AND a.end_day >= ? AND a.start_day <= ?
+            LEFT JOIN artisans ar ON ar.id = a.artisan_id
+            LEFT JOIN teams t ON t.id = ar.team_id
+            ORDER BY p.id, a.id
+        ''', (status, start, end, start, end, status, start, end))
+        rows = []
+        for (project_id, name, job_number, description, project_start, project_end,
+             assignment_id, artisan_id, start_day, end_day, artisan_name, picture, team_name) in cursor:
+            if not rows or rows[-1]["id"] != project_id:
+                rows.append({
+                    "id": project_id, "name": name, "job_number": job_number, "description": description,
+                    "start_day": project_start, "end_day": project_end, "team_name": None, "assignments": [],
+                })
+            row = rows[-1]
+            if assignment_id is None:
+                continue
+            row["assignments"].append({
+                "id": assignment_id, "project_id": project_id, "artisan_id": artisan_id,
+                "artisan_name": artisan_name, "profile_picture": picture,
+                "start_day": start_day, "end_day": end_day,
+            })
+            if row["team_name"] is None:
+                row["team_name"] = team_name
+        for row in rows:
+            row["team_name"] = row["team_name"] or "No Team"
+        return rows
+
+    def search(self, query, limit=config.SEARCH_LIMIT):
+        """Return up to limit (kind, id, title) matches for query, best first.
+
+        kind is "project", "artisan" or "team". Every word of the query must
+        match, each as a prefix of a word in the name, job number,
+        description or skill, so "ma plu" finds "Mary Plumber". Name
+        matches rank above the rest.
+        """
+        words = self._search_words(query)
+        if not words:
+            return []
+        if not self.has_fts:
+            return self._search_like(words, limit)
+        rows = self._reader().execute('''
+            SELECT rowid, title FROM search_index WHERE search_index MATCH ?
+            ORDER BY bm25(search_index, 10.0, 1.0) LIMIT ?
+        ''', (self._fts_query(words), limit)).fetchall()
+        return [(SEARCH_KINDS[rowid % 4], rowid // 4, title) for rowid, title in rows]
+
+    def search_ids(self, query):
+        """Return {"project": ids, "artisan": ids, "team": ids}, the sets of every row matching query as in search().
+
+        Unranked and without titles, so filtering by a query that matches
+        most rows stays cheap.
+        """
+        ids = {kind: set() for kind in SEARCH_KINDS.values()}
+        words = self._search_words(query)
+        if not words:
+            return ids
+        if not self.has_fts:
+            rows = ((kind, row_id) for kind, row_id, _ in self._search_like(words, -1))
+        else:
+            rows = ((SEARCH_KINDS[rowid % 4], rowid // 4) for (rowid,) in self._reader().execute(
+                "SELECT rowid FROM search_index WHERE search_index MATCH ?", (self._fts_query(words),)))
+        for kind, row_id in rows:
+            ids[kind].add(row_id)
+        return ids
+
+    @staticmethod
+    def _search_words(query):
+        # Quotes would end the FTS5 strings; words of punctuation alone match nothing
+        words = [word.replace('"', "") for word in query.split()]
+        return [word for word in words if any(c.isalnum() for c in word)]
+
+    @staticmethod
+    def _fts_query(words):
+        # Every word, each as a quoted prefix
+        return " AND ".join(f'"{word}"*' for word in words)
+
+    def _search_like(self, words, limit):
+        # Substring fallback for SQLite builds without FTS5: unranked and a scan per table
+        patterns = ["%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%" for word in words]
+        results = []
+        for table, (kind, title, body) in SEARCH_SOURCES.items():
+            text = f"{title} || ' ' || {self._search_body(body, table)}"
+            where = " AND ".join(f"{text} LIKE ? ESCAPE '\\'" for _ in words)
+            rows = self._reader().execute(
+                f"SELECT id, {title} FROM {table} WHERE {where} ORDER BY id LIMIT ?", (*patterns, limit)
+            ).fetchall()
+            results.extend((SEARCH_KINDS[kind], row_id, name) for row_id, name in rows)
+        return results if limit < 0 else results[:limit]
 
-    def log_activity(self, action, details):
+    def bulk_import(self, kind, source, fmt=None, chunk_size=config.IMPORT_CHUNK_SIZE, progress=None):
+        """Import teams, artisans, projects or assignments from a CSV or JSON-lines file.
+
+        Rows are validated and written chunk_size at a time, one transaction
+        per chunk. If a previous import of the same file stopped part-way,
+        it resumes after the last committed chunk. progress, if given, is
+        called as progress(line, imported, skipped) after each chunk.
+        Returns {"imported": n, "skipped": n, "errors": [(line, message), ...]}.
+        """
+        return BulkImporter(self, kind, source, fmt, chunk_size, progress).run()
+
+    def export_snapshot(self, path, chunk_size=config.SNAPSHOT_CHUNK_SIZE):
+        """Write the whole schedule to a compressed, columnar snapshot file; return {table: rows}.
+
+        The snapshot holds users, teams, artisans, projects, assignments,
+        the day load and the activity log (not the archive) as of one
+        moment, and records the schema version it was taken at.
+        """
+        self.activity_writer.flush()
+        return export_snapshot(self, path, chunk_size)
+
+    def import_snapshot(self, path):
+        """Replace the schedule with the contents of a snapshot from export_snapshot(); return {table: rows}.
+
+        Everything is replaced in one transaction. A snapshot taken at a
+        different schema version raises ValueError.
+        """
+        self.activity_writer.flush()
+        counts = import_snapshot(self, path)
+        self.conflicts.clear()
+        self.log_activity("Snapshot Imported", f"Schedule replaced from snapshot '{os.path.basename(path)}' "
+                                               f"({counts.get('projects', 0)} projects, "
+                                               f"{counts.get('assignments', 0)} assignments)")
+        return counts
+
+    def get_project_status_counts(self):
+        """Return {status: number of projects}."""
+        return dict(self._reader().execute("SELECT status, COUNT(*) FROM projects GROUP BY status").fetchall())
+
+    def get_deadline_projects(self, status="Active", project_ids=None):
+        """Return (id, name, end_date, artisan names, end_day) per project of a status, ordered by id.
+
+        Artisan names are joined with ", ", or "None" when nobody is
+        assigned. project_ids narrows the result to those projects.
+        """
+        sql = '''
+            SELECT p.id, p.name, p.end_date, COALESCE(group_concat(ar.name, ', '), 'None'), p.end_day
+            FROM projects p
+            LEFT JOIN assignments a ON a.project_id = p.id
+            LEFT JOIN artisans ar ON ar.id = a.artisan_id
+            WHERE p.status = ?
+        '''
+        params = [status]
+        if project_ids is not None:
+            sql += " AND p.id IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(project_ids)))
+        return self._reader().execute(sql + " GROUP BY p.id ORDER BY p.id", params).fetchall()
+
+    def get_artisan_workload(self, start, end, artisan_ids=None):
+        """Return (id, name, assignment count, days booked in [start, end]) per artisan, ordered by id.
+
+        Days booked are summed from artisan_day_load, so a day with two
+        assignments counts twice.
+        """
+        sql = '''
+            SELECT ar.id, ar.name,
+                   (SELECT COUNT(*) FROM assignments a WHERE a.artisan_id = ar.id),
+                   COALESCE((SELECT SUM(l.assignment_count) FROM artisan_day_load l
+                             WHERE l.artisan_id = ar.id AND l.day BETWEEN ? AND ?), 0)
+            FROM artisans ar
+        '''
+        params = [to_day(start), to_day(end)]
+        if artisan_ids is not None:
+            sql += " WHERE ar.id IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(artisan_ids)))
+        return self._reader().execute(sql + " ORDER BY ar.id", params).fetchall()
+
+    def count_available_artisans(self, day):
+        """Return how many artisans have no assignment on the given day."""
+        return self._reader().execute('''
+            SELECT COUNT(*) FROM artisans ar
+            WHERE NOT EXISTS (SELECT 1 FROM artisan_day_load l WHERE l.artisan_id = ar.id AND l.day = ?)
+        ''', (to_day(day),)).fetchone()[0]
+
+    def log_activity(self, action, details, **refs):
+        """Queue an activity_log entry for the background writer.
+
+        When refs (artisan_id, project_id, team_id or assignment_id) are
+        given, details is a template whose {artisan}, {project} and {team}
+        names are looked up when the entry is written. Inside a transaction
+        the entry is only queued once the transaction commits.
+        """
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.cursor.execute('''
-            INSERT INTO activity_log (action, details, timestamp)
-            VALUES (?, ?, ?)
-        ''', (action, details, timestamp))
-        self.conn.commit()
+        entry = (action, details, timestamp, refs)
+        if self._transaction_thread == threading.get_ident():
+            self._pending_activity.append(entry)
+        else:
+            self.activity_writer.submit([entry])
 
     def get_recent_activities(self, limit=10):
-        self.cursor.execute("SELECT action, details, timestamp FROM activity_log ORDER BY timestamp DESC LIMIT ?", (limit,))
-        return self.cursor.fetchall()
+        return [row[1:] for row in self.get_activities(limit=limit)]
+
+    def get_activities(self, before=None, limit=50):
+        """Return up to limit (id, action, details, timestamp) entries, newest first, across the main and archive logs.
+
+        For the next, older page pass before=(timestamp, id) of the last
+        entry returned. Each page is an index range scan on both tables,
+        however far back in the history it is.
+        """
+        self.activity_writer.flush()
+        where, params = ("WHERE (timestamp, id) < (?, ?)", [*before]) if before else ("", [])
+        schemas = ["main", "archive"] if self.archive_path else ["main"]
+        # UNION also drops an entry left in both tables by an interrupted archive batch
+        sql = " UNION ".join(
+            f"SELECT * FROM (SELECT id, action, details, timestamp FROM {schema}.activity_log {where} "
+            f"ORDER BY timestamp DESC, id DESC LIMIT ?)" for schema in schemas
+        )
+        return self._reader().execute(
+            f"{sql} ORDER BY timestamp DESC, id DESC LIMIT ?", [*(params + [limit]) * len(schemas), limit]
+        ).fetchall()
+
+    def archive_activities(self, retention_days=config.ACTIVITY_RETENTION_DAYS, batch_size=config.ACTIVITY_ARCHIVE_BATCH_SIZE):
+        """Move up to batch_size of the oldest entries past retention_days into the archive; return how many moved.
+
+        Copies are made with INSERT OR IGNORE, so a batch interrupted between
+        the two files' commits is simply repeated. An entry is only deleted
+        once the archive holds an identical row; one whose id the archive
+        already uses for a different entry stays where it is.
+        """
+        if not self.archive_path:
+            return 0
+        cutoff = (datetime.now() - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+        moved = 0
+        with self.transaction():
+            ids = [row[0] for row in self.cursor.execute(
+                "SELECT id FROM main.activity_log WHERE timestamp < ? ORDER BY timestamp, id LIMIT ?", (cutoff, batch_size)
+            ).fetchall()]
+            if ids:
+                batch = json.dumps(ids)
+                self.cursor.execute('''
+                    INSERT OR IGNORE INTO archive.activity_log (id, action, details, timestamp)
+                    SELECT id, action, details, timestamp FROM main.activity_log
+                    WHERE id IN (SELECT value FROM json_each(?))
+                ''', (batch,))
+                moved = self.cursor.execute('''
+                    DELETE FROM main.activity_log WHERE id IN (SELECT value FROM json_each(?)) AND EXISTS (
+                        SELECT 1 FROM archive.activity_log a WHERE a.id = main.activity_log.id
+                        AND a.action IS main.activity_log.action AND a.details IS main.activity_log.details
+                        AND a.timestamp IS main.activity_log.timestamp
+                    )
+                ''', (batch,)).rowcount
+        if moved < len(ids):
+            print(f"Error archiving activity log: {len(ids) - moved} entries clash with archived ids and were kept")
+        return moved
+
+    def backup(self, dest_path, pages=config.BACKUP_PAGES_PER_STEP, pause=config.BACKUP_STEP_PAUSE, progress=None):
+        """Copy the main database to dest_path with the SQLite online backup API.
+
+        The copy runs through the writer connection pages at a time, and the
+        write lock is released for pause milliseconds between steps. Edits
+        made meanwhile go through the same connection, so SQLite copies them
+        into the backup as it goes instead of restarting it. progress, if
+        given, is called with (remaining, total) pages after each step.
+        Raises RuntimeError inside a transaction: the lock would stay held
+        by the transaction between steps, blocking edits for the whole copy.
+        """
+        if self._transaction_thread == threading.get_ident():
+            raise RuntimeError("Cannot back up the database inside a transaction")
+        dest = sqlite3.connect(dest_path)
+
+        def step(status, remaining, total):
+            if progress:
+                progress(remaining, total)
+            self.pool.write_lock.release()
+            try:
+                time.sleep(pause / 1000)
+            finally:
+                self.pool.write_lock.acquire()
+
+        try:
+            with self.pool.write_lock:
+                self.conn.backup(dest, pages=pages, progress=step)
+        finally:
+            dest.close()
+
+    def stats(self):
+        """Return per-statement query statistics, slowest total time first.
+
+        Each entry has the statement's sql, count, total_ms, mean_ms, p50_ms,
+        p95_ms, p99_ms, max_ms and rows fetched. Empty when config.QUERY_STATS
+        is off.
+        """
+        return self.query_stats.snapshot() if self.query_stats else []
+
+    def reset_stats(self):
+        if self.query_stats:
+            self.query_stats.reset()
+
+    def dump_stats(self, path):
+        with open(path, "w") as f:
+            json.dump(self.stats(), f, indent=2)
 
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        # Writes out any queued activity before the connections go away
+        if self.activity_archiver:
+            self.activity_archiver.close()
+        self.activity_writer.close()
+        self.pool.close()
\ No newline at end of file
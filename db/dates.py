@@ -0,0 +1,20 @@
+# db/dates.py
+from datetime import date, datetime
+
+DATE_FORMAT = "%Y-%m-%d"
+
+# julianday('0001-01-01') - 1; subtracting it from a julianday() gives the
+# same day number as date.toordinal()
+JULIAN_DAY_OFFSET = 1721424.5
+
+def to_day(value):
+    """Return the day number (date.toordinal()) for a date, datetime, 'YYYY-MM-DD' string or day number."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, date):  # also covers datetime
+        return value.toordinal()
+    return datetime.strptime(value, DATE_FORMAT).toordinal()
+
+def from_day(day):
+    """Return the 'YYYY-MM-DD' string for a day number."""
+    return date.fromordinal(day).strftime(DATE_FORMAT)
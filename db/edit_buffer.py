@@ -0,0 +1,127 @@
+# db/edit_buffer.py
+import json
+import os
+from datetime import datetime
+from db.dates import to_day
+import config
+
+class EditBuffer:
+    """Holds assignment moves in memory and writes them together.
+
+    Used by the calendar when config.BUFFER_EDITS is on: a drag only
+    records the move (moving the same bar again replaces it), and views
+    show pending moves by passing their rows through overlay(). flush()
+    writes everything pending in one transaction; the owner calls it on
+    the autosave timer, on save and on close. Every move is appended to a
+    JSON-lines journal and fsynced before it is accepted, so moves not
+    yet flushed when the app dies are loaded again on the next start.
+    Subscribers are called with no arguments whenever the pending set
+    changes.
+    """
+
+    def __init__(self, db, journal_path, enabled=config.BUFFER_EDITS):
+        self.db = db
+        self.journal_path = journal_path
+        self.enabled = enabled
+        self.pending = {}  # assignment_id -> (start_date, end_date)
+        self._subscribers = []
+        self.recovered = self._replay()
+        self._journal = open(journal_path, "a", encoding="utf-8")
+
+    @property
+    def dirty(self):
+        return bool(self.pending)
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def update_assignment(self, assignment_id, start_date, end_date):
+        """Record a move of the assignment to start_date..end_date, to be written by the next flush()."""
+        self._append({"assignment_id": assignment_id, "start_date": start_date, "end_date": end_date,
+                      "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+        self.pending[assignment_id] = (start_date, end_date)
+        self._notify()
+
+    def overlay(self, rows):
+        """Show pending moves in load_gantt_view rows, changing them in place; return rows."""
+        if self.pending:
+            for row in rows:
+                for assignment in row["assignments"]:
+                    move = self.pending.get(assignment["id"])
+                    if move:
+                        assignment["start_day"], assignment["end_day"] = to_day(move[0]), to_day(move[1])
+        return rows
+
+    def flush(self):
+        """Write every pending move in one transaction.
+
+        Moves the database rejects (a ValueError such as a ConflictError)
+        are dropped and returned as (assignment_id, message) pairs; the
+        rest commit. Any other error rolls everything back and leaves the
+        moves pending.
+        """
+        if not self.pending:
+            return []
+        pending, self.pending = self.pending, {}
+        failures = []
+        try:
+            with self.db.transaction():
+                for assignment_id, (start_date, end_date) in pending.items():
+                    try:
+                        self.db.update_assignment(assignment_id, start_date, end_date)
+                    except ValueError as e:
+                        failures.append((assignment_id, str(e)))
+        except BaseException:
+            self.pending = {**pending, **self.pending}
+            raise
+        self._rewrite_journal()
+        self._notify()
+        return failures
+
+    def discard(self):
+        """Forget every pending move without writing it."""
+        self.pending = {}
+        self._rewrite_journal()
+        self._notify()
+
+    def close(self):
+        self._journal.close()
+        if not self.pending and os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def _append(self, entry):
+        self._journal.write(json.dumps(entry) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _rewrite_journal(self):
+        # Keep only what is still pending (normally nothing)
+        self._journal.truncate(0)
+        for assignment_id, (start_date, end_date) in self.pending.items():
+            self._journal.write(json.dumps({"assignment_id": assignment_id, "start_date": start_date,
+                                            "end_date": end_date}) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _replay(self):
+        if not os.path.exists(self.journal_path):
+            return 0
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # A line cut short by the crash; everything before it is intact
+                self.pending[entry["assignment_id"]] = (entry["start_date"], entry["end_date"])
+        return len(self.pending)
+
+    def _notify(self):
+        for callback in list(self._subscribers):
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error handling pending edits change: {e}")
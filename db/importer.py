@@ -0,0 +1,183 @@
+# db/importer.py
+import csv
+import json
+import os
+from datetime import datetime
+from db.conflicts import ConflictError
+from db.dates import to_day
+import config
+
+KINDS = ("teams", "artisans", "projects", "assignments")
+
+# Keep at most this many row errors in the summary; the count is always exact
+MAX_REPORTED_ERRORS = 1000
+
+def read_records(source, fmt=None):
+    """Yield (line_number, record) pairs from a CSV or JSON-lines file without loading it whole."""
+    fmt = fmt or ("csv" if source.lower().endswith(".csv") else "jsonl")
+    with open(source, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        elif fmt == "jsonl":
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield line_number, e
+        else:
+            raise ValueError(f"Unsupported import format '{fmt}' (expected csv or jsonl)")
+
+class BulkImporter:
+    """Streams one kind of record from a file into the database in chunks.
+
+    Each chunk is validated, has its names resolved to ids through
+    in-memory maps, and is written with executemany in one transaction
+    together with its checkpoint row, so an interrupted import resumes
+    after the last committed chunk.
+    """
+
+    def __init__(self, db, kind, source, fmt=None, chunk_size=config.IMPORT_CHUNK_SIZE, progress=None):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown import kind '{kind}' (expected one of {', '.join(KINDS)})")
+        self.db = db
+        self.kind = kind
+        self.source = os.path.abspath(source)
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.imported = 0
+        self.skipped = 0
+        self.errors = []
+
+    def run(self):
+        resume_after = self._load_checkpoint()
+        self._load_maps()
+        chunk = []
+        last_line = resume_after
+        for line_number, record in read_records(self.source, self.fmt):
+            if line_number <= resume_after:
+                continue
+            last_line = line_number
+            try:
+                if isinstance(record, Exception):
+                    raise ValueError(f"Invalid JSON: {record}")
+                chunk.append(self._validate(record))
+            except (ValueError, KeyError) as e:
+                self._reject(line_number, e)
+            if len(chunk) >= self.chunk_size:
+                self._write_chunk(chunk, last_line)
+                chunk = []
+        self._write_chunk(chunk, last_line)
+        with self.db.transaction():
+            self.db.conn.execute("DELETE FROM import_checkpoints WHERE source = ? AND kind = ?",
+                                 (self.source, self.kind))
+            self.db.log_activity("Bulk Import", f"Imported {self.imported} {self.kind} from "
+                                                f"'{os.path.basename(self.source)}' ({self.skipped} skipped)")
+        return {"imported": self.imported, "skipped": self.skipped, "errors": self.errors}
+
+    def _load_checkpoint(self):
+        row = self.db.conn.execute(
+            "SELECT line, imported, skipped FROM import_checkpoints WHERE source = ? AND kind = ?",
+            (self.source, self.kind)
+        ).fetchone()
+        if not row:
+            return 0
+        line, self.imported, self.skipped = row
+        return line
+
+    def _load_maps(self):
+        conn = self.db.conn
+        self.teams = {name: id for id, name in conn.execute("SELECT id, name FROM teams")}
+        self.artisans = {name: id for id, name in conn.execute("SELECT id, name FROM artisans")}
+        # Assignments name their project by job number or, failing that, by name
+        self.projects = {name: id for id, name in conn.execute("SELECT id, name FROM projects")}
+        self.projects.update({job: id for id, job in conn.execute(
+            "SELECT id, job_number FROM projects WHERE job_number IS NOT NULL AND job_number != ''")})
+
+    def _validate(self, record):
+        if not isinstance(record, dict):
+            raise ValueError(f"Expected an object, got {type(record).__name__}")
+
+        def field(name, required=True):
+            value = record.get(name)
+            value = value.strip() if isinstance(value, str) else value
+            if required and not value:
+                raise ValueError(f"Missing '{name}'")
+            return value or None
+
+        def lookup(names, name, label):
+            if name not in names:
+                raise ValueError(f"Unknown {label} '{name}'")
+            return names[name]
+
+        def dates():
+            start_date, end_date = field("start_date"), field("end_date")
+            for name, value in (("start_date", start_date), ("end_date", end_date)):
+                if not isinstance(value, str):
+                    raise ValueError(f"'{name}' must be a 'YYYY-MM-DD' string")
+            start_day, end_day = to_day(start_date), to_day(end_date)
+            if end_day < start_day:
+                raise ValueError("End date must be after start date")
+            return start_date, end_date, start_day, end_day
+
+        if self.kind == "teams":
+            return (field("name"),)
+        if self.kind == "artisans":
+            team = field("team", required=False)
+            team_id = lookup(self.teams, team, "team") if team else None
+            return (field("name"), field("skill", False), field("availability", False),
+                    field("profile_picture", False), team_id)
+        if self.kind == "projects":
+            start_date, end_date, start_day, end_day = dates()
+            return (field("name"), start_date, end_date, field("status", False) or "Active",
+                    field("job_number", False), field("description", False), start_day, end_day)
+        artisan_id = lookup(self.artisans, field("artisan"), "artisan")
+        project_id = lookup(self.projects, field("project"), "project")
+        hours = field("hours_per_day", False)
+        hours = config.DEFAULT_HOURS_PER_DAY if hours is None else float(hours)
+        start_date, end_date, start_day, end_day = dates()
+        conflict = self.db.conflicts.check(artisan_id, start_day, end_day, hours)
+        if conflict:
+            raise ConflictError(conflict, field("artisan"))
+        # Booked without an id so later rows in the chunk are checked against it;
+        # the artisan is reloaded from the table once the chunk is written
+        self.db.conflicts.book(artisan_id, None, start_day, end_day, hours)
+        return (artisan_id, project_id, start_date, end_date, start_day, end_day, hours)
+
+    def _reject(self, line_number, error):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, str(error)))
+
+    def _write_chunk(self, rows, last_line):
+        statements = {
+            "teams": "INSERT INTO teams (name) VALUES (?)",
+            "artisans": "INSERT INTO artisans (name, skill, availability, profile_picture, team_id) VALUES (?, ?, ?, ?, ?)",
+            "projects": "INSERT INTO projects (name, start_date, end_date, status, job_number, description, start_day, end_day) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            "assignments": "INSERT INTO assignments (artisan_id, project_id, start_date, end_date, start_day, end_day, hours_per_day) "
+                           "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        }
+        try:
+            with self.db.transaction():
+                if rows:
+                    self.db.conn.executemany(statements[self.kind], rows)
+                    if self.kind == "assignments":
+                        self.db._apply_day_load([(row[0], row[4], row[5], row[6]) for row in rows], 1)
+                self.imported += len(rows)
+                self.db.conn.execute('''
+                    INSERT INTO import_checkpoints (source, kind, line, imported, skipped, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (source, kind) DO UPDATE SET
+                        line = excluded.line, imported = excluded.imported,
+                        skipped = excluded.skipped, updated_at = excluded.updated_at
+                ''', (self.source, self.kind, last_line, self.imported, self.skipped,
+                      datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        finally:
+            if self.kind == "assignments":
+                self.db.conflicts.invalidate({row[0] for row in rows})
+        if self.progress:
+            self.progress(last_line, self.imported, self.skipped)
@@ -0,0 +1,195 @@
+# db/instrumentation.py
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger("gantt.db.slow_query")
+
+# Frames from these files are skipped when reporting where a query came from
+_DB_PACKAGE = os.path.dirname(os.path.abspath(__file__))
+
+# Executions kept per statement for the percentile figures
+SAMPLES_PER_STATEMENT = 1024
+
+class _Execution:
+    """Time spent and rows fetched by one execution of a statement."""
+    __slots__ = ("elapsed", "rows", "logged")
+
+    def __init__(self, elapsed):
+        self.elapsed = elapsed
+        self.rows = 0
+        self.logged = False
+
+class _Statement:
+    __slots__ = ("count", "retired_time", "retired_rows", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.retired_time = 0.0  # Totals of executions no longer in samples
+        self.retired_rows = 0
+        self.samples = deque()
+
+def _percentile(ordered, fraction):
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+def _calling_site():
+    frame = sys._getframe(1)
+    while frame and os.path.dirname(os.path.abspath(frame.f_code.co_filename)) == _DB_PACKAGE:
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    return f"{frame.f_code.co_filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+class QueryStats:
+    """Per-statement counts, latencies and row counts for instrumented connections.
+
+    Statements are keyed by their SQL with whitespace collapsed, so the
+    same query issued from different places is counted together. Time and
+    rows include fetching, not just the execute call. Any single execution
+    slower than slow_query_ms is logged once, with its parameters and the
+    first calling frame outside the db package.
+    """
+
+    def __init__(self, slow_query_ms=None):
+        self.slow_query = slow_query_ms / 1000 if slow_query_ms is not None else None
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    def begin(self, sql, elapsed):
+        key = " ".join(sql.split())
+        execution = _Execution(elapsed)
+        with self._lock:
+            statement = self._statements.get(key)
+            if statement is None:
+                statement = self._statements[key] = _Statement()
+            statement.count += 1
+            if len(statement.samples) == SAMPLES_PER_STATEMENT:
+                retired = statement.samples.popleft()
+                statement.retired_time += retired.elapsed
+                statement.retired_rows += retired.rows
+            statement.samples.append(execution)
+        return execution
+
+    def check_slow(self, execution, sql, params):
+        if self.slow_query is None or execution.logged or execution.elapsed < self.slow_query:
+            return
+        execution.logged = True
+        logger.warning("Slow query (%.1f ms, %d rows so far) at %s: %s params=%r",
+                       execution.elapsed * 1000, execution.rows, _calling_site(), " ".join(sql.split()), params)
+
+    def snapshot(self):
+        """Return one dict per statement, slowest total time first. Times are in milliseconds."""
+        with self._lock:
+            statements = [(sql, s.count, s.retired_time, s.retired_rows, list(s.samples))
+                          for sql, s in self._statements.items()]
+        result = []
+        for sql, count, retired_time, retired_rows, samples in statements:
+            timings = sorted(e.elapsed for e in samples)
+            total = retired_time + sum(timings)
+            result.append({
+                "sql": sql,
+                "count": count,
+                "total_ms": total * 1000,
+                "mean_ms": total * 1000 / count,
+                "p50_ms": _percentile(timings, 0.50) * 1000,
+                "p95_ms": _percentile(timings, 0.95) * 1000,
+                "p99_ms": _percentile(timings, 0.99) * 1000,
+                "max_ms": timings[-1] * 1000,
+                "rows": retired_rows + sum(e.rows for e in samples),
+            })
+        result.sort(key=lambda s: s["total_ms"], reverse=True)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """A cursor that reports each execution, and the rows fetched from it, to QueryStats."""
+
+    stats = None  # Set on the subclass made by instrumented_factory()
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        self._begin(sql, parameters, time.perf_counter() - started)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        # Parameters may have been a one-shot generator, so none are logged
+        self._begin(sql, "<executemany>", time.perf_counter() - started)
+        return self
+
+    def executescript(self, sql_script):
+        started = time.perf_counter()
+        super().executescript(sql_script)
+        self._begin(sql_script, (), time.perf_counter() - started)
+        return self
+
+    def _begin(self, sql, parameters, elapsed):
+        self._sql, self._parameters = sql, parameters
+        self._execution = self.stats.begin(sql, elapsed)
+        self.stats.check_slow(self._execution, sql, parameters)
+
+    def _fetched(self, rows, elapsed):
+        execution = getattr(self, "_execution", None)
+        if execution is not None:
+            execution.elapsed += elapsed
+            execution.rows += rows
+            self.stats.check_slow(execution, self._sql, self._parameters)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(row is not None, time.perf_counter() - started)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(len(rows), time.perf_counter() - started)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(len(rows), time.perf_counter() - started)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(0, time.perf_counter() - started)
+            raise
+        self._fetched(1, time.perf_counter() - started)
+        return row
+
+class InstrumentedConnection(sqlite3.Connection):
+    cursor_class = InstrumentedCursor  # Set on the subclass made by instrumented_factory()
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or self.cursor_class)
+
+    # Connection.execute() and friends build a plain cursor internally, so
+    # route them through cursor() to have them measured too
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+def instrumented_factory(stats):
+    """Return a sqlite3.connect() factory whose connections report to stats."""
+    cursor_class = type("InstrumentedCursor", (InstrumentedCursor,), {"stats": stats})
+    return type("InstrumentedConnection", (InstrumentedConnection,), {"cursor_class": cursor_class})
@@ -0,0 +1,272 @@
+# db/repository.py
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from db.dates import to_day
+import config
+
+# One change to one row. kind is "project", "artisan", "team" or
+# "assignment"; action is "added", "updated" or "deleted"; old/new are the
+# row tuples before and after (None when the row did not/no longer exists).
+Change = namedtuple("Change", "kind action id old new")
+
+# Column positions in the SELECT * rows kept in memory
+ASSIGNMENT_ARTISAN, ASSIGNMENT_PROJECT, ASSIGNMENT_START_DAY, ASSIGNMENT_END_DAY = 1, 2, 5, 6
+ARTISAN_NAME, ARTISAN_PICTURE, ARTISAN_TEAM = 1, 4, 5
+PROJECT_STATUS, PROJECT_START_DAY, PROJECT_END_DAY = 4, 7, 8
+
+class ScheduleRepository:
+    """In-memory copy of projects, artisans, teams and assignments that tabs read and write through.
+
+    Rows are held as the same tuples Database returns, keyed by id, with
+    assignments also indexed by project and by artisan. It offers the
+    Database read and write methods the tabs use, so a tab can take either.
+    Writes go to the Database and then re-read just the rows they touched.
+    Subscribers get the resulting Change events once the outermost
+    transaction commits. If it rolls back, the touched rows are re-read and
+    no events are sent.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.projects = {}
+        self.artisans = {}
+        self.teams = {}
+        self.assignments = {}
+        self.assignments_by_project = defaultdict(set)
+        self.assignments_by_artisan = defaultdict(set)
+        self._subscribers = []
+        self._depth = 0
+        self._changes = []
+        self._touched = []
+        self._fetch = {"project": db.get_project, "artisan": db.get_artisan,
+                       "team": db.get_team, "assignment": db.get_assignment}
+        self.load()
+
+    def load(self):
+        """(Re)load every row from the database."""
+        self.projects = {row[0]: row for row in self.db.get_projects()}
+        self.artisans = {row[0]: row for row in self.db.get_artisans()}
+        self.teams = {row[0]: row for row in self.db.get_teams()}
+        self.assignments = {}
+        self.assignments_by_project.clear()
+        self.assignments_by_artisan.clear()
+        for row in self.db.get_assignments():
+            self._store("assignment", row[0], row)
+
+    def subscribe(self, callback):
+        """Call callback(changes) with the list of Change events of each committed write."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one database transaction and one batch of events."""
+        changes_marker, touched_marker = len(self._changes), len(self._touched)
+        self._depth += 1
+        try:
+            with self.db.transaction():
+                yield self
+        except BaseException:
+            self._depth -= 1
+            # The database rolled this level back; bring the rows it touched back in line
+            for kind, row_id in set(self._touched[touched_marker:]):
+                self._store(kind, row_id, self._fetch[kind](row_id))
+            del self._changes[changes_marker:]
+            del self._touched[touched_marker:]
+            raise
+        self._depth -= 1
+        if self._depth == 0:
+            changes, self._changes, self._touched = self._changes, [], []
+            if not changes:
+                return
+            for callback in list(self._subscribers):
+                try:
+                    callback(changes)
+                except Exception as e:
+                    # The write has committed; one failing view must not undo it or starve the others
+                    print(f"Error handling schedule change: {e}")
+
+    # Reads
+
+    def get_projects(self):
+        return list(self.projects.values())
+
+    def get_project(self, project_id):
+        return self.projects.get(project_id)
+
+    def get_artisans(self):
+        return list(self.artisans.values())
+
+    def get_artisan(self, artisan_id):
+        return self.artisans.get(artisan_id)
+
+    def get_teams(self):
+        return list(self.teams.values())
+
+    def get_assignments(self):
+        return list(self.assignments.values())
+
+    def get_assignments_for_artisan(self, artisan_id):
+        return sorted(self.assignments[i] for i in self.assignments_by_artisan.get(artisan_id, ()))
+
+    def get_project_artisans(self, project_id):
+        """Return (id, name) for each artisan assigned to the project."""
+        return [(a[ASSIGNMENT_ARTISAN], self.artisans[a[ASSIGNMENT_ARTISAN]][ARTISAN_NAME])
+                for a in sorted(self.assignments[i] for i in self.assignments_by_project.get(project_id, ()))]
+
+    def load_gantt_view(self, start, end, status="Active"):
+        # A whole window is cheaper to get from the indexed SQL query than
+        # by scanning every assignment here
+        return self.db.load_gantt_view(start, end, status)
+
+    def gantt_row(self, project_id, start, end, status="Active"):
+        """Return the load_gantt_view row for one project, or None if it is not in the window."""
+        start, end = to_day(start), to_day(end)
+        project = self.projects.get(project_id)
+        if project is None or project[PROJECT_STATUS] != status:
+            return None
+        assignments = sorted(
+            a for a in (self.assignments[i] for i in self.assignments_by_project.get(project_id, ()))
+            if a[ASSIGNMENT_END_DAY] >= start and a[ASSIGNMENT_START_DAY] <= end
+        )
+        if not assignments and not (project[PROJECT_END_DAY] >= start and project[PROJECT_START_DAY] <= end):
+            return None
+        team_name = None
+        rows = []
+        for a in assignments:
+            artisan = self.artisans.get(a[ASSIGNMENT_ARTISAN])
+            if artisan is None:
+                continue
+            rows.append({
+                "id": a[0], "project_id": project_id, "artisan_id": artisan[0],
+                "artisan_name": artisan[ARTISAN_NAME], "profile_picture": artisan[ARTISAN_PICTURE],
+                "start_day": a[ASSIGNMENT_START_DAY], "end_day": a[ASSIGNMENT_END_DAY],
+            })
+            team = self.teams.get(artisan[ARTISAN_TEAM])
+            if team_name is None and team is not None:
+                team_name = team[1]
+        return {
+            "id": project_id, "name": project[1], "job_number": project[5], "description": project[6],
+            "start_day": project[PROJECT_START_DAY], "end_day": project[PROJECT_END_DAY],
+            "team_name": team_name or "No Team", "assignments": rows,
+        }
+
+    # Dashboard aggregates are answered by SQL over the committed rows
+
+    def get_project_status_counts(self):
+        return self.db.get_project_status_counts()
+
+    def get_deadline_projects(self, status="Active", project_ids=None):
+        return self.db.get_deadline_projects(status, project_ids)
+
+    def get_artisan_workload(self, start, end, artisan_ids=None):
+        return self.db.get_artisan_workload(start, end, artisan_ids)
+
+    def count_available_artisans(self, day):
+        return self.db.count_available_artisans(day)
+
+    def get_recent_activities(self, limit=10):
+        return self.db.get_recent_activities(limit)
+
+    def get_activities(self, before=None, limit=50):
+        return self.db.get_activities(before, limit)
+
+    def check_conflict(self, artisan_id, start, end, hours_per_day=None, assignment_id=None):
+        # The conflict engine keeps its own per-artisan index next to the database
+        return self.db.check_conflict(artisan_id, start, end, hours_per_day, assignment_id)
+
+    def search(self, query, limit=config.SEARCH_LIMIT):
+        # The full-text index lives in the database
+        return self.db.search(query, limit)
+
+    def search_ids(self, query):
+        return self.db.search_ids(query)
+
+    # Writes
+
+    def add_project(self, name, start_date, end_date, status, job_number, description):
+        with self.transaction():
+            project_id = self.db.add_project(name, start_date, end_date, status, job_number, description)
+            self._refresh("project", project_id)
+        return project_id
+
+    def update_project(self, project_id, name, start_date, end_date, job_number, description):
+        with self.transaction():
+            self.db.update_project(project_id, name, start_date, end_date, job_number, description)
+            self._refresh("project", project_id)
+
+    def delete_project(self, project_id):
+        with self.transaction():
+            assignment_ids = list(self.assignments_by_project.get(project_id, ()))
+            self.db.delete_project(project_id)
+            for assignment_id in assignment_ids:
+                self._refresh("assignment", assignment_id)
+            self._refresh("project", project_id)
+
+    def delete_project_assignments(self, project_id):
+        with self.transaction():
+            assignment_ids = list(self.assignments_by_project.get(project_id, ()))
+            self.db.delete_project_assignments(project_id)
+            for assignment_id in assignment_ids:
+                self._refresh("assignment", assignment_id)
+
+    def add_artisan(self, name, skill, availability, profile_picture=None):
+        with self.transaction():
+            artisan_id = self.db.add_artisan(name, skill, availability, profile_picture)
+            self._refresh("artisan", artisan_id)
+        return artisan_id
+
+    def add_team(self, name):
+        with self.transaction():
+            team_id = self.db.add_team(name)
+            self._refresh("team", team_id)
+        return team_id
+
+    def add_assignment(self, artisan_id, project_id, start_date, end_date, hours_per_day=None):
+        with self.transaction():
+            assignment_id = self.db.add_assignment(artisan_id, project_id, start_date, end_date, hours_per_day)
+            self._refresh("assignment", assignment_id)
+        return assignment_id
+
+    def update_assignment(self, assignment_id, start_date, end_date):
+        with self.transaction():
+            self.db.update_assignment(assignment_id, start_date, end_date)
+            self._refresh("assignment", assignment_id)
+
+    def update_artisan_team(self, artisan_id, team_id):
+        with self.transaction():
+            self.db.update_artisan_team(artisan_id, team_id)
+            self._refresh("artisan", artisan_id)
+
+    # Internals
+
+    def _refresh(self, kind, row_id):
+        """Re-read one row after a write and record the change it made."""
+        self._touched.append((kind, row_id))
+        old = self._store(kind, row_id, self._fetch[kind](row_id))
+        new = self._table(kind).get(row_id)
+        if old == new:
+            return
+        action = "added" if old is None else "deleted" if new is None else "updated"
+        self._changes.append(Change(kind, action, row_id, old, new))
+
+    def _table(self, kind):
+        return {"project": self.projects, "artisan": self.artisans,
+                "team": self.teams, "assignment": self.assignments}[kind]
+
+    def _store(self, kind, row_id, row):
+        """Put row (or its absence, for None) into the maps and indexes; return the previous row."""
+        table = self._table(kind)
+        old = table.pop(row_id, None) if row is None else table.get(row_id)
+        if kind == "assignment" and old is not None:
+            self.assignments_by_project[old[ASSIGNMENT_PROJECT]].discard(row_id)
+            self.assignments_by_artisan[old[ASSIGNMENT_ARTISAN]].discard(row_id)
+        if row is not None:
+            table[row_id] = row
+            if kind == "assignment":
+                self.assignments_by_project[row[ASSIGNMENT_PROJECT]].add(row_id)
+                self.assignments_by_artisan[row[ASSIGNMENT_ARTISAN]].add(row_id)
+        return old
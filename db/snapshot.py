@@ -0,0 +1,217 @@
+# db/snapshot.py
+import json
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from contextlib import contextmanager
+import config
+
+# Tables a snapshot carries, in the order they are written and restored.
+# import_checkpoints is transient, search_index is filled by the triggers,
+# and the activity archive stays with the file it belongs to.
+SNAPSHOT_TABLES = ("users", "teams", "artisans", "projects", "assignments", "artisan_day_load", "activity_log")
+
+# File layout: MAGIC, then a length-prefixed JSON header, then one block
+# per chunk of rows. A block is the table's index and row count followed by
+# one zlib-compressed payload per column, each prefixed with its type and
+# length. Nothing is read that is not needed, so the file can be mapped.
+MAGIC = b"GANTTSNP"
+FORMAT_VERSION = 1
+LENGTH = struct.Struct("<Q")
+BLOCK = struct.Struct("<II")           # table index, row count
+COLUMN = struct.Struct("<ccQ")         # column type, has-nulls flag, payload length
+
+# Column types. Whole chunks of one column share a type, so each column is
+# stored as one packed array rather than value by value.
+INTEGER, REAL, TEXT, BLOB, MIXED = b"i", b"f", b"s", b"b", b"j"
+NULL = type(None)
+
+def export_snapshot(db, path, chunk_size=config.SNAPSHOT_CHUNK_SIZE):
+    """Write every SNAPSHOT_TABLES row to path; return {table: rows written}.
+
+    The tables are read in one read transaction, so the snapshot is
+    consistent even while edits continue on other threads.
+    """
+    counts = {}
+    with open(path, "wb") as f, _read_transaction(db) as conn:
+        tables = [(table, [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]) for table in SNAPSHOT_TABLES]
+        header = json.dumps({
+            "format": FORMAT_VERSION, "schema_version": _schema_version(conn), "byteorder": sys.byteorder,
+            "tables": [{"name": table, "columns": columns} for table, columns in tables],
+        }).encode("utf-8")
+        f.write(MAGIC + LENGTH.pack(len(header)) + header)
+        for index, (table, columns) in enumerate(tables):
+            cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {table}")
+            counts[table] = 0
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                f.write(BLOCK.pack(index, len(rows)))
+                for values in zip(*rows):
+                    kind, has_nulls, payload = _encode_column(values)
+                    payload = zlib.compress(payload, 1)
+                    f.write(COLUMN.pack(kind, has_nulls, len(payload)) + payload)
+                counts[table] += len(rows)
+    return counts
+
+def import_snapshot(db, path):
+    """Replace the contents of every SNAPSHOT_TABLES table with the rows in the snapshot at path.
+
+    The file is memory-mapped and restored with executemany in one
+    transaction, so a failure leaves the database as it was. Snapshots
+    from a different schema version are refused with a ValueError.
+    The local activity archive is kept, so activity_log ids are shifted
+    above the archive's highest id rather than clash with it.
+    Returns {table: rows restored}.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        data = memoryview(mapped)
+        try:
+            header, offset = _read_header(data, path)
+            schema_version = _schema_version(db.conn)
+            if header["schema_version"] != schema_version:
+                raise ValueError(f"Snapshot '{path}' is from schema version {header['schema_version']}; "
+                                 f"this database is at version {schema_version}")
+            swap = header["byteorder"] != sys.byteorder
+            tables = [(table["name"], table["columns"]) for table in header["tables"]]
+            for table, columns in tables:
+                # The names go into SQL, so only ours are accepted
+                known = {row[1] for row in db.conn.execute(f"PRAGMA table_info({table})")} if table in SNAPSHOT_TABLES else set()
+                if not known or not set(columns) <= known:
+                    raise ValueError(f"Snapshot '{path}' has a table '{table}' that does not match this database")
+            counts = {table: 0 for table, _ in tables}
+            activity_offset = (db.conn.execute("SELECT COALESCE(MAX(id), 0) FROM archive.activity_log").fetchone()[0]
+                               if db.archive_path else 0)
+            with db.transaction():
+                # Filling the tables with their indexes and triggers dropped, then
+                # recreating them, sorts each index once instead of row by row
+                deferred = db.conn.execute(
+                    "SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL "
+                    "AND tbl_name IN (SELECT value FROM json_each(?))", (json.dumps([table for table, _ in tables]),)
+                ).fetchall()
+                for kind, name, _ in deferred:
+                    db.conn.execute(f"DROP {kind} {name}")
+                for table, _ in tables:
+                    db.conn.execute(f"DELETE FROM {table}")
+                while offset < len(data):
+                    index, row_count = BLOCK.unpack_from(data, offset)
+                    offset += BLOCK.size
+                    table, columns = tables[index]
+                    values = []
+                    for _ in columns:
+                        kind, has_nulls, length = COLUMN.unpack_from(data, offset)
+                        offset += COLUMN.size
+                        payload = zlib.decompress(data[offset:offset + length])
+                        offset += length
+                        values.append(_decode_column(kind, has_nulls == b"\x01", payload, row_count, swap))
+                    if table == "activity_log" and activity_offset and "id" in columns:
+                        ids = columns.index("id")
+                        values[ids] = [value + activity_offset for value in values[ids]]
+                    db.conn.executemany(
+                        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                        zip(*values)
+                    )
+                    counts[table] += row_count
+                for _, _, sql in deferred:
+                    db.conn.execute(sql)
+                db.rebuild_search_index()
+        finally:
+            data.release()
+    return counts
+
+def _read_header(data, path):
+    if bytes(data[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"'{path}' is not a schedule snapshot")
+    offset = len(MAGIC)
+    (length,) = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+    header = json.loads(bytes(data[offset:offset + length]))
+    if header.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Snapshot '{path}' uses format {header.get('format')}; expected {FORMAT_VERSION}")
+    return header, offset + length
+
+def _schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+@contextmanager
+def _read_transaction(db):
+    # One read transaction on the calling thread's reader. On a :memory:
+    # database, or inside a write transaction, that reader is the writer,
+    # so take (or nest in) a write transaction instead.
+    conn = db._reader()
+    if conn is db.conn:
+        with db.transaction():
+            yield conn
+        return
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        conn.execute("COMMIT")
+
+def _encode_column(values):
+    """Return (type, has-nulls flag, payload) for one chunk of a column.
+
+    Packed types start with a one-byte-per-row NULL mask when the chunk has
+    NULLs (it compresses to almost nothing); the NULLs themselves are
+    packed as zeros or empty strings.
+    """
+    present = set(map(type, values))
+    has_nulls = NULL in present
+    present.discard(NULL)
+    if present <= {int}:
+        kind = INTEGER
+    elif present <= {int, float}:
+        kind = REAL
+    elif present == {str}:
+        kind = TEXT
+    elif present == {bytes}:
+        kind = BLOB
+    elif bytes in present:
+        raise ValueError("Cannot snapshot a column mixing blobs with other values")
+    else:
+        return MIXED, b"\x00", json.dumps(list(values)).encode("utf-8")
+    mask = b""
+    if has_nulls:
+        mask = bytes(value is None for value in values)
+        empty = {INTEGER: 0, REAL: 0.0, TEXT: "", BLOB: b""}[kind]
+        values = [empty if value is None else value for value in values]
+    if kind == INTEGER:
+        payload = array("q", values).tobytes()
+    elif kind == REAL:
+        payload = array("d", values).tobytes()
+    else:
+        if kind == TEXT:
+            values = [value.encode("utf-8") for value in values]
+        payload = array("q", map(len, values)).tobytes() + b"".join(values)
+    return kind, b"\x01" if has_nulls else b"\x00", mask + payload
+
+def _decode_column(kind, has_nulls, payload, row_count, swap):
+    if kind == MIXED:
+        return json.loads(payload)
+    mask = payload[:row_count] if has_nulls else None
+    payload = memoryview(payload)[row_count:] if has_nulls else memoryview(payload)
+    if kind in (INTEGER, REAL):
+        values = array("q" if kind == INTEGER else "d")
+        values.frombytes(payload)
+        if swap:
+            values.byteswap()
+    else:
+        lengths = array("q")
+        lengths.frombytes(payload[:8 * row_count])
+        if swap:
+            lengths.byteswap()
+        data = bytes(payload[8 * row_count:])
+        values = []
+        position = 0
+        for length in lengths:
+            values.append(data[position:position + length])
+            position += length
+        if kind == TEXT:
+            values = [value.decode("utf-8") for value in values]
+    if mask is None:
+        return values
+    return [None if null else value for null, value in zip(mask, values)]
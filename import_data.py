@@ -0,0 +1,29 @@
+# import_data.py
+import argparse
+from db.database import Database
+from db.importer import KINDS
+import config
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import teams, artisans, projects or assignments.")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("source", help="CSV or JSON-lines file; an interrupted import of the same file resumes")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="Defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=config.IMPORT_CHUNK_SIZE)
+    parser.add_argument("--db", default=config.DATABASE_PATH)
+    args = parser.parse_args()
+
+    def progress(line, imported, skipped):
+        print(f"Line {line}: {imported} imported, {skipped} skipped")
+
+    db = Database(db_path=args.db)
+    try:
+        summary = db.bulk_import(args.kind, args.source, args.format, args.chunk_size, progress)
+    finally:
+        db.close()
+    for line, error in summary["errors"]:
+        print(f"Line {line}: {error}")
+    print(f"Imported {summary['imported']} {args.kind}, skipped {summary['skipped']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# maintenance.py
+import argparse
+from db.backup import BackupScheduler
+from db.database import Database
+import config
+
+def rebuild_day_load(db, args):
+    db.rebuild_artisan_day_load()
+    rows = db.conn.execute("SELECT COUNT(*) FROM artisan_day_load").fetchone()[0]
+    print(f"Rebuilt artisan_day_load: {rows} artisan-days")
+
+def rebuild_search(db, args):
+    if not db.has_fts:
+        print("This SQLite has no FTS5; search falls back to LIKE and needs no index")
+        return
+    db.rebuild_search_index()
+    rows = db.conn.execute("SELECT COUNT(*) FROM search_index").fetchone()[0]
+    print(f"Rebuilt search_index: {rows} projects, artisans and teams")
+
+def archive_activity(db, args):
+    if not db.archive_path:
+        print("No archive database for this database")
+        return
+    days = config.ACTIVITY_RETENTION_DAYS if args.days is None else args.days
+    if days is None:
+        print("Activity retention is off; pass --days to archive anyway")
+        return
+    moved = 0
+    while True:
+        batch = db.archive_activities(days)
+        moved += batch
+        if batch < config.ACTIVITY_ARCHIVE_BATCH_SIZE:
+            break
+    print(f"Archived {moved} activity entries to {db.archive_path}")
+
+def hash_passwords(db, args):
+    print(f"Hashed {db.hash_plaintext_passwords()} plaintext passwords")
+
+def backup(db, args):
+    print(f"Backed up to {BackupScheduler(db).backup_now()}")
+
+def export_snapshot(db, args):
+    counts = db.export_snapshot(args.path)
+    print(f"Exported {', '.join(f'{rows} {table}' for table, rows in counts.items())} to {args.path}")
+
+def import_snapshot(db, args):
+    counts = db.import_snapshot(args.path)
+    print(f"Imported {', '.join(f'{rows} {table}' for table, rows in counts.items())} from {args.path}")
+
+COMMANDS = {
+    "rebuild-day-load": (rebuild_day_load, "Recompute artisan_day_load from the assignments table"),
+    "rebuild-search": (rebuild_search, "Recompute the full-text search index from projects, artisans and teams"),
+    "archive-activity": (archive_activity, "Move activity entries past the retention period into the archive database"),
+    "backup": (backup, "Take a verified backup now, rotating old ones as the app does"),
+    "hash-passwords": (hash_passwords, "Replace plaintext passwords (e.g. from add_users.py) with bcrypt hashes"),
+    "export-snapshot": (export_snapshot, "Write the whole schedule to a compressed snapshot file"),
+    "import-snapshot": (import_snapshot, "Replace the whole schedule with the contents of a snapshot file"),
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Database maintenance tasks.")
+    parser.add_argument("--db", default=config.DATABASE_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        commands.add_parser(name, help=help_text)
+    commands.choices["archive-activity"].add_argument(
+        "--days", type=int, help=f"Retention period in days (default: {config.ACTIVITY_RETENTION_DAYS})")
+    for name in ("export-snapshot", "import-snapshot"):
+        commands.choices[name].add_argument("path", help="Snapshot file")
+    args = parser.parse_args()
+
+    db = Database(db_path=args.db)
+    try:
+        COMMANDS[args.command][0](db, args)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
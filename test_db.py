@@ -1,5 +1,69 @@
 # test_db.py
+import json
+import os
+import sqlite3
+import threading
+from datetime import date
+import pytest
+import config
+from db.auth import is_hashed
+from db.backup import BackupScheduler
+from db.conflicts import ArtisanLoad, ConflictError
 from db.database import Database
+from db.edit_buffer import EditBuffer
+from db.repository import ScheduleRepository
+
+# Keep the bcrypt hashing every new database does for its default user cheap
+config.BCRYPT_ROUNDS = 4
+
+# Queries run on every calendar/dashboard refresh; none of them may fall back
+# to a full table scan.
+HOT_QUERIES = [
+    ("SELECT * FROM assignments WHERE project_id = ?", (1,)),
+    ("DELETE FROM assignments WHERE project_id = ?", (1,)),
+    ("SELECT team_id FROM artisans WHERE id IN (SELECT artisan_id FROM assignments WHERE project_id = ?)", (1,)),
+    ("SELECT a.id, a.name FROM artisans a JOIN assignments ass ON a.id = ass.artisan_id WHERE ass.project_id = ?", (1,)),
+    ("SELECT * FROM assignments WHERE artisan_id = ?", (1,)),
+    ("SELECT * FROM assignments WHERE artisan_id = ? AND start_day <= ? AND end_day >= ?", (1, 739432, 739403)),
+    ("SELECT id, name FROM artisans WHERE team_id = ?", (1,)),
+    ("SELECT * FROM projects WHERE status = ? AND end_day BETWEEN ? AND ?", ("Active", 739403, 739410)),
+    # Database.get_activities, first and later pages
+    ("SELECT * FROM (SELECT id, action, details, timestamp FROM main.activity_log ORDER BY timestamp DESC, id DESC LIMIT ?) "
+     "UNION SELECT * FROM (SELECT id, action, details, timestamp FROM archive.activity_log ORDER BY timestamp DESC, id DESC LIMIT ?) "
+     "ORDER BY timestamp DESC, id DESC LIMIT ?", (10, 10, 10)),
+    ("SELECT id, action, details, timestamp FROM archive.activity_log WHERE (timestamp, id) < (?, ?) "
+     "ORDER BY timestamp DESC, id DESC LIMIT ?", ("2025-06-01 00:00:00", 5, 10)),
+    ("SELECT id FROM main.activity_log WHERE timestamp < ? ORDER BY timestamp, id LIMIT ?", ("2025-06-01 00:00:00", 1000)),
+    # Gantt window queries (get_assignments_in_range / get_projects_in_range)
+    ("SELECT * FROM assignments WHERE end_day >= ? AND start_day <= ?", (739403, 739444)),
+    ("SELECT * FROM assignments WHERE end_day >= ? AND start_day <= ? AND project_id IN (SELECT value FROM json_each(?))",
+     (739403, 739444, "[1, 2]")),
+    ("SELECT * FROM projects WHERE id IN (SELECT id FROM projects WHERE status = ? AND end_day >= ? AND start_day <= ? "
+     "UNION SELECT project_id FROM assignments WHERE end_day >= ? AND start_day <= ?) AND +status = ? ORDER BY id",
+     ("Active", 739403, 739444, 739403, 739444, "Active")),
+    # Database.load_gantt_view
+    ("WITH visible(id) AS (SELECT id FROM projects WHERE status = ? AND end_day >= ? AND start_day <= ? "
+     "UNION SELECT project_id FROM assignments WHERE end_day >= ? AND start_day <= ?) "
+     "SELECT p.id, a.id, ar.name, t.name FROM visible JOIN projects p ON p.id = visible.id AND +p.status = ? "
+     "LEFT JOIN assignments a ON a.project_id = p.id AND a.end_day >= ? AND a.start_day <= ? "
+     "LEFT JOIN artisans ar ON ar.id = a.artisan_id LEFT JOIN teams t ON t.id = ar.team_id ORDER BY p.id, a.id",
+     ("Active", 739403, 739444, 739403, 739444, "Active", 739403, 739444)),
+    # Dashboard aggregates (the workload query lists every artisan, so it scans them by design)
+    ("SELECT status, COUNT(*) FROM projects GROUP BY status", ()),
+    ("SELECT p.id, p.name, p.end_date, COALESCE(group_concat(ar.name, ', '), 'None'), p.end_day FROM projects p "
+     "LEFT JOIN assignments a ON a.project_id = p.id LEFT JOIN artisans ar ON ar.id = a.artisan_id "
+     "WHERE p.status = ? GROUP BY p.id ORDER BY p.id", ("Active",)),
+    ("SELECT COUNT(*) FROM artisans ar WHERE NOT EXISTS "
+     "(SELECT 1 FROM artisan_day_load l WHERE l.artisan_id = ar.id AND l.day = ?)", (739403,)),
+    ("SELECT day, assignment_count, hours FROM artisan_day_load WHERE artisan_id = ? AND day BETWEEN ? AND ? ORDER BY day",
+     (1, 739403, 739432)),
+]
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(db_path=str(tmp_path / "gantt.db"))
+    yield database
+    database.close()
 
 def test_db_creation():
     db = Database(db_path="gantt.db")
@@ -8,5 +72,608 @@ def test_db_creation():
     print("Tables in database:", tables)
     db.close()
 
+def full_table_scans(db, sql, params):
+    plan = db.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    details = [row[3] for row in plan]
+    # Scanning a json_each() id list, a materialized CTE or a (LIMITed)
+    # subquery's rows is fine; scanning a table is not
+    materialized = {d.split()[1] for d in details if d.startswith("MATERIALIZE")}
+    return [d for d in details
+            if d.startswith("SCAN") and "USING" not in d and "VIRTUAL TABLE" not in d
+            and not d.startswith("SCAN (subquery") and d.split()[1] not in materialized]
+
+@pytest.mark.parametrize("sql, params", HOT_QUERIES)
+def test_hot_queries_use_indexes(db, sql, params):
+    assert full_table_scans(db, sql, params) == []
+
+def test_transaction_commits_once(db):
+    statements = []
+    # Only count this thread's statements; the activity writer shares the connection
+    caller = threading.get_ident()
+    db.conn.set_trace_callback(lambda sql: threading.get_ident() == caller and statements.append(sql))
+    with db.transaction():
+        project_id = db.add_project("Roof", "2025-06-02", "2025-06-06", "Active", "J1", "")
+        team_id = db.add_team("Crew")
+        for name in ("Ann", "Ben"):
+            artisan_id = db.add_artisan(name, "Roofer", "Available")
+            db.add_assignment(artisan_id, project_id, "2025-06-02", "2025-06-06")
+            db.update_artisan_team(artisan_id, team_id)
+    db.conn.set_trace_callback(None)
+    assert statements.count("COMMIT") == 1
+    assert len(db.get_assignments()) == 2
+
+def test_transaction_rolls_back_on_error(db):
+    with pytest.raises(ValueError):
+        with db.transaction():
+            db.add_project("Roof", "2025-06-02", "2025-06-06", "Active", "J1", "")
+            raise ValueError("boom")
+    assert db.get_projects() == []
+    assert db.get_recent_activities() == []
+
+def test_nested_transaction_rolls_back_to_savepoint(db):
+    with db.transaction():
+        db.add_project("Kept", "2025-06-02", "2025-06-06", "Active", "J1", "")
+        with pytest.raises(ValueError):
+            with db.transaction():
+                db.add_project("Dropped", "2025-06-02", "2025-06-06", "Active", "J2", "")
+                raise ValueError("boom")
+    assert [p[1] for p in db.get_projects()] == ["Kept"]
+
+def test_wal_readers_run_alongside_writer(db):
+    assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    db.add_project("Committed", "2025-06-02", "2025-06-06", "Active", "J1", "")
+    seen = []
+    with db.transaction():
+        db.add_project("Pending", "2025-06-02", "2025-06-06", "Active", "J2", "")
+        # A worker thread reads the last committed snapshot without waiting
+        worker = threading.Thread(target=lambda: seen.extend(p[1] for p in db.get_projects()))
+        worker.start()
+        worker.join(timeout=5)
+        assert not worker.is_alive()
+        assert len(db.get_projects()) == 2
+    assert seen == ["Committed"]
+
+def test_short_lived_threads_do_not_keep_readers(db):
+    db.add_project("Roof", "2025-06-02", "2025-06-06", "Active", "J1", "")
+
+    def login():
+        try:
+            db.get_projects()
+        finally:
+            db.release_reader()
+
+    def forgetful():
+        db.get_projects()
+
+    for target in [login] * 3 + [forgetful] * 3:
+        worker = threading.Thread(target=target)
+        worker.start()
+        worker.join(timeout=5)
+    # Released readers are gone; of the forgetful threads' readers only the last outlives its thread
+    assert len(db.pool._readers) == 1
+    db.get_projects()
+    assert list(db.pool._readers) == [threading.current_thread()]
+
+def test_day_columns_follow_text_dates(db):
+    project_id = db.add_project("Roof", "2025-06-02", "2025-06-06", "Active", "J1", "")
+    artisan_id = db.add_artisan("Ann", "Roofer", "Available")
+    assignment_id = db.add_assignment(artisan_id, project_id, "2025-06-02", "2025-06-06")
+    db.update_assignment(assignment_id, "2025-06-03", "2025-06-09")
+    assert db.get_assignment_spans() == [
+        (assignment_id, artisan_id, project_id, date(2025, 6, 3).toordinal(), date(2025, 6, 9).toordinal())
+    ]
+    assert db.get_project_spans("Active")[0][3:] == (date(2025, 6, 2).toordinal(), date(2025, 6, 6).toordinal())
+    with pytest.raises(ValueError):
+        db.add_project("Bad", "06/02/2025", "2025-06-06", "Active", "J2", "")
+
+def test_migration_backfills_day_columns(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE projects (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, start_date TEXT NOT NULL,
+                               end_date TEXT NOT NULL, status TEXT NOT NULL, job_number TEXT, description TEXT);
+        INSERT INTO projects (name, start_date, end_date, status) VALUES ('Old', '2024-12-30', '2025-01-02', 'Active');
+        CREATE TABLE assignments (id INTEGER PRIMARY KEY AUTOINCREMENT, artisan_id INTEGER NOT NULL,
+                                  project_id INTEGER NOT NULL, start_date TEXT NOT NULL, end_date TEXT NOT NULL);
+        INSERT INTO assignments (artisan_id, project_id, start_date, end_date) VALUES (1, 1, '2024-12-31', '2025-01-01');
+        CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL UNIQUE, password TEXT NOT NULL);
+        INSERT INTO users (username, password) VALUES ('old_user', 'secret');
+    ''')
+    conn.commit()
+    conn.close()
+    db = Database(db_path=path)
+    assert is_hashed(db.conn.execute("SELECT password FROM users WHERE username = 'old_user'").fetchone()[0])
+    assert db.get_user("old_user", "secret")["username"] == "old_user"
+    assert db.get_project_spans() == [(1, "Old", "Active", date(2024, 12, 30).toordinal(), date(2025, 1, 2).toordinal())]
+    day = date(2024, 12, 31).toordinal()
+    assert db.get_artisan_day_load(1, day - 5, day + 5) == [(day, 1, 8), (day + 1, 1, 8)]
+    assert db.search("old") == [("project", 1, "Old")]
+    db.close()
+
+def test_range_queries_return_only_overlapping_rows(db):
+    ann = db.add_artisan("Ann", "Roofer", "Available")
+    ben = db.add_artisan("Ben", "Plumber", "Available")
+    june = db.add_project("June", "2025-06-02", "2025-06-06", "Active", "J1", "")
+    may = db.add_project("May", "2025-05-05", "2025-05-09", "Active", "J2", "")
+    held = db.add_project("Held", "2025-06-02", "2025-06-06", "On Hold", "J3", "")
+    db.add_assignment(ann, june, "2025-06-02", "2025-06-06")
+    db.add_assignment(ben, june, "2025-06-05", "2025-06-12")
+    # Dragged out of the project's own dates into the window, part-time so Ann stays under the hours cap
+    db.add_assignment(ann, may, "2025-05-30", "2025-06-03", hours_per_day=4)
+    db.add_assignment(ben, may, "2025-05-05", "2025-05-09")
+
+    window = (date(2025, 6, 1), "2025-06-30")
+    assert [p[1] for p in db.get_projects_in_range(*window, status="Active")] == ["June", "May"]
+    assert [p[1] for p in db.get_projects_in_range(*window)] == ["June", "May", "Held"]
+    assert len(db.get_assignments_in_range(*window)) == 3
+    assert {a[1] for a in db.get_assignments_in_range(*window, artisan_ids=[ben])} == {ben}
+    assert {a[2] for a in db.get_assignments_in_range(*window, project_ids=[may])} == {may}
+    assert db.get_assignments_in_range(*window, project_ids=[held]) == []
+
+def test_load_gantt_view_groups_rows(db):
+    crew = db.add_team("Crew")
+    ann = db.add_artisan("Ann", "Roofer", "Available", "ann.png")
+    ben = db.add_artisan("Ben", "Plumber", "Available")
+    db.update_artisan_team(ben, crew)
+    roof = db.add_project("Roof", "2025-06-02", "2025-06-06", "Active", "J1", "Tiles")
+    empty = db.add_project("Empty", "2025-06-10", "2025-06-12", "Active", "J2", "")
+    db.add_project("Done", "2025-06-10", "2025-06-12", "Completed", "J3", "")
+    db.add_assignment(ann, roof, "2025-06-02", "2025-06-06")
+    db.add_assignment(ben, roof, "2025-06-04", "2025-06-06")
+    db.add_assignment(ann, roof, "2025-04-01", "2025-04-04")  # outside the window
+
+    rows = db.load_gantt_view("2025-06-01", "2025-07-12")
+    assert [r["id"] for r in rows] == [roof, empty]
+    assert rows[0]["team_name"] == "Crew"
+    assert [(a["artisan_name"], a["profile_picture"]) for a in rows[0]["assignments"]] == [("Ann", "ann.png"), ("Ben", None)]
+    assert rows[1]["team_name"] == "No Team" and rows[1]["assignments"] == []
+
+def test_activity_log_is_batched_and_flushed_on_close(tmp_path):
+    path = str(tmp_path / "gantt.db")
+    db = Database(db_path=path)
+    statements = []
+    caller = threading.get_ident()
+    db.conn.set_trace_callback(lambda sql: threading.get_ident() == caller and statements.append(sql))
+    with db.transaction():
+        ann = db.add_artisan("Ann", "Roofer", "Available")
+        roof = db.add_project("Roof", "2025-06-02", "2025-06-06", "Active", "J1", "")
+        assignment_id = db.add_assignment(ann, roof, "2025-06-02", "2025-06-06")
+    db.update_assignment(assignment_id, "2025-06-03", "2025-06-07")
+    # No per-entry inserts or name lookups on the caller's thread
+    assert not [sql for sql in statements if "activity_log" in sql or "SELECT name" in sql]
+    db.conn.set_trace_callback(None)
+    db.close()
+
+    db = Database(db_path=path)
+    details = sorted(row[1] for row in db.get_recent_activities())
+    assert details == [
+        "Artisan 'Ann' (ID: 1) added",
+        "Artisan 'Ann' assigned to project 'Roof' (Assignment ID: 1)",
+        "Assignment for artisan 'Ann' on project 'Roof' updated (ID: 1)",
+        "Project 'Roof' (ID: 1) added",
+    ]
+    db.close()
+
+def test_bulk_import_resolves_names_and_resumes(db, tmp_path):
+    teams = tmp_path / "teams.csv"
+    teams.write_text("name\nCrew\n")
+    artisans = tmp_path / "artisans.csv"
+    artisans.write_text("name,skill,team\nAnn,Roofer,Crew\nBen,Mason,\nCid,Painter,Nobody\n")
+    assert db.bulk_import("teams", str(teams))["imported"] == 1
+    summary = db.bulk_import("artisans", str(artisans))
+    assert (summary["imported"], summary["skipped"]) == (2, 1)
+    assert summary["errors"] == [(4, "Unknown team 'Nobody'")]
+
+    projects = tmp_path / "projects.jsonl"
+    projects.write_text("\n".join(json.dumps(p) for p in [
+        {"name": "Roof", "start_date": "2025-06-02", "end_date": "2025-06-06", "job_number": "J1"},
+        {"name": "Wall", "start_date": "2025-06-10", "end_date": "2025-06-01"},
+        {"name": "Deck", "start_date": "2025-07-01", "end_date": "2025-07-04"},
+        {"name": "Shed", "start_date": "2025-08-01", "end_date": "2025-08-03"},
+    ]))
+
+    def interrupt(line, imported, skipped):
+        raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        db.bulk_import("projects", str(projects), chunk_size=2, progress=interrupt)
+    # The first chunk was committed; the rerun picks up after it
+    summary = db.bulk_import("projects", str(projects), chunk_size=2)
+    assert (summary["imported"], summary["skipped"]) == (3, 1)
+    assert [p[1] for p in db.get_projects()] == ["Roof", "Deck", "Shed"]
+    assert db.get_project_spans()[0][3:] == (date(2025, 6, 2).toordinal(), date(2025, 6, 6).toordinal())
+
+    assignments = tmp_path / "assignments.jsonl"
+    assignments.write_text(json.dumps({"artisan": "Ann", "project": "J1",
+                                       "start_date": "2025-06-02", "end_date": "2025-06-04"}))
+    assert db.bulk_import("assignments", str(assignments))["imported"] == 1
+    assert db.get_assignment_spans()[0][1:3] == (1, 1)
+    assert len(db.get_artisan_day_load(1, "2025-06-01", "2025-06-30")) == 3
+
+def test_bulk_import_rejects_non_objects_and_non_string_dates(db, tmp_path):
+    projects = tmp_path / "projects.jsonl"
+    projects.write_text("\n".join(json.dumps(p) for p in [
+        ["Roof", "2025-06-02", "2025-06-06"],
+        42,
+        {"name": "Wall", "start_date": 20250601, "end_date": 20250605},
+        {"name": "Deck", "start_date": "2025-07-01", "end_date": "2025-07-04"},
+    ]))
+    summary = db.bulk_import("projects", str(projects))
+    assert (summary["imported"], summary["skipped"]) == (1, 3)
+    assert summary["errors"] == [(1, "Expected an object, got list"), (2, "Expected an object, got int"),
+                                 (3, "'start_date' must be a 'YYYY-MM-DD' string")]
+    assert [p[1] for p in db.get_projects()] == ["Deck"]
+
+def test_query_stats_and_slow_query_log(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(config, "QUERY_STATS", True)
+    db = Database(db_path=str(tmp_path / "gantt.db"))
+    try:
+        db.add_artisan("Ann", "Roofer", "Available")
+        db.add_artisan("Ben", "Mason", "Available")
+        db.reset_stats()
+        for _ in range(3):
+            db.get_artisans()
+        [entry] = [s for s in db.stats() if s["sql"] == "SELECT * FROM artisans"]
+        assert entry["count"] == 3 and entry["rows"] == 6
+        assert entry["p50_ms"] <= entry["p95_ms"] <= entry["max_ms"]
+
+        db.query_stats.slow_query = 0  # Log everything
+        with caplog.at_level("WARNING", logger="gantt.db.slow_query"):
+            db.get_project(42)
+        [record] = caplog.records
+        assert "params=(42,)" in record.getMessage()
+        assert "test_db.py" in record.getMessage()  # The caller, not the db package
+    finally:
+        db.close()
+
+def test_repository_emits_changes_after_commit(db):
+    repo = ScheduleRepository(db)
+    received = []
+    repo.subscribe(received.append)
+    with repo.transaction():
+        ann = repo.add_artisan("Ann", "Roofer", "Available")
+        roof = repo.add_project("Roof", "2025-06-02", "2025-06-06", "Active", "J1", "")
+        assignment_id = repo.add_assignment(ann, roof, "2025-06-02", "2025-06-06")
+        assert received == []  # Nothing until the outermost commit
+    assert [(c.kind, c.action) for c in received[0]] == [("artisan", "added"), ("project", "added"), ("assignment", "added")]
+
+    repo.update_assignment(assignment_id, "2025-06-03", "2025-06-09")
+    [change] = received[1]
+    assert (change.kind, change.action, change.old[5], change.new[5]) == (
+        "assignment", "updated", date(2025, 6, 2).toordinal(), date(2025, 6, 3).toordinal())
+    assert repo.gantt_row(roof, "2025-06-08", "2025-06-20")["assignments"][0]["end_day"] == date(2025, 6, 9).toordinal()
+
+    with pytest.raises(ValueError):
+        with repo.transaction():
+            repo.delete_project(roof)
+            raise ValueError("cancelled")
+    assert len(received) == 2
+    assert repo.get_project(roof) and repo.assignments_by_project[roof] == {assignment_id}
+
+    repo.delete_project(roof)
+    assert [(c.kind, c.action) for c in received[2]] == [("assignment", "deleted"), ("project", "deleted")]
+    assert repo.get_assignments() == db.get_assignments() == []
+
+def test_dashboard_aggregates(db):
+    ann = db.add_artisan("Ann", "Roofer", "Available")
+    ben = db.add_artisan("Ben", "Mason", "Available")
+    db.add_artisan("Cid", "Painter", "Available")
+    roof = db.add_project("Roof", "2025-06-02", "2025-06-06", "Active", "J1", "")
+    wall = db.add_project("Wall", "2025-06-10", "2025-06-12", "Active", "J2", "")
+    db.add_project("Done", "2025-05-01", "2025-05-02", "Completed", "J3", "")
+    db.add_assignment(ann, roof, "2025-06-01", "2025-06-06")
+    db.add_assignment(ben, roof, "2025-06-04", "2025-06-06")
+    db.add_assignment(ann, wall, "2025-06-10", "2025-07-30")
+
+    assert db.get_project_status_counts() == {"Active": 2, "Completed": 1}
+    deadlines = db.get_deadline_projects()
+    assert [(d[0], sorted(d[3].split(", "))) for d in deadlines] == [(roof, ["Ann", "Ben"]), (wall, ["Ann"])]
+    assert db.get_deadline_projects(project_ids=[wall])[0][1:] == ("Wall", "2025-06-12", "Ann", date(2025, 6, 12).toordinal())
+    # Window 2025-06-05 .. 2025-07-05: Ann has 2 days on Roof plus 26 on Wall
+    start = date(2025, 6, 5)
+    assert db.get_artisan_workload(start, start.toordinal() + 30) == [
+        (ann, "Ann", 2, 28), (ben, "Ben", 1, 2), (3, "Cid", 0, 0)]
+    assert db.count_available_artisans("2025-06-05") == 1
+    assert db.count_available_artisans("2025-06-08") == 3
+
+def test_artisan_day_load_follows_assignment_writes(db):
+    ann = db.add_artisan("Ann", "Roofer", "Available")
+    roof = db.add_project("Roof", "2025-06-02", "2025-06-06", "Active", "J1", "")
+    wall = db.add_project("Wall", "2025-06-04", "2025-06-08", "Active", "J2", "")
+    first = db.add_assignment(ann, roof, "2025-06-02", "2025-06-04")
+    db.add_assignment(ann, wall, "2025-06-04", "2025-06-05", hours_per_day=4)
+    day = date(2025, 6, 2).toordinal()
+    assert db.get_artisan_day_load(ann, day, day + 10) == [
+        (day, 1, 8), (day + 1, 1, 8), (day + 2, 2, 12), (day + 3, 1, 4)]
+
+    db.update_assignment(first, "2025-06-05", "2025-06-05")
+    assert db.get_artisan_day_load(ann, day, day + 10) == [(day + 2, 1, 4), (day + 3, 2, 12)]
+
+    db.delete_project(wall)
+    assert db.get_artisan_day_load(ann, day, day + 10) == [(day + 3, 1, 8)]
+
+    incremental = db.conn.execute("SELECT * FROM artisan_day_load").fetchall()
+    db.rebuild_artisan_day_load()
+    assert db.conn.execute("SELECT * FROM artisan_day_load").fetchall() == incremental
+
+def test_conflicts_enforce_daily_hours_cap(db):
+    ann = db.add_artisan("Ann", "Roofer", "Available")
+    roof = db.add_project("Roof", "2025-06-02", "2025-06-06", "Active", "J1", "")
+    wall = db.add_project("Wall", "2025-06-04", "2025-06-08", "Active", "J2", "")
+    first = db.add_assignment(ann, roof, "2025-06-02", "2025-06-04")
+    second = db.add_assignment(ann, wall, "2025-06-06", "2025-06-08")
+
+    # 8 + 8 hours on 2025-06-04 is over the 12 hour cap; 8 + 4 is not
+    with pytest.raises(ConflictError, match="Ann would be booked for 16 hours on 2025-06-04"):
+        db.add_assignment(ann, wall, "2025-06-04", "2025-06-05")
+    db.add_assignment(ann, wall, "2025-06-04", "2025-06-05", hours_per_day=4)
+    with pytest.raises(ConflictError):
+        db.update_assignment(second, "2025-06-03", "2025-06-08")
+    assert db.get_assignment(second)[3:5] == ("2025-06-06", "2025-06-08")
+    # Moving an assignment is not checked against its own current span
+    db.update_assignment(first, "2025-06-01", "2025-06-03")
+    assert db.check_conflict(ann, "2025-06-07", "2025-06-09") is not None
+    assert db.check_conflict(ann, "2025-06-09", "2025-06-12") is None
+
+    # A rolled-back transaction leaves no bookings behind
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.add_assignment(ann, roof, "2025-06-20", "2025-06-21")
+            raise RuntimeError("boom")
+    assert db.check_conflict(ann, "2025-06-20", "2025-06-21") is None
+
+    # The in-memory load matches a fresh build from the table
+    fresh = Database(db.db_path)
+    try:
+        for day in ("2025-06-01", "2025-06-04", "2025-06-06", "2025-06-09"):
+            assert db.check_conflict(ann, day, day, 0) == fresh.check_conflict(ann, day, day, 0)
+    finally:
+        fresh.close()
+
+def test_artisan_load_merges_steps():
+    load = ArtisanLoad()
+    for start in range(0, 1000, 10):
+        load.add(start, start + 4, 1, 8)
+    assert load.peak(0, 1000) == (0, 1, 8)
+    assert load.peak(5, 9) == (5, 0, 0)
+    for start in range(0, 1000, 10):
+        load.add(start, start + 4, -1, -8)
+    assert load.days == []
+
+def test_old_activity_is_archived_and_paged(db):
+    db.activity_archiver.close()  # Archive by hand below, not on the background thread
+    stamps = [f"2025-01-{day:02d} 09:00:00" for day in range(1, 11)] + ["2099-01-01 09:00:00"] * 3
+    db.conn.executemany("INSERT INTO activity_log (action, details, timestamp) VALUES (?, ?, ?)",
+                        [("Project Updated", f"Entry {i}", stamp) for i, stamp in enumerate(stamps)])
+    expected = [f"Entry {i}" for i in reversed(range(len(stamps)))]
+
+    assert db.archive_activities(retention_days=30, batch_size=4) == 4
+    assert db.archive_activities(retention_days=30, batch_size=4) == 4
+    assert db.archive_activities(retention_days=30, batch_size=4) == 2
+    assert db.archive_activities(retention_days=30, batch_size=4) == 0
+    assert db.conn.execute("SELECT COUNT(*) FROM main.activity_log").fetchone()[0] == 3
+    assert db.conn.execute("SELECT COUNT(*) FROM archive.activity_log").fetchone()[0] == 10
+
+    # Paging walks from the hot table into the archive without gaps or repeats
+    pages, before = [], None
+    while True:
+        page = db.get_activities(before=before, limit=4)
+        if not page:
+            break
+        pages.append([row[2] for row in page])
+        before = (page[-1][3], page[-1][0])
+    assert [len(page) for page in pages] == [4, 4, 4, 1]
+    assert sum(pages, []) == expected
+    assert [row[1] for row in db.get_recent_activities(limit=5)] == expected[:5]
+
+    # An entry whose id the archive already uses for another entry is kept, not lost
+    db.conn.execute("INSERT INTO archive.activity_log (id, action, details, timestamp) VALUES (100, 'Old', 'Archived', ?)",
+                    (stamps[0],))
+    db.conn.execute("INSERT INTO main.activity_log (id, action, details, timestamp) VALUES (100, 'New', 'Clash', ?)",
+                    (stamps[0],))
+    assert db.archive_activities(retention_days=30, batch_size=4) == 0
+    assert db.conn.execute("SELECT details FROM main.activity_log WHERE id = 100").fetchone() == ("Clash",)
+
+def test_passwords_are_hashed_and_upgraded_on_login(db):
+    user_id = db.add_user("ann", "s3cret")
+    stored = db.conn.execute("SELECT password FROM users WHERE id = ?", (user_id,)).fetchone()[0]
+    assert stored != "s3cret" and stored.startswith(f"$2b${config.BCRYPT_ROUNDS:02d}$")
+    assert db.get_user("ann", "s3cret") == {"id": user_id, "username": "ann"}
+    assert db.get_user("ann", "wrong") is None
+    assert db.get_user("nobody", "s3cret") is None
+
+    # A row written in plaintext outside the app is hashed on its first login
+    db.conn.execute("INSERT INTO users (username, password) VALUES ('ben', 'plain')")
+    assert db.get_user("ben", "plain")["username"] == "ben"
+    assert is_hashed(db.conn.execute("SELECT password FROM users WHERE username = 'ben'").fetchone()[0])
+    assert db.get_user("ben", "plain")["username"] == "ben"
+
+    db.conn.execute("INSERT INTO users (username, password) VALUES ('cat', 'plain')")
+    assert db.hash_plaintext_passwords() == 1
+    assert db.get_user("cat", "plain")["username"] == "cat"
+
+def test_backup_copies_during_edits_and_rotates(db, tmp_path):
+    artisan = db.add_artisan("Ann", "Roofer", "Available")
+    db.conn.executemany("INSERT INTO projects (name, start_date, end_date, status, start_day, end_day) VALUES (?, ?, ?, ?, ?, ?)",
+                        [(f"P{i}", "2025-06-02", "2025-06-06", "Active", 739404, 739408) for i in range(5000)])
+
+    # Edits made while the copy is in progress end up in it
+    edits = []
+    def edit_during_backup(remaining, total):
+        if not edits:
+            edits.append(db.add_team("Crew"))
+    db.backup(str(tmp_path / "copy.db"), pages=5, pause=0, progress=edit_during_backup)
+    copy = sqlite3.connect(str(tmp_path / "copy.db"))
+    assert copy.execute("SELECT COUNT(*) FROM projects").fetchone()[0] == 5000
+    assert copy.execute("SELECT id FROM teams").fetchall() == [(edits[0],)]
+    copy.close()
+
+    # Another thread's edit gets in between steps rather than waiting for the end
+    writer = threading.Thread(target=db.add_team, args=("Night Crew",))
+    remaining_when_written = []
+    def write_from_another_thread(remaining, total):
+        if writer.ident is None:
+            writer.start()
+        elif not writer.is_alive() and not remaining_when_written:
+            remaining_when_written.append(remaining)
+    db.backup(str(tmp_path / "copy2.db"), pages=5, pause=1, progress=write_from_another_thread)
+    writer.join()
+    assert remaining_when_written and remaining_when_written[0] > 0
+    # A transaction would keep holding the lock between steps
+    with db.transaction():
+        with pytest.raises(RuntimeError):
+            db.backup(str(tmp_path / "copy3.db"))
+
+    scheduler = BackupScheduler(db, directory=str(tmp_path / "backups"), keep=2)
+    assert scheduler.status()["last_backup"] is None
+    # Two older backups; with keep=2 the oldest goes once a new one is taken
+    os.makedirs(tmp_path / "backups")
+    for stamp in ("20240101-000000", "20240102-000000"):
+        os.link(tmp_path / "copy.db", tmp_path / "backups" / f"gantt-{stamp}.db")
+    path = scheduler.backup_now()
+    assert scheduler.backups() == [str(tmp_path / "backups" / "gantt-20240102-000000.db"), path]
+    status = scheduler.status()
+    assert status["running"] is False and status["last_error"] is None
+    assert status["last_backup"] == path
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path / "backups"))
+    assert sqlite3.connect(scheduler.backups()[-1]).execute("SELECT name FROM artisans WHERE id = ?", (artisan,)).fetchone() == ("Ann",)
+
+def test_edit_buffer_coalesces_journals_and_flushes(db, tmp_path):
+    repository = ScheduleRepository(db)
+    ann = repository.add_artisan("Ann", "Roofer", "Available")
+    roof = repository.add_project("Roof", "2025-06-02", "2025-06-06", "Active", "J1", "")
+    first = repository.add_assignment(ann, roof, "2025-06-02", "2025-06-03")
+    second = repository.add_assignment(ann, roof, "2025-06-10", "2025-06-11")
+    journal = str(tmp_path / "edits.jsonl")
+    buffer = EditBuffer(repository, journal, enabled=True)
+    batches = []
+    repository.subscribe(batches.append)
+
+    buffer.update_assignment(first, "2025-06-04", "2025-06-05")
+    buffer.update_assignment(first, "2025-06-05", "2025-06-06")
+    # Would overlap first's committed days, but first is moving away; flush sees the final state
+    buffer.update_assignment(second, "2025-06-02", "2025-06-03")
+    assert batches == []
+    rows = buffer.overlay(repository.load_gantt_view("2025-06-01", "2025-06-30"))
+    assert [(a["start_day"], a["end_day"]) for a in rows[0]["assignments"]] == [
+        (date(2025, 6, 5).toordinal(), date(2025, 6, 6).toordinal()),
+        (date(2025, 6, 2).toordinal(), date(2025, 6, 3).toordinal())]
+
+    # A crash before flushing: a new buffer picks the moves up from the journal
+    recovered = EditBuffer(repository, journal, enabled=True)
+    assert recovered.recovered == 2 and recovered.pending == buffer.pending
+    recovered.close()
+
+    assert buffer.flush() == []
+    assert len(batches) == 1  # One transaction, one batch of events
+    assert db.get_assignment(first)[3:5] == ("2025-06-05", "2025-06-06")
+    assert db.get_assignment(second)[3:5] == ("2025-06-02", "2025-06-03")
+    assert not buffer.dirty and os.path.getsize(journal) == 0
+
+    # A move the database rejects is dropped and reported; the others still commit
+    third = repository.add_assignment(ann, roof, "2025-06-20", "2025-06-20")
+    buffer.update_assignment(third, "2025-06-02", "2025-06-02")
+    buffer.update_assignment(first, "2025-06-07", "2025-06-07")
+    failures = buffer.flush()
+    assert [assignment_id for assignment_id, _ in failures] == [third]
+    assert db.get_assignment(third)[3] == "2025-06-20"
+    assert db.get_assignment(first)[3] == "2025-06-07"
+    buffer.close()
+    assert not os.path.exists(journal)
+
+def test_search_follows_writes_and_ranks_names_first(db):
+    team_id = db.add_team("Plumbing Crew")
+    artisan_id = db.add_artisan("Mary Plümber", "Pipes", "Full-time")
+    db.update_artisan_team(artisan_id, team_id)
+    project_id = db.add_project("Kitchen refit", "2025-01-01", "2025-01-10", "Active", "J-1023", "New plumbing")
+    assert db.search("plu") == [("team", team_id, "Plumbing Crew"), ("artisan", artisan_id, "Mary Plümber"),
+                                ("project", project_id, "Kitchen refit")]
+    assert db.search("ma plumber") == [("artisan", artisan_id, "Mary Plümber")]
+    assert db.search("j-102") == [("project", project_id, "Kitchen refit")]
+    assert db.search('"') == [] and db.search("plu", limit=1) == [("team", team_id, "Plumbing Crew")]
+    db.update_project(project_id, "Bathroom", "2025-01-01", "2025-01-10", "J-1023", "")
+    assert db.search("kitchen") == [] and db.search("bath") == [("project", project_id, "Bathroom")]
+    assert db.search_ids("plumb") == {"project": set(), "artisan": {artisan_id}, "team": {team_id}}
+    db.delete_project(project_id)
+    assert db.search("bath") == []
+    # Bulk-imported rows are indexed by the same triggers
+    path = db.db_path + ".csv"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("name,skill,availability\nJoe Tiler,Tiling,Full-time\n")
+    db.bulk_import("artisans", path)
+    assert [row[2] for row in db.search("til")] == ["Joe Tiler"]
+    db.has_fts = False
+    assert db.search("mary pipe") == [("artisan", artisan_id, "Mary Plümber")]
+    assert db.search_ids("crew")["team"] == {team_id}
+
+def test_snapshot_round_trips_the_schedule(db, tmp_path):
+    team_id = db.add_team("Crew")
+    artisan_id = db.add_artisan("Ann", "Tiling", "Full-time")
+    db.update_artisan_team(artisan_id, team_id)
+    db.add_artisan("Ben", None, "Part-time", "ben.png")
+    project_id = db.add_project("Lobby", "2025-03-03", "2025-03-14", "Active", "J-7", None)
+    db.add_assignment(artisan_id, project_id, "2025-03-03", "2025-03-07", hours_per_day=6.5)
+    path = str(tmp_path / "schedule.snap")
+    counts = db.export_snapshot(path, chunk_size=2)
+    assert counts["artisans"] == 2 and counts["assignments"] == 1
+
+    other = Database(db_path=str(tmp_path / "other.db"))
+    try:
+        other.add_project("Stale", "2025-01-01", "2025-01-02", "Active", None, None)
+        assert other.import_snapshot(path) == counts
+        for table in ("users", "teams", "artisans", "projects", "assignments", "artisan_day_load"):
+            assert other.conn.execute(f"SELECT * FROM {table}").fetchall() == db.conn.execute(f"SELECT * FROM {table}").fetchall()
+        assert other.search("stale") == [] and other.search("lob") == [("project", project_id, "Lobby")]
+        # The imported bookings count towards the cap
+        assert other.check_conflict(artisan_id, "2025-03-05", "2025-03-05", hours_per_day=6)
+        with open(path, "r+b") as f:
+            f.write(b"NOTASNAP")
+        with pytest.raises(ValueError):
+            other.import_snapshot(path)
+        assert other.get_project(project_id)[1] == "Lobby"
+    finally:
+        other.close()
+
+def test_snapshot_import_keeps_activity_apart_from_the_archive(db, tmp_path):
+    db.activity_archiver.close()  # Archive by hand below, not on the background thread
+    db.conn.executemany("INSERT INTO activity_log (action, details, timestamp) VALUES (?, ?, ?)",
+                        [("Project Updated", f"Entry {i}", f"2025-01-{i + 1:02d} 09:00:00") for i in range(5)])
+    path = str(tmp_path / "schedule.snap")
+    db.export_snapshot(path)
+    assert db.archive_activities(retention_days=30) == 5
+    db.import_snapshot(path)
+    assert db.archive_activities(retention_days=30) == 5
+    archived = db.conn.execute("SELECT details FROM archive.activity_log ORDER BY id").fetchall()
+    assert [row[0] for row in archived] == [f"Entry {i}" for i in range(5)] * 2
+    assert db.conn.execute("SELECT COUNT(*) FROM main.activity_log WHERE details LIKE 'Entry %'").fetchone()[0] == 0
+
+def test_avatar_cache_thumbnails_once_and_evicts(tmp_path):
+    pytest.importorskip("PyQt6")
+    from PyQt6.QtGui import QColor, QImage
+    from ui.avatar_cache import AvatarCache
+    pictures = []
+    for i in range(3):
+        picture = QImage(400, 200, QImage.Format.Format_RGB32)
+        picture.fill(QColor(i * 100, 0, 0))
+        pictures.append(str(tmp_path / f"artisan{i}.png"))
+        picture.save(pictures[-1])
+    cache = AvatarCache(directory=str(tmp_path / "avatars"), size=32, capacity=2)
+    image = cache.get(pictures[0])
+    assert image.shape[:2] == (16, 32)
+    assert cache.get(pictures[0]) is image
+    assert len(os.listdir(tmp_path / "avatars")) == 1
+    cache.get(pictures[1])
+    cache.get(pictures[2])
+    assert len(cache._images) == 2
+    # An evicted avatar comes back from its thumbnail, not the picture
+    stat = os.stat(pictures[0])
+    with open(pictures[0], "wb") as f:
+        f.write(b"not an image")
+    os.utime(pictures[0], ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.get(pictures[0]).shape[:2] == (16, 32)
+    # A changed picture gets a new thumbnail
+    os.utime(pictures[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache.get(pictures[0]) is None
+    assert cache.get(None) is None and cache.get(str(tmp_path / "missing.png")) is None
+
 if __name__ == "__main__":
     test_db_creation()
@@ -0,0 +1,70 @@
+# ui/avatar_cache.py
+import hashlib
+import os
+from collections import OrderedDict
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage
+import matplotlib.image as mpimg
+import config
+
+class AvatarCache:
+    """Small artisan avatars for the calendar, made once and kept on disk and in memory.
+
+    get() scales a profile picture down to size x size pixels the first
+    time it is asked for and saves the thumbnail as a PNG in directory,
+    named after the picture's path and modification time, so a replaced
+    picture gets a new thumbnail and the old one is never read again. Later
+    calls, in this run or the next, read the thumbnail instead of the
+    picture. The capacity most recently used thumbnails are also kept in
+    memory as RGBA arrays; the rest are dropped, least recently used first.
+    """
+
+    def __init__(self, db_path=config.DATABASE_PATH, directory=None, size=config.AVATAR_SIZE,
+                 capacity=config.AVATAR_CACHE_SIZE):
+        self.directory = directory or config.AVATAR_CACHE_DIR or os.path.join(
+            os.path.dirname(os.path.abspath(db_path)), "avatars")
+        self.size = size
+        self.capacity = capacity
+        self._images = OrderedDict()  # (path, mtime) -> RGBA array, or None for an unreadable picture
+
+    def get(self, path):
+        """Return the thumbnail of the picture at path as an RGBA array, or None if there is no readable picture."""
+        if not path:
+            return None
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        key = (path, mtime)
+        if key in self._images:
+            self._images.move_to_end(key)
+            return self._images[key]
+        image = self._load(path, mtime)
+        self._images[key] = image
+        if len(self._images) > self.capacity:
+            self._images.popitem(last=False)
+        return image
+
+    def thumbnail_path(self, path, mtime):
+        digest = hashlib.sha1(f"{os.path.abspath(path)}\0{mtime}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}-{self.size}.png")
+
+    def _load(self, path, mtime):
+        thumbnail = self.thumbnail_path(path, mtime)
+        if not os.path.exists(thumbnail):
+            image = QImage(path)
+            if image.isNull():
+                return None
+            image = image.scaled(self.size, self.size, Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+            os.makedirs(self.directory, exist_ok=True)
+            # Written under another name and renamed, so a thumbnail is never seen half written
+            temporary = f"{thumbnail}.tmp"
+            if not image.save(temporary, "PNG"):
+                print(f"Error saving avatar thumbnail for {path}")
+                return None
+            os.replace(temporary, thumbnail)
+        try:
+            return mpimg.imread(thumbnail)
+        except (OSError, ValueError):
+            return None
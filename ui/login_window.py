@@ -1,16 +1,79 @@
 # ui/login_window.py
-from PyQt6.QtWidgets import QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLineEdit, QPushButton, QLabel, QFormLayout
-from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import (QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLineEdit, QPushButton, QLabel,
+                             QFormLayout, QMessageBox)
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QPixmap
 from db.database import Database
+from db.repository import ScheduleRepository
+
+class LoginWorker(QThread):
+    """Checks a username and password off the UI thread; bcrypt is slow on purpose."""
+    checked = pyqtSignal(object)  # The user dict, or None for a wrong username or password
+    failed = pyqtSignal(str)
+
+    def __init__(self, db, username, password, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.username = username
+        self.password = password
+
+    def run(self):
+        try:
+            self.checked.emit(self.db.get_user(self.username, self.password))
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            self.db.release_reader()
+
+class WarmupWorker(QThread):
+    """Opens the database, then loads the ScheduleRepository the main window opens with, off the UI thread.
+
+    On first run opening means migrations, index builds and hashing the
+    default user's password, so this starts with the login window.
+    """
+    opened = pyqtSignal(object)  # The Database
+    failed = pyqtSignal(str)  # The database could not be opened
+    loaded = pyqtSignal(object)  # The repository, or None if loading failed
+
+    def __init__(self, db_path, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.db = None  # Also kept here, for a window closed before opened is delivered
+
+    def run(self):
+        try:
+            self.db = Database(db_path=self.db_path)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.opened.emit(self.db)
+        try:
+            self.loaded.emit(ScheduleRepository(self.db))
+        except Exception as e:
+            # The main window loads it again itself
+            print(f"Error preloading schedule: {e}")
+            self.loaded.emit(None)
+        finally:
+            self.db.release_reader()
 
 class LoginWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Gantt Artisan Program - Login")
         self.setGeometry(100, 100, 400, 500)
-        self.db = Database(db_path="gantt.db")
+        self.db = None  # Opened by the warm-up worker
+        self.user = None
+        self.pending_login = None  # (username, password) entered before the database was open
+        self.login_worker = None
+        self.repository = None
+        self.warmed_up = False
+        self.main_window = None
         self.init_ui()
+        self.warmup_worker = WarmupWorker("gantt.db", self)
+        self.warmup_worker.opened.connect(self.on_database_opened)
+        self.warmup_worker.failed.connect(self.on_database_failed)
+        self.warmup_worker.loaded.connect(self.on_warmed_up)
+        self.warmup_worker.start()
 
     def init_ui(self):
         central_widget = QWidget()
@@ -50,10 +113,10 @@ class LoginWindow(QMainWindow):
         layout.addLayout(form_layout)
 
         # Login Button
-        login_button = QPushButton("Login")
-        login_button.setStyleSheet("background-color: #38a169; color: white; padding: 10px; font-size: 14px; font-family: 'Roboto'; border-radius: 5px;")
-        login_button.clicked.connect(self.handle_login)
-        layout.addWidget(login_button)
+        self.login_button = QPushButton("Login")
+        self.login_button.setStyleSheet("background-color: #38a169; color: white; padding: 10px; font-size: 14px; font-family: 'Roboto'; border-radius: 5px;")
+        self.login_button.clicked.connect(self.handle_login)
+        layout.addWidget(self.login_button)
 
         # Spacer
         layout.addStretch()
@@ -65,13 +128,72 @@ class LoginWindow(QMainWindow):
         layout.addWidget(footer_label)
 
     def handle_login(self):
+        if self.pending_login or (self.login_worker and self.login_worker.isRunning()):
+            return
         username = self.username_input.text().strip()
         password = self.password_input.text().strip()
-        user = self.db.get_user(username, password)
+        self.login_button.setEnabled(False)
+        self.login_button.setText("Signing in...")
+        if self.db is None:
+            # Checked as soon as the database is open
+            self.pending_login = (username, password)
+            return
+        self.check_login(username, password)
+
+    def check_login(self, username, password):
+        self.login_worker = LoginWorker(self.db, username, password, self)
+        self.login_worker.checked.connect(self.on_login_checked)
+        self.login_worker.failed.connect(self.on_login_failed)
+        self.login_worker.start()
+
+    def on_database_opened(self, db):
+        self.db = db
+        if self.pending_login:
+            username, password = self.pending_login
+            self.pending_login = None
+            self.check_login(username, password)
+
+    def on_database_failed(self, message):
+        self.pending_login = None
+        self.login_button.setText("Login")
+        self.login_button.setEnabled(False)
+        QMessageBox.critical(self, "Database Error", f"Could not open the database: {message}")
+
+    def on_login_checked(self, user):
+        self.login_button.setEnabled(True)
+        self.login_button.setText("Login")
         if user:
-            self.close()
-            from ui.main_window import MainWindow
-            self.main_window = MainWindow(user)
-            self.main_window.show()
+            self.user = user
+            self.open_main_window()
         else:
-            QMessageBox.critical(self, "Login Failed", "Invalid username or password")
\ No newline at end of file
+            QMessageBox.critical(self, "Login Failed", "Invalid username or password")
+
+    def on_login_failed(self, message):
+        self.login_button.setEnabled(True)
+        self.login_button.setText("Login")
+        QMessageBox.critical(self, "Login Failed", message)
+
+    def on_warmed_up(self, repository):
+        self.repository = repository
+        self.warmed_up = True
+        self.open_main_window()
+
+    def open_main_window(self):
+        # Called by whichever of the login check and the warm-up finishes last
+        if self.user is None or not self.warmed_up:
+            return
+        from ui.main_window import MainWindow
+        self.main_window = MainWindow(self.user, self.db, self.repository)
+        self.main_window.show()
+        self.close()
+
+    def closeEvent(self, event):
+        if self.main_window is None:
+            # Quit from the login window: the database was never handed over
+            self.warmup_worker.wait()
+            if self.login_worker:
+                self.login_worker.wait()
+            db = self.db or self.warmup_worker.db
+            if db:
+                db.close()
+        super().closeEvent(event)
\ No newline at end of file
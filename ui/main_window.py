@@ -2,13 +2,19 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QPushButton, QLabel, QTreeWidget, QTreeWidgetItem,
                              QMessageBox, QFormLayout, QDialog, QDialogButtonBox, QMenu)
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QPixmap
+from db.backup import BackupScheduler
 from db.database import Database
+from db.edit_buffer import EditBuffer
+from db.repository import ScheduleRepository
+from ui.avatar_cache import AvatarCache
 from ui.styles.stylesheet import STYLESHEET
 from ui.tabs.dashboard import DashboardTab
 from ui.tabs.calendar import CalendarTab
 from datetime import datetime, timedelta
+import os
+import config
 
 class AddItemDialog(QDialog):
     def __init__(self, item_type, parent=None):
@@ -63,12 +69,29 @@ class AddItemDialog(QDialog):
             }
 
 class MainWindow(QMainWindow):
-    def __init__(self, user_info, parent=None):
+    def __init__(self, user_info, db=None, repository=None, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Gantt Artisan Program")
         self.setMinimumSize(1200, 800)
         self.user_info = user_info
-        self.db = Database(db_path="gantt.db")
+        # The login window hands over its database and the repository it
+        # preloaded while checking the password
+        self.db = db or Database(db_path="gantt.db")
+        # Tabs read and write through the repository and refresh from its change events
+        self.repository = repository or ScheduleRepository(self.db)
+        self.repository.subscribe(self.on_schedule_changed)
+        # Online backups every config.BACKUP_INTERVAL, on a background thread
+        self.backup_scheduler = BackupScheduler(self.db)
+        self.backup_scheduler.start()
+        # Calendar drags can be held here and written together; see EditBuffer
+        journal_path = config.EDIT_JOURNAL_PATH or f"{os.path.splitext(self.db.db_path)[0]}_edits.jsonl"
+        self.edit_buffer = EditBuffer(self.repository, journal_path)
+        self.edit_buffer.subscribe(self.on_edits_changed)
+        # Avatar thumbnails outlive the calendar tab, which is rebuilt on every visit
+        self.avatar_cache = AvatarCache(self.db.db_path)
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.timeout.connect(self.save_edits)
+        self.autosave_timer.start(config.AUTOSAVE_INTERVAL)
         self.current_tab = None
         self.selected_tab = "Calendar"  # Track the selected tab
         self.sidebar_buttons = {}  # Store references to sidebar buttons
@@ -190,10 +213,19 @@ class MainWindow(QMainWindow):
         footer_label.setStyleSheet("color: #2d3748; font-size: 10px; font-family: 'Roboto'; text-align: center; padding: 5px;")
         main_layout.addWidget(footer_label, alignment=Qt.AlignmentFlag.AlignCenter)
 
+        self.backup_label = QLabel()
+        self.backup_label.setStyleSheet("color: #718096; font-size: 10px; font-family: 'Roboto'; padding: 0 5px 5px;")
+        main_layout.addWidget(self.backup_label, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.update_backup_status()
+        self.backup_status_timer = QTimer(self)
+        self.backup_status_timer.timeout.connect(self.update_backup_status)
+        self.backup_status_timer.start(5000)
+
         self.setCentralWidget(central_widget)
 
         # Load the default tab (Calendar)
         self.navigate_to("Calendar")
+        self.on_edits_changed()
 
     def show_add_menu(self):
         menu = QMenu(self)
@@ -210,34 +242,37 @@ class MainWindow(QMainWindow):
         if dialog.exec():
             data = dialog.get_data()
             try:
+                with self.repository.transaction():
+                    if item_type == "Artisan":
+                        artisan_id = self.repository.add_artisan(
+                            name=data["name"],
+                            skill=data["skill"],
+                            availability=data["availability"]
+                        )
+                    elif item_type == "Project":
+                        project_id = self.repository.add_project(
+                            name=data["name"],
+                            start_date=data["start_date"],
+                            end_date=data["end_date"],
+                            status=data["status"],
+                            job_number=data["job_number"],
+                            description=data["description"]
+                        )
                 if item_type == "Artisan":
-                    artisan_id = self.db.add_artisan(
-                        name=data["name"],
-                        skill=data["skill"],
-                        availability=data["availability"]
-                    )
                     QMessageBox.information(self, "Success", f"Artisan {data['name']} added with ID {artisan_id}")
                 elif item_type == "Project":
-                    project_id = self.db.add_project(
-                        name=data["name"],
-                        start_date=data["start_date"],
-                        end_date=data["end_date"],
-                        status=data["status"],
-                        job_number=data["job_number"],
-                        description=data["description"]
-                    )
                     QMessageBox.information(self, "Success", f"Project {data['name']} added with ID {project_id}")
-                self.load_artisans_in_sidebar(QTreeWidgetItem(self.artisans_tree, ["👥 Artisans"]))
-                # Refresh the current tab if it has a refresh method
-                if self.current_tab and hasattr(self.current_tab, 'refresh'):
-                    self.current_tab.refresh()
             except ValueError as e:
                 QMessageBox.critical(self, "Error", str(e))
 
+    def on_schedule_changed(self, changes):
+        if any(change.kind == "artisan" for change in changes):
+            self.load_artisans_in_sidebar(QTreeWidgetItem(self.artisans_tree, ["👥 Artisans"]))
+
     def load_artisans_in_sidebar(self, parent_item):
         self.artisans_tree.clear()
         artisans_item = QTreeWidgetItem(self.artisans_tree, ["👥 Artisans"])
-        artisans = self.db.get_artisans()
+        artisans = self.repository.get_artisans()
         for artisan in artisans:
             item = QTreeWidgetItem(artisans_item)
             item.setText(0, artisan[1])
@@ -288,12 +323,14 @@ class MainWindow(QMainWindow):
         for i in reversed(range(self.content_layout.count())):
             widget = self.content_layout.itemAt(i).widget()
             if widget is not None:
+                if hasattr(widget, 'detach'):
+                    widget.detach()
                 widget.deleteLater()
 
         if section == "Dashboard":
-            self.current_tab = DashboardTab(self.db, self)
+            self.current_tab = DashboardTab(self.repository, self)
         elif section == "Calendar":
-            self.current_tab = CalendarTab(self.db, self)
+            self.current_tab = CalendarTab(self.repository, self, self.edit_buffer, self.avatar_cache)
         else:
             # Placeholder for unimplemented tabs
             self.current_tab = QWidget()
@@ -304,13 +341,52 @@ class MainWindow(QMainWindow):
 
         self.content_layout.addWidget(self.current_tab)
 
-    def logout(self):
+    def update_backup_status(self):
+        status = self.backup_scheduler.status()
+        if status["running"]:
+            text = f"Backing up... {status['progress'] or 0:.0%}"
+        elif status["last_backup_time"]:
+            text = f"Last backup: {status['last_backup_time'].strftime('%Y-%m-%d %H:%M')}"
+        else:
+            text = "No backup yet"
+        if status["last_error"]:
+            text += f" | Last backup failed: {status['last_error']}"
+        self.backup_label.setText(text)
+
+    def on_edits_changed(self):
+        # Mark the window while there are edits not yet written
+        self.setWindowTitle("Gantt Artisan Program" + (" *" if self.edit_buffer.dirty else ""))
+
+    def save_edits(self):
+        """Write pending calendar edits, reporting any the database rejected."""
+        try:
+            failures = self.edit_buffer.flush()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not save edits; they are kept and will be retried: {e}")
+            return
+        if failures:
+            # Put the rejected bars back where they were
+            if hasattr(self.current_tab, "refresh"):
+                self.current_tab.refresh()
+            QMessageBox.warning(self, "Some Edits Not Saved", "\n".join(message for _, message in failures))
+
+    def shutdown(self):
+        if not self.autosave_timer.isActive():
+            return  # Already shut down (logout closes the window too)
+        # Pending edits first, while the database is still open
+        self.autosave_timer.stop()
+        self.save_edits()
+        self.edit_buffer.close()
+        self.backup_scheduler.stop()
         self.db.close()
+
+    def logout(self):
+        self.shutdown()
         self.close()
         from ui.login_window import LoginWindow
         self.login_window = LoginWindow()
         self.login_window.show()
 
     def closeEvent(self, event):
-        self.db.close()
+        self.shutdown()
         event.accept()
\ No newline at end of file
@@ -1,17 +1,22 @@
 ﻿# ui/tabs/calendar.py
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QMessageBox, 
                              QFormLayout, QComboBox, QDialog, QDialogButtonBox, QSizePolicy, QTreeWidget, QTreeWidgetItem, QMenu,
-                             QCalendarWidget, QLabel, QListWidget, QListWidgetItem, QScrollArea)
+                             QCalendarWidget, QLabel, QListWidget, QListWidgetItem, QScrollBar, QToolTip)
 from PyQt6.QtCore import Qt, QRectF, QDate, QPoint, QTimer
+from PyQt6.QtGui import QCursor
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.patches import Rectangle
-from matplotlib.collections import PatchCollection
+from matplotlib.collections import PolyCollection
 import matplotlib.dates as mdates
-import matplotlib.image as mpimg
 from matplotlib.offsetbox import OffsetImage, AnnotationBbox
 import numpy as np
+from db.conflicts import ConflictError
+from db.dates import to_day
+from db.repository import ARTISAN_TEAM
+from ui.avatar_cache import AvatarCache
+import config
 
 # South African Public Holidays for 2025 (hardcoded)
 SA_PUBLIC_HOLIDAYS_2025 = [
@@ -46,6 +51,36 @@ HOLIDAY_COLOR = '#87CEFA'  # Light sky blue for holidays
 LEGEND_BG_COLOR = '#F0F0F0'  # Light gray background for legend
 LEGEND_TEXT_COLOR = '#333333'  # Dark gray text for legend
 
+WEEKDAY_LABELS = ["Mo", "Tu", "We", "Th", "Fr", "Sa", "Su"]
+
+# Row virtualization: the scrollbar moves in rows, and only the rows in view
+# plus OVERSCAN_ROWS either side have artists
+ROW_PIXELS = 48     # Screen height of one Gantt row; the canvas height sets how many are shown
+OVERSCAN_ROWS = 10  # Rows kept drawn beyond each edge of the view, so short scrolls only move the y limits
+AVATAR_PIXELS = 16  # On-screen size of the artisan avatars on the bars
+
+def dragged_span(assignment, edge, days):
+    """Return the (start_day, end_day) an assignment covers once edge ("left", "right", or "move" for both) is dragged by days.
+
+    The drag applies to the assignment's own days rather than to its bar,
+    which is clipped to the window.
+    """
+    start, end = assignment["start_day"], assignment["end_day"]
+    if edge in ("left", "move"):
+        start += days
+    if edge in ("right", "move"):
+        end += days
+    if edge == "left":
+        start = min(start, end)
+    return start, max(end, start)
+
+def cell_polygons(xs, ys, width, height):
+    """Return the (len(ys) * len(xs), 4, 2) corner array of width x height cells at every (x, y) pair."""
+    x0, y0 = np.meshgrid(xs, ys)
+    x0, y0 = x0.ravel(), y0.ravel()
+    x1, y1 = x0 + width, y0 + height
+    return np.stack([np.column_stack(corner) for corner in ((x0, y0), (x0, y1), (x1, y1), (x1, y0))], axis=1)
+
 class DatePickerDialog(QDialog):
     def __init__(self, initial_date, parent=None):
         super().__init__(parent)
@@ -373,38 +408,59 @@ class ProjectActionDialog(QDialog):
         self.done(2)  # Return 2 for Delete
 
 class CalendarTab(QWidget):
-    def __init__(self, db, parent=None):
+    def __init__(self, db, parent=None, edit_buffer=None, avatar_cache=None):
         super().__init__(parent)
-        self.db = db
+        self.db = db  # A ScheduleRepository; edits come back as change events
         self.parent = parent  # Store reference to MainWindow
+        self.edit_buffer = edit_buffer  # Holds drag edits while batch editing is on
         self.date_range = 42  # 6 weeks
         self.start_date = datetime.now()
         self.drag_data = None
         self.selected_bar = None
         self.drag_start_x = None
+        self.drag_start_bar_x = None
         self.drag_start_width = None
         self.drag_edge = None  # 'left' or 'right'
         self.holidays = self.fetch_holidays()
         self.project_color_index = 0  # Track the color index for projects
         self.project_colors = {}  # Map project IDs to colors
-        self.artisan_images = {}  # Cache for artisan images
-        self.team_names = {}  # Cache for team names
-        self.project_assignments = {}  # Cache for project assignments
-        self.y_pos = None  # Cache for y-positions
-        self.y_pos_centered = None  # Cache for centered y-positions
+        # Avatar thumbnails, read when their rows are first shown
+        self.avatar_cache = avatar_cache or AvatarCache()
+        self.gantt_rows = []  # Rows from Database.load_gantt_view for the visible window
+        self.chart_rows = []  # The rows the chart was last built for, after the search filter
+        # Block dimensions
+        self.block_height = 22
+        self.block_width = 0.8
+        self.row_gap = 3
+        # Pooled artists, recycled by materialize_rows as the view scrolls
+        self.background_layers = []
+        self.bar_pool = []  # (bar, gradient) Rectangles
+        self.avatar_pool = []  # AnnotationBboxes
+        self.avatar_dots = None  # One scatter for the artisans without a picture
+        self.bars = []
+        self.materialized = (0, 0)  # Rows first..last-1 that have artists
         self.project_action_dialog = ProjectActionDialog(self)
-        # Timer for debouncing redraws during drag
-        self.redraw_timer = QTimer(self)
-        self.redraw_timer.setSingleShot(True)
-        self.redraw_timer.timeout.connect(self.deferred_redraw)
-        self.redraw_pending = False
-        # Scroll position
+        # Drags are blitted: the chart without the dragged bar is kept as an
+        # image, and each motion only restores it and draws the bar and its
+        # date label on top
+        self.drag_background = None
+        self.drag_label = None
+        # Search box filter: (project_ids, artisan_ids) of the matches, or None to show every row
+        self.search_matches = None
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.timeout.connect(self.apply_search)
+        # Scroll position, in rows
         self.scroll_offset = 0
-        self.visible_rows = 10  # Number of visible rows
+        self.visible_rows = 10  # Rows that fit the canvas; updated when it is resized
         self.init_ui()
+        self.db.subscribe(self.on_schedule_changed)
+        if self.edit_buffer:
+            self.edit_buffer.subscribe(self.on_edits_changed)
 
     def fetch_holidays(self):
-        return SA_PUBLIC_HOLIDAYS_2025
+        """Return the public holidays as an array of day numbers."""
+        return np.array([to_day(holiday) for holiday in SA_PUBLIC_HOLIDAYS_2025])
 
     def init_ui(self):
         layout = QVBoxLayout(self)
@@ -416,6 +472,8 @@ class CalendarTab(QWidget):
         self.search_input = QLineEdit()
         self.search_input.setObjectName("searchInput")
         self.search_input.setPlaceholderText("Search by teams, projects, or artisans...")
+        # Filter once typing pauses rather than on every keystroke
+        self.search_input.textChanged.connect(lambda: self.search_timer.start(config.SEARCH_DELAY))
         controls_layout.addWidget(self.search_input)
 
         controls_layout.addStretch()
@@ -436,21 +494,45 @@ class CalendarTab(QWidget):
         sync_button.clicked.connect(self.sync_outlook)
         controls_layout.addWidget(sync_button)
 
-        layout.addLayout(controls_layout)
-
-        # Scroll area for the Gantt chart
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.verticalScrollBar().valueChanged.connect(self.on_scroll)
+        if self.edit_buffer:
+            controls_layout.addSpacing(20)
+            # Batch editing: drags are held and saved together
+            self.batch_button = QPushButton("Batch Edits")
+            self.batch_button.setCheckable(True)
+            self.batch_button.setChecked(self.edit_buffer.enabled)
+            self.batch_button.toggled.connect(self.toggle_batch_edits)
+            controls_layout.addWidget(self.batch_button)
+            self.pending_label = QLabel()
+            self.pending_label.setStyleSheet("color: #c05621; font-family: 'Roboto';")
+            controls_layout.addWidget(self.pending_label)
+            self.save_button = QPushButton("Save")
+            self.save_button.clicked.connect(self.save_edits)
+            controls_layout.addWidget(self.save_button)
+            self.on_edits_changed()
 
-        self.gantt_widget = QWidget()
-        self.gantt_canvas = FigureCanvas(plt.Figure(figsize=(24, 16)))
-        self.gantt_canvas.setStyleSheet("background-color: #FFFFFF;")
-        self.gantt_layout = QVBoxLayout(self.gantt_widget)
-        self.gantt_layout.addWidget(self.gantt_canvas)
-        self.scroll_area.setWidget(self.gantt_widget)
+        layout.addLayout(controls_layout)
 
-        layout.addWidget(self.scroll_area, stretch=1)
+        self.gantt_view = None
+        if config.GANTT_ENGINE == "scene":
+            # Native Qt renderer; it scrolls, zooms and handles the mouse itself
+            from ui.tabs.gantt_scene import GanttView
+            self.gantt_view = GanttView(self)
+            layout.addWidget(self.gantt_view, stretch=1)
+        else:
+            # The canvas fills the tab and the scrollbar beside it pages through
+            # the rows, so the figure never grows with the schedule
+            self.gantt_widget = QWidget()
+            self.gantt_canvas = FigureCanvas(plt.Figure())
+            self.gantt_canvas.setStyleSheet("background-color: #FFFFFF;")
+            self.gantt_canvas.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+            self.row_scrollbar = QScrollBar(Qt.Orientation.Vertical)
+            self.row_scrollbar.valueChanged.connect(self.on_scroll)
+            self.gantt_layout = QHBoxLayout(self.gantt_widget)
+            self.gantt_layout.setContentsMargins(0, 0, 0, 0)
+            self.gantt_layout.addWidget(self.gantt_canvas)
+            self.gantt_layout.addWidget(self.row_scrollbar)
+
+            layout.addWidget(self.gantt_widget, stretch=1)
 
         # Chatbot Icon (Smaller, Circular Button, Bottom Right)
         self.chatbot_button = QPushButton("💬")
@@ -479,11 +561,17 @@ class CalendarTab(QWidget):
         self.load_gantt_data()
 
         # Gantt interactivity
-        self.gantt_canvas.mpl_connect('button_press_event', self.on_press)
-        self.gantt_canvas.mpl_connect('motion_notify_event', self.on_motion)
-        self.gantt_canvas.mpl_connect('button_release_event', self.on_release)
+        if self.gantt_view is None:
+            self.gantt_canvas.mpl_connect('button_press_event', self.on_press)
+            self.gantt_canvas.mpl_connect('motion_notify_event', self.on_motion)
+            self.gantt_canvas.mpl_connect('button_release_event', self.on_release)
+            self.gantt_canvas.mpl_connect('draw_event', self.on_draw)
+            self.gantt_canvas.mpl_connect('scroll_event', self.on_wheel)
+            self.gantt_canvas.mpl_connect('resize_event', self.on_canvas_resize)
 
     def contextMenuEvent(self, event):
+        if self.gantt_view is not None:
+            return  # The view offers its own menu, with the date under the cursor
         context_menu = QMenu(self)
         new_project_action = context_menu.addAction("Start New Project")
         action = context_menu.exec(event.globalPos())
@@ -502,12 +590,16 @@ class CalendarTab(QWidget):
                 if event.dblclick:
                     self.on_double_click(project_idx, assignment)
                 else:
-                    self.selected_bar = {"bar": bar, "assignment": assignment, "project_idx": project_idx, "start": start, "end": end}
+                    self.selected_bar = {"bar": bar, "assignment": assignment, "project_idx": project_idx, "start": start, "end": end,
+                                         "edgecolor": bar.get_edgecolor(), "pressed": self.bar_span(bar),
+                                         "span": (assignment["start_day"], assignment["end_day"]), "conflict": None}
                     self.drag_start_x = event.xdata
+                    self.drag_start_bar_x = bar.get_x()
                     self.drag_start_width = bar.get_width()
                     bar_x = bar.get_x()
                     bar_width = bar.get_width()
                     self.drag_edge = 'left' if abs(event.xdata - bar_x) < abs(event.xdata - (bar_x + bar_width)) else 'right'
+                    self.start_drag_blit()
                 break
 
     def on_double_click(self, project_idx, assignment):
@@ -523,7 +615,7 @@ class CalendarTab(QWidget):
         delta = event.xdata - self.drag_start_x
         bar = self.selected_bar["bar"]
         if self.drag_edge == 'left':
-            new_x = bar.get_x() + delta
+            new_x = self.drag_start_bar_x + delta
             new_width = self.drag_start_width - delta
             if new_width > 0:
                 bar.set_x(new_x)
@@ -531,43 +623,144 @@ class CalendarTab(QWidget):
         else:
             new_width = max(1, self.drag_start_width + delta)
             bar.set_width(new_width)
-        if not self.redraw_timer.isActive():
-            self.redraw_timer.start(50)
-        self.redraw_pending = True
+        self.show_drag_conflict()
+        self.update_drag_label()
+        self.blit_drag()
 
-    def deferred_redraw(self):
-        if self.redraw_pending:
-            self.gantt_canvas.draw()
-            self.redraw_pending = False
+    def start_drag_blit(self):
+        """Take the selected bar out of the static chart and capture what is left as the drag background."""
+        bar = self.selected_bar["bar"]
+        ax = bar.axes
+        bar.set_animated(True)
+        self.drag_label = ax.text(0, 0, "", fontsize=8, fontfamily='Roboto', va='center', zorder=7, animated=True,
+                                  bbox=dict(boxstyle="round,pad=0.3", facecolor="white", edgecolor="#999999"))
+        self.update_drag_label()
+        # on_draw captures the background once this full draw is done
+        self.gantt_canvas.draw()
+
+    def on_draw(self, event):
+        # Any full draw during a drag (its start, a resize) leaves out the
+        # animated artists, so it becomes the new background
+        if not self.selected_bar or self.drag_label is None:
+            return
+        self.drag_background = self.gantt_canvas.copy_from_bbox(self.gantt_canvas.figure.axes[0].bbox)
+        self.draw_drag_artists()
+
+    def draw_drag_artists(self):
+        ax = self.gantt_canvas.figure.axes[0]
+        ax.draw_artist(self.selected_bar["bar"])
+        ax.draw_artist(self.drag_label)
+
+    def blit_drag(self):
+        """Repaint only the dragged bar and its label over the saved background."""
+        if self.drag_background is None:
+            return
+        self.gantt_canvas.restore_region(self.drag_background)
+        self.draw_drag_artists()
+        self.gantt_canvas.blit(self.gantt_canvas.figure.axes[0].bbox)
+
+    def update_drag_label(self):
+        """Show the dates the dragged bar now covers beside it."""
+        bar = self.selected_bar["bar"]
+        start_day, end_day = self.drag_span()
+        days = end_day - start_day + 1
+        self.drag_label.set_text(f"{datetime.fromordinal(start_day):%a %d %b} – {datetime.fromordinal(end_day):%a %d %b}"
+                                 f" ({days} day{'s' if days != 1 else ''})")
+        self.drag_label.set_position((bar.get_x() + 0.2, bar.get_y() + bar.get_height() / 2))
+
+    def cancel_drag(self):
+        """End a drag in progress without writing it."""
+        if self.drag_label is not None:
+            self.end_drag_blit()
+            self.selected_bar = None
+
+    def end_drag_blit(self):
+        self.selected_bar["bar"].set_animated(False)
+        if self.drag_label is not None:
+            self.drag_label.remove()
+        self.drag_label = None
+        self.drag_background = None
+
+    def show_drag_conflict(self):
+        """Outline the dragged bar in red, with the reason as a tooltip, while its new span breaks the hours cap."""
+        selected = self.selected_bar
+        span = self.drag_span()
+        if span == selected["span"]:
+            return
+        selected["span"] = span
+        assignment = selected["assignment"]
+        conflict = self.db.check_conflict(assignment["artisan_id"], *span, assignment_id=assignment["id"])
+        selected["conflict"] = conflict
+        bar = selected["bar"]
+        if conflict:
+            bar.set_edgecolor("red")
+            bar.set_linewidth(2)
+            QToolTip.showText(QCursor.pos(), str(ConflictError(conflict, assignment["artisan_name"])), self.gantt_canvas)
+        else:
+            bar.set_edgecolor(selected["edgecolor"])
+            bar.set_linewidth(1)
+            QToolTip.hideText()
+
+    @staticmethod
+    def bar_span(bar):
+        """Return the (start_day, end_day) a bar currently covers; bars are drawn from day - 0.5."""
+        start_day = round(bar.get_x() + 0.5)
+        return start_day, start_day + max(1, round(bar.get_width())) - 1
+
+    def drag_span(self):
+        """Return the span the selected assignment would cover if the drag ended now."""
+        selected = self.selected_bar
+        edge = 0 if self.drag_edge == 'left' else 1
+        days = self.bar_span(selected["bar"])[edge] - selected["pressed"][edge]
+        return dragged_span(selected["assignment"], self.drag_edge, days)
 
     def on_release(self, event):
         if self.selected_bar:
             bar = self.selected_bar["bar"]
             assignment = self.selected_bar["assignment"]
-            start_date = datetime.fromordinal(int(bar.get_x())).strftime("%Y-%m-%d")
-            end_date = (datetime.fromordinal(int(bar.get_x())) + 
-                        timedelta(days=int(bar.get_width()) - 1)).strftime("%Y-%m-%d")
-            try:
-                self.db.update_assignment(assignment[0], start_date, end_date)
-                self.load_gantt_data()
-                # Refresh the parent (MainWindow) to update other tabs like Dashboard
-                if self.parent and hasattr(self.parent, 'navigate_to'):
-                    self.parent.navigate_to(self.parent.selected_tab)
-            except ValueError as e:
-                QMessageBox.critical(self, "Error", str(e))
+            span = self.drag_span()
+            QToolTip.hideText()
+            self.end_drag_blit()
+            if span == (assignment["start_day"], assignment["end_day"]):
+                # A click, or a drag back to where it began: nothing to write
+                bar.set_x(self.drag_start_bar_x)
+                bar.set_width(self.drag_start_width)
+                bar.set_edgecolor(self.selected_bar["edgecolor"])
+                bar.set_linewidth(1)
+                self.gantt_canvas.draw_idle()
+            else:
+                self.move_assignment(assignment, *span)
             self.selected_bar = None
             self.drag_edge = None
         self.drag_data = None
 
+    def move_assignment(self, assignment, start_day, end_day):
+        """Write a dragged assignment's new span, or hold it while batch editing; errors are shown and the bar put back."""
+        start_date = datetime.fromordinal(start_day).strftime("%Y-%m-%d")
+        end_date = datetime.fromordinal(end_day).strftime("%Y-%m-%d")
+        try:
+            if self.edit_buffer and self.edit_buffer.enabled:
+                # Check now what can be checked, show the move, and write it later
+                conflict = self.db.check_conflict(assignment["artisan_id"], start_day, end_day,
+                                                  assignment_id=assignment["id"])
+                if conflict:
+                    raise ConflictError(conflict, assignment["artisan_name"])
+                self.edit_buffer.update_assignment(assignment["id"], start_date, end_date)
+                self.edit_buffer.overlay(self.gantt_rows)
+                self.update_gantt_chart()
+            else:
+                self.db.update_assignment(assignment["id"], start_date, end_date)
+        except ValueError as e:
+            QMessageBox.critical(self, "Error", str(e))
+            # Nothing changed, so no event will redraw the bar where it was
+            self.update_gantt_chart()
+
     def edit_project(self, project_idx, assignment):
-        project_id = assignment[2]  # project_id from the assignment
+        project_id = assignment["project_id"]
         # Fetch the project details
-        project = self.db.cursor.execute("SELECT * FROM projects WHERE id = ?", (project_id,)).fetchone()
+        project = self.db.get_project(project_id)
         # Fetch the currently assigned artisans
-        assigned_artisans = self.db.cursor.execute(
-            "SELECT a.id, a.name FROM artisans a JOIN assignments ass ON a.id = ass.artisan_id WHERE ass.project_id = ?",
-            (project_id,)
-        ).fetchall()
+        assigned_artisans = self.db.get_project_artisans(project_id)
         dialog = EditProjectDialog(project, self.db.get_artisans(), assigned_artisans, self)
         if dialog.exec():
             data = dialog.get_data()
@@ -583,42 +776,29 @@ class CalendarTab(QWidget):
                 if end_date < start_date:
                     raise ValueError("End date must be after start date")
 
-                # Update project details
-                self.db.cursor.execute(
-                    "UPDATE projects SET name = ?, start_date = ?, end_date = ?, job_number = ?, description = ? WHERE id = ?",
-                    (data["job_name"], data["start_date"], data["end_date"], data["job_number"], data["description"], project_id)
-                )
+                with self.db.transaction():
+                    # Update project details
+                    self.db.update_project(project_id, data["job_name"], data["start_date"], data["end_date"],
+                                           data["job_number"], data["description"])
 
-                # Update assignments: remove old assignments and add new ones
-                self.db.cursor.execute("DELETE FROM assignments WHERE project_id = ?", (project_id,))
-                for artisan_id in data["assigned_artisans"]:
-                    self.db.add_assignment(artisan_id, project_id, data["start_date"], data["end_date"])
+                    # Update assignments: remove old assignments and add new ones
+                    self.db.delete_project_assignments(project_id)
+                    for artisan_id in data["assigned_artisans"]:
+                        self.db.add_assignment(artisan_id, project_id, data["start_date"], data["end_date"])
 
-                self.db.conn.commit()
                 QMessageBox.information(self, "Success", f"Project {data['job_name']} updated successfully")
-                self.load_gantt_data()
-                # Refresh the parent (MainWindow) to update other tabs like Dashboard
-                if self.parent and hasattr(self.parent, 'navigate_to'):
-                    self.parent.navigate_to(self.parent.selected_tab)
             except ValueError as e:
                 QMessageBox.critical(self, "Error", str(e))
 
     def delete_project(self, project_idx, assignment):
-        project_id = assignment[2]  # project_id from the assignment
-        project = self.db.cursor.execute("SELECT * FROM projects WHERE id = ?", (project_id,)).fetchone()
+        project_id = assignment["project_id"]
+        project = self.db.get_project(project_id)
         reply = QMessageBox.question(self, "Confirm Delete", f"Are you sure you want to delete project '{project[1]}'?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            # Delete assignments associated with the project
-            self.db.cursor.execute("DELETE FROM assignments WHERE project_id = ?", (project_id,))
-            # Delete the project
-            self.db.cursor.execute("DELETE FROM projects WHERE id = ?", (project_id,))
-            self.db.conn.commit()
+            # Deletes the project together with its assignments
+            self.db.delete_project(project_id)
             QMessageBox.information(self, "Success", f"Project '{project[1]}' deleted successfully")
-            self.load_gantt_data()
-            # Refresh the parent (MainWindow) to update other tabs like Dashboard
-            if self.parent and hasattr(self.parent, 'navigate_to'):
-                self.parent.navigate_to(self.parent.selected_tab)
 
     def start_new_project(self, start_date):
         dialog = NewProjectDialog(self.db.get_artisans(), start_date.strftime("%Y-%m-%d"), self)
@@ -638,62 +818,119 @@ class CalendarTab(QWidget):
                 if end_date < start_date:
                     raise ValueError("End date must be after start date")
 
-                project_id = self.db.add_project(
-                    name=data["job_name"],
-                    start_date=data["start_date"],
-                    end_date=data["end_date"],
-                    status="Active",
-                    job_number=data["job_number"],
-                    description=data["description"]
-                )
-
-                artisan_ids = [data["artisan_id"]]
-                if data["additional_artisan_id"]:
-                    artisan_ids.append(data["additional_artisan_id"])
-
-                team_id = None
-                if len(artisan_ids) > 1 and data["team_name"]:
-                    team_name = data["team_name"]
-                    team_id = self.db.add_team(team_name)
-
-                for artisan_id in artisan_ids:
-                    self.db.add_assignment(artisan_id, project_id, data["start_date"], data["end_date"])
-                    if team_id:
-                        self.db.update_artisan_team(artisan_id, team_id)
+                with self.db.transaction():
+                    project_id = self.db.add_project(
+                        name=data["job_name"],
+                        start_date=data["start_date"],
+                        end_date=data["end_date"],
+                        status="Active",
+                        job_number=data["job_number"],
+                        description=data["description"]
+                    )
+
+                    artisan_ids = [data["artisan_id"]]
+                    if data["additional_artisan_id"]:
+                        artisan_ids.append(data["additional_artisan_id"])
+
+                    team_id = None
+                    if len(artisan_ids) > 1 and data["team_name"]:
+                        team_name = data["team_name"]
+                        team_id = self.db.add_team(team_name)
+
+                    for artisan_id in artisan_ids:
+                        self.db.add_assignment(artisan_id, project_id, data["start_date"], data["end_date"])
+                        if team_id:
+                            self.db.update_artisan_team(artisan_id, team_id)
 
                 QMessageBox.information(self, "Success", f"Project {data['job_name']} created with ID {project_id}")
-                self.load_gantt_data()
-                # Refresh the parent (MainWindow) to update other tabs like Dashboard
-                if self.parent and hasattr(self.parent, 'navigate_to'):
-                    self.parent.navigate_to(self.parent.selected_tab)
             except ValueError as e:
                 QMessageBox.critical(self, "Error", str(e))
 
     def load_gantt_data(self):
-        projects = self.db.get_projects()
-        projects = [p for p in projects if p[4] == "Active"]
-        assignments = self.db.get_assignments()
-        artisans = {a[0]: (a[1], a[5]) for a in self.db.get_artisans()}  # (name, profile_picture)
-        teams = {t[0]: t[1] for t in self.db.cursor.execute("SELECT id, name FROM teams").fetchall()}
-        # Cache project assignments and team names
-        self.project_assignments = {p[0]: [a for a in assignments if a[2] == p[0]] for p in projects}
-        self.team_names = {}
-        for p in projects:
-            project_id = p[0]
-            team_id = self.db.cursor.execute(
-                "SELECT team_id FROM artisans WHERE id IN (SELECT artisan_id FROM assignments WHERE project_id = ?)",
-                (project_id,)
-            ).fetchone()
-            self.team_names[project_id] = teams.get(team_id[0], "No Team Facetools") if team_id and team_id[0] else "No Team"
-        # Cache artisan images
-        for artisan_id, (name, picture_path) in artisans.items():
-            try:
-                self.artisan_images[artisan_id] = mpimg.imread(picture_path)
-            except FileNotFoundError:
-                self.artisan_images[artisan_id] = None
-        self.update_gantt_chart(assignments, projects, artisans, teams)
-
-    def update_gantt_chart(self, assignments, projects, artisans, teams):
+        window_start = self.start_date.toordinal()
+        self.gantt_rows = self.collect_gantt_data(self.db, window_start, self.date_range)
+        if self.edit_buffer:
+            self.edit_buffer.overlay(self.gantt_rows)
+        self.update_gantt_chart()
+
+    @staticmethod
+    def collect_gantt_data(db, window_start, date_range):
+        """Data phase of load_gantt_data: fetch the rows for a window, without drawing.
+
+        Avatars are not read here; materialize_rows takes them from the
+        avatar cache for the rows it shows.
+        """
+        # One joined query for everything overlapping the visible window
+        return db.load_gantt_view(window_start, window_start + date_range - 1)
+
+    def on_schedule_changed(self, changes):
+        """Rebuild only the Gantt rows of the projects the committed changes touch."""
+        project_ids = set()
+        for change in changes:
+            if change.kind == "project":
+                project_ids.add(change.id)
+            elif change.kind == "assignment":
+                project_ids.update(row[2] for row in (change.old, change.new) if row)
+            elif change.kind in ("artisan", "team"):
+                # Names, pictures and team labels of the rows that show the artisan
+                for row in self.gantt_rows:
+                    if any(change.kind == "team" or a["artisan_id"] == change.id for a in row["assignments"]):
+                        project_ids.add(row["id"])
+        if self.search_matches is not None and any(change.kind != "assignment" for change in changes):
+            # Renamed, added or regrouped rows may now match the search, or no longer
+            self.search_matches = self.find_search_matches(self.search_input.text())
+        if not project_ids:
+            return
+        window_start = self.start_date.toordinal()
+        window_end = window_start + self.date_range - 1
+        rows = {row["id"]: row for row in self.gantt_rows}
+        for project_id in project_ids:
+            row = self.db.gantt_row(project_id, window_start, window_end)
+            if row is None:
+                rows.pop(project_id, None)
+            else:
+                rows[project_id] = row
+        self.gantt_rows = [rows[project_id] for project_id in sorted(rows)]
+        if self.edit_buffer:
+            self.edit_buffer.overlay(self.gantt_rows)
+        self.update_gantt_chart()
+
+    def apply_search(self):
+        """Filter the Gantt rows down to the matches for the search box text."""
+        self.search_matches = self.find_search_matches(self.search_input.text())
+        self.scroll_offset = 0
+        if self.gantt_view is not None:
+            self.gantt_view.verticalScrollBar().setValue(self.gantt_view.verticalScrollBar().minimum())
+        else:
+            self.row_scrollbar.setValue(0)
+        self.update_gantt_chart()
+
+    def find_search_matches(self, query):
+        """Return the (project_ids, artisan_ids) whose rows match query, or None for an empty query."""
+        if not query.strip():
+            return None
+        ids = self.db.search_ids(query)
+        project_ids, artisan_ids, team_ids = ids["project"], ids["artisan"], ids["team"]
+        if team_ids:
+            # A team matches the projects its artisans work on
+            artisan_ids.update(artisan[0] for artisan in self.db.get_artisans() if artisan[ARTISAN_TEAM] in team_ids)
+        return project_ids, artisan_ids
+
+    def filtered_rows(self):
+        """Return the Gantt rows the search box lets through."""
+        if self.search_matches is None:
+            return self.gantt_rows
+        project_ids, artisan_ids = self.search_matches
+        return [row for row in self.gantt_rows
+                if row["id"] in project_ids or any(a["artisan_id"] in artisan_ids for a in row["assignments"])]
+
+    def update_gantt_chart(self):
+        self.cancel_drag()  # Every artist is about to be rebuilt
+        rows = self.filtered_rows()
+        if self.gantt_view is not None:
+            self.gantt_view.set_rows(rows, self.start_date.toordinal(), self.date_range, self.holidays, self.project_color)
+            return
+        self.chart_rows = rows
         self.gantt_canvas.figure.clear()
         ax = self.gantt_canvas.figure.add_subplot(111)
 
@@ -704,146 +941,45 @@ class CalendarTab(QWidget):
 
         # Add month and year above the dates with reduced padding
         month_year = self.start_date.strftime("%B %Y")
-        ax.set_title(month_year, fontsize=12, pad=15, fontfamily='Roboto', fontweight='bold')
+        ax.set_title(month_year, fontsize=12, pad=20, fontfamily='Roboto', fontweight='bold')
+
+        # Background: one PolyCollection per layer. Their cells are filled in
+        # by materialize_rows for the rows around the view
+        cell_xs = date_ordinals - 0.5
+        weekday = (date_ordinals - 1) % 7  # date.fromordinal(1) is a Monday
+        layers = [
+            # (column positions, column width, alternate rows only, style)
+            (cell_xs[:1], float(self.date_range), True, dict(facecolor=ALTERNATING_ROW_COLOR, zorder=0)),
+            (cell_xs, self.block_width, False, dict(facecolor=GRID_CELL_COLOR, zorder=1)),
+            (cell_xs[::2], self.block_width, False, dict(facecolor=ALTERNATING_DAY_COLOR, alpha=0.3, zorder=2)),
+            (cell_xs[weekday >= 5], self.block_width, False, dict(facecolor=WEEKEND_COLOR, alpha=0.5, zorder=3)),
+            (cell_xs[np.isin(date_ordinals, self.holidays)], self.block_width, False,
+             dict(facecolor=HOLIDAY_COLOR, alpha=0.5, zorder=3)),
+        ]
+        self.background_layers = [(xs, width, alternate, ax.add_collection(PolyCollection([], edgecolor='none', **style)))
+                                  for xs, width, alternate, style in layers]
 
-        # Define block dimensions
-        self.block_height = 22
-        self.block_width = 0.8
-        self.row_gap = 3
-        num_rows = max(len(projects), self.visible_rows)  # Total number of rows needed
-
-        # Precompute y-positions for all rows
-        self.y_pos = [(num_rows - 1 - i) * (self.block_height + self.row_gap) for i in range(num_rows)]
-        self.y_pos_centered = [y + self.block_height / 2 for y in self.y_pos]
-
-        # Determine visible rows based on scroll position
-        start_row = self.scroll_offset
-        end_row = min(start_row + self.visible_rows, num_rows)
-        visible_y_pos = self.y_pos[start_row:end_row]
-        visible_y_pos_centered = self.y_pos_centered[start_row:end_row]
-
-        # Create grid cells using PatchCollection
-        grid_cells = []
-        alternating_cells = []
-        weekend_cells = []
-        holiday_cells = []
-        day_numbers = []
-        row_backgrounds = []
-        for row_idx in range(start_row, end_row):
-            y = self.y_pos[row_idx]
-            # Add alternating row background
-            if row_idx % 2 == 0:
-                row_background = Rectangle((date_ordinals[0] - 0.5, y), 
-                                           len(date_list), self.block_height, 
-                                           facecolor=ALTERNATING_ROW_COLOR, zorder=0)
-                row_backgrounds.append(row_background)
-            for i, d in enumerate(date_list):
-                ordinal = d.toordinal()
-                # Base grid cell (no grid lines)
-                cell = Rectangle((ordinal - 0.5, y), self.block_width, self.block_height, 
-                                 edgecolor='none', facecolor=GRID_CELL_COLOR)
-                grid_cells.append(cell)
-                # Day number
-                day_numbers.append((ordinal, y + self.block_height - 5, d.strftime("%d")))
-                # Alternating background for days
-                if i % 2 == 0:
-                    alternating_cells.append(Rectangle((ordinal - 0.5, y), self.block_width, self.block_height))
-                # Weekend background
-                if d.weekday() >= 5:
-                    weekend_cells.append(Rectangle((ordinal - 0.5, y), self.block_width, self.block_height))
-                # Holiday background
-                if d.strftime("%Y-%m-%d") in self.holidays:
-                    holiday_cells.append(Rectangle((ordinal - 0.5, y), self.block_width, self.block_height))
-
-        # Draw row backgrounds
-        if row_backgrounds:
-            row_bg_collection = PatchCollection(row_backgrounds, match_original=True, zorder=0)
-            ax.add_collection(row_bg_collection)
-
-        # Draw grid cells using PatchCollection
-        grid_collection = PatchCollection(grid_cells, edgecolor='none', facecolor=GRID_CELL_COLOR, zorder=1)
-        ax.add_collection(grid_collection)
-
-        # Draw alternating day backgrounds
-        if alternating_cells:
-            alt_collection = PatchCollection(alternating_cells, facecolor=ALTERNATING_DAY_COLOR, alpha=0.3, zorder=2)
-            ax.add_collection(alt_collection)
-
-        # Draw weekend backgrounds
-        if weekend_cells:
-            weekend_collection = PatchCollection(weekend_cells, facecolor=WEEKEND_COLOR, alpha=0.5, zorder=3)
-            ax.add_collection(weekend_collection)
-
-        # Draw holiday backgrounds
-        if holiday_cells:
-            holiday_collection = PatchCollection(holiday_cells, facecolor=HOLIDAY_COLOR, alpha=0.5, zorder=3)
-            ax.add_collection(holiday_collection)
-
-        # Draw day numbers
-        for x, y, text in day_numbers:
-            ax.text(x, y, text, fontsize=8, fontfamily='Roboto', color='black', ha='center', va='top', zorder=4)
-
-        # Add days of the week at the bottom
+        # Day numbers once along the top, days of the week at the bottom
         ax.set_xticks(date_ordinals)
-        ax.set_xticklabels([d.strftime("%a")[0:2].capitalize() for d in date_list], 
-                           fontsize=8, fontfamily='Roboto', rotation=0)
+        ax.set_xticklabels([WEEKDAY_LABELS[i] for i in weekday], fontsize=8, fontfamily='Roboto', rotation=0)
         ax.tick_params(axis='x', which='major', pad=10)
         ax.xaxis.set_minor_locator(mdates.DayLocator())
-
-        # Projects on y-axis
-        y_labels = [""] * self.visible_rows
-        for project_idx in range(start_row, min(end_row, len(projects))):
-            visible_idx = project_idx - start_row
-            project = projects[project_idx]
-            project_id = project[0]
-            project_assignments = self.project_assignments.get(project_id, [])
-            artisans_in_project = [artisans[a[1]][0] for a in project_assignments]
-            team_name = self.team_names.get(project_id, "No Team")
-            y_labels[visible_idx] = f"{project[1]}\n{team_name}: {', '.join(artisans_in_project)}"
-        ax.set_yticks(visible_y_pos_centered)
-        ax.set_yticklabels(y_labels, fontsize=9, fontfamily='Roboto', fontweight='bold', va='center')
+        day_header = ax.secondary_xaxis('top')
+        day_header.set_xticks(date_ordinals)
+        day_header.set_xticklabels([f"{date.day:02d}" for date in date_list], fontsize=8, fontfamily='Roboto')
+        day_header.tick_params(axis='x', length=0, pad=2)
 
         # Adjust the margins
         self.gantt_canvas.figure.subplots_adjust(left=0.25, bottom=0.2, top=0.92)
 
-        # Draw project bars
+        # Bars and avatars come from these pools; materialize_rows hands them
+        # out again whenever the rows around the view change
+        self.bar_pool = []
+        self.avatar_pool = []
+        self.avatar_dots = ax.scatter([], [], s=30, marker='o', zorder=6)
         self.bars = []
-        for project_idx in range(start_row, min(end_row, len(projects))):
-            visible_idx = project_idx - start_row
-            project = projects[project_idx]
-            project_id = project[0]
-            project_assignments = self.project_assignments.get(project_id, [])
-            if project_id not in self.project_colors:
-                color = PROJECT_COLORS[self.project_color_index % len(PROJECT_COLORS)]
-                self.project_colors[project_id] = color
-                self.project_color_index += 1
-            project_color = self.project_colors[project_id]
-            y = visible_y_pos[visible_idx]
-            for idx, assignment in enumerate(project_assignments):
-                start = datetime.strptime(assignment[3], "%Y-%m-%d")
-                end = datetime.strptime(assignment[4], "%Y-%m-%d")
-                start_ordinal = max(start.toordinal(), self.start_date.toordinal())
-                end_ordinal = min(end.toordinal(), end_date.toordinal())
-                if start_ordinal <= end_ordinal:
-                    bar_width = end_ordinal - start_ordinal + 1
-                    bar = Rectangle((start_ordinal - 0.5, y), bar_width, self.block_height, 
-                                    color=project_color, alpha=0.4, zorder=5)
-                    ax.add_patch(bar)
-                    gradient = ax.fill_betweenx([y, y + self.block_height], 
-                                                start_ordinal - 0.5, start_ordinal + bar_width - 0.5, 
-                                                color=project_color, alpha=0.2, zorder=5)
-                    self.bars.append((bar, assignment, project_idx, start, end))
-                for i, artisan in enumerate([(a[1], artisans[a[1]][1]) for a in project_assignments]):
-                    artisan_id, picture_path = artisan
-                    img = self.artisan_images.get(artisan_id)
-                    if img is not None:
-                        imagebox = OffsetImage(img, zoom=0.03)
-                        ab = AnnotationBbox(imagebox, (start.toordinal() + (i * 0.4), y + self.block_height - 5), frameon=False, zorder=6)
-                        ax.add_artist(ab)
-                    else:
-                        ax.scatter(start.toordinal() + (i * 0.4), y + self.block_height - 5, s=30, color=f"C{i}", marker='o', zorder=6)
-
-        ax.set_ylim(min(visible_y_pos) - self.row_gap, max(visible_y_pos) + self.block_height + self.row_gap)
+        self.materialized = (0, 0)
+
         ax.set_xlim(self.start_date.toordinal() - 1, end_date.toordinal() + 1)
 
         # Add legend
@@ -857,8 +993,117 @@ class CalendarTab(QWidget):
                   facecolor=LEGEND_BG_COLOR, edgecolor='none', 
                   labelcolor=LEGEND_TEXT_COLOR)
 
+        self.update_row_range()
+        self.show_rows()
         self.gantt_canvas.draw()
 
+    def update_row_range(self):
+        """Size the scrollbar to the row count, in rows, keeping the scroll position where it still fits."""
+        scrollbar = self.row_scrollbar
+        scrollbar.blockSignals(True)
+        scrollbar.setRange(0, max(0, len(self.chart_rows) - self.visible_rows))
+        scrollbar.setPageStep(self.visible_rows)
+        scrollbar.blockSignals(False)
+        self.scroll_offset = scrollbar.value()
+
+    def show_rows(self):
+        """Bring the rows from scroll_offset into view, materializing the rows around them first if needed."""
+        first, last = self.scroll_offset, self.scroll_offset + self.visible_rows
+        if first < self.materialized[0] or last > self.materialized[1]:
+            self.materialize_rows(max(0, first - OVERSCAN_ROWS), last + OVERSCAN_ROWS)
+        pitch = self.block_height + self.row_gap
+        # Row 0 is at the top: the y axis runs downwards
+        self.gantt_canvas.figure.axes[0].set_ylim((last - 1) * pitch + self.block_height + self.row_gap,
+                                                  first * pitch - self.row_gap)
+
+    def materialize_rows(self, first, last):
+        """Give rows first..last-1 their background cells, labels, bars and avatars, reusing the pooled artists."""
+        ax = self.gantt_canvas.figure.axes[0]
+        rows = self.chart_rows
+        pitch = self.block_height + self.row_gap
+        indexes = np.arange(first, last)
+        row_ys = indexes * float(pitch)
+        for xs, width, alternate, collection in self.background_layers:
+            ys = row_ys[indexes % 2 == 0] if alternate else row_ys
+            collection.set_verts(cell_polygons(xs, ys, width, self.block_height))
+
+        # Projects on y-axis
+        shown = range(first, min(last, len(rows)))
+        y_labels = []
+        for project_idx in shown:
+            row = rows[project_idx]
+            artisans_in_project = [a["artisan_name"] for a in row["assignments"]]
+            y_labels.append(f"{row['name']}\n{row['team_name']}: {', '.join(artisans_in_project)}")
+        ax.set_yticks([project_idx * pitch + self.block_height / 2 for project_idx in shown])
+        ax.set_yticklabels(y_labels, fontsize=9, fontfamily='Roboto', fontweight='bold', va='center')
+
+        # Draw project bars
+        window_start = self.start_date.toordinal()
+        window_end = window_start + self.date_range - 1
+        self.bars = []
+        avatars = []  # (x, y, image or None, index in the row)
+        for project_idx in shown:
+            row = rows[project_idx]
+            project_assignments = row["assignments"]
+            project_color = self.project_color(row["id"])
+            y = project_idx * pitch
+            for assignment in project_assignments:
+                start, end = assignment["start_day"], assignment["end_day"]
+                start_ordinal = max(start, window_start)
+                end_ordinal = min(end, window_end)
+                if start_ordinal <= end_ordinal:
+                    bar, gradient = self.pooled_bar(len(self.bars))
+                    for patch in (bar, gradient):
+                        patch.set_bounds(start_ordinal - 0.5, y, end_ordinal - start_ordinal + 1, self.block_height)
+                        patch.set_color(project_color)
+                        patch.set_visible(True)
+                    bar.set_linewidth(1)
+                    self.bars.append((bar, assignment, project_idx, start, end))
+            # Artisan avatars side by side from the start of the row's first bar
+            if project_assignments:
+                avatar_x = max(project_assignments[0]["start_day"], window_start)
+            for i, assignment in enumerate(project_assignments):
+                avatars.append((avatar_x + (i * 0.4), y + 5, self.avatar_cache.get(assignment["profile_picture"]), i))
+        for bar, gradient in self.bar_pool[len(self.bars):]:
+            bar.set_visible(False)
+            gradient.set_visible(False)
+
+        pictures = [avatar for avatar in avatars if avatar[2] is not None]
+        for k, (x, y, img, _) in enumerate(pictures):
+            ab = self.pooled_avatar(k)
+            ab.offsetbox.set_data(img)
+            ab.xy = ab.xybox = (x, y)
+            ab.set_visible(True)
+        for ab in self.avatar_pool[len(pictures):]:
+            ab.set_visible(False)
+        dots = [avatar for avatar in avatars if avatar[2] is None]
+        self.avatar_dots.set_offsets(np.array([(x, y) for x, y, _, _ in dots], dtype=float).reshape(-1, 2))
+        self.avatar_dots.set_facecolor([f"C{i}" for _, _, _, i in dots])
+        self.materialized = (first, last)
+
+    def pooled_bar(self, index):
+        """Return the index-th (bar, gradient) pair of Rectangles, adding one to the axes if the pool is short."""
+        if index == len(self.bar_pool):
+            ax = self.gantt_canvas.figure.axes[0]
+            self.bar_pool.append((ax.add_patch(Rectangle((0, 0), 1, self.block_height, alpha=0.4, zorder=5)),
+                                  ax.add_patch(Rectangle((0, 0), 1, self.block_height, alpha=0.2, zorder=5))))
+        return self.bar_pool[index]
+
+    def pooled_avatar(self, index):
+        """Return the index-th avatar AnnotationBbox, adding one to the axes if the pool is short."""
+        if index == len(self.avatar_pool):
+            imagebox = OffsetImage(np.zeros((1, 1, 3)), zoom=AVATAR_PIXELS / self.avatar_cache.size)
+            ab = AnnotationBbox(imagebox, (0, 0), frameon=False, zorder=6)
+            self.avatar_pool.append(self.gantt_canvas.figure.axes[0].add_artist(ab))
+        return self.avatar_pool[index]
+
+    def project_color(self, project_id):
+        """Return the project's bar color, handing out the next palette color on first use."""
+        if project_id not in self.project_colors:
+            self.project_colors[project_id] = PROJECT_COLORS[self.project_color_index % len(PROJECT_COLORS)]
+            self.project_color_index += 1
+        return self.project_colors[project_id]
+
     def set_drag_data(self, drag_data):
         self.drag_data = drag_data
 
@@ -879,9 +1124,45 @@ class CalendarTab(QWidget):
         QMessageBox.information(self, "Chatbot", "AI chatbot functionality is not yet implemented.")
 
     def on_scroll(self, value):
-        self.scroll_offset = value // (self.block_height + self.row_gap)
-        self.update_gantt_chart(self.assignments, self.projects, self.artisans, self.teams)
+        self.scroll_offset = value
+        if self.gantt_canvas.figure.axes:
+            self.show_rows()
+            self.gantt_canvas.draw_idle()
+
+    def on_wheel(self, event):
+        if self.selected_bar:
+            return  # The dragged bar's artist must not be recycled under it
+        self.row_scrollbar.setValue(self.row_scrollbar.value() - round(event.step * 3))
+
+    def on_canvas_resize(self, event):
+        subplot = self.gantt_canvas.figure.subplotpars
+        self.visible_rows = max(1, int(self.gantt_canvas.height() * (subplot.top - subplot.bottom) // ROW_PIXELS))
+        if self.gantt_canvas.figure.axes:
+            # The canvas redraws itself after a resize
+            self.update_row_range()
+            self.show_rows()
 
     def refresh(self):
         """Refresh the calendar data."""
-        self.load_gantt_data()
\ No newline at end of file
+        self.load_gantt_data()
+
+    def on_edits_changed(self):
+        count = len(self.edit_buffer.pending)
+        self.pending_label.setText(f"● {count} unsaved edit{'s' if count != 1 else ''}" if count else "")
+        self.save_button.setEnabled(count > 0)
+
+    def toggle_batch_edits(self, checked):
+        self.edit_buffer.enabled = checked
+        if not checked:
+            # Leaving batch mode saves what was held
+            self.save_edits()
+
+    def save_edits(self):
+        if self.parent and hasattr(self.parent, "save_edits"):
+            self.parent.save_edits()
+
+    def detach(self):
+        """Stop listening for schedule and pending edit changes; call before the tab is discarded."""
+        self.db.unsubscribe(self.on_schedule_changed)
+        if self.edit_buffer:
+            self.edit_buffer.unsubscribe(self.on_edits_changed)
\ No newline at end of file
@@ -1,13 +1,16 @@
 ﻿# ui/tabs/dashboard.py
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableWidget, QTableWidgetItem, 
-                             QAbstractItemView, QGridLayout, QFrame, QScrollArea)
+                             QAbstractItemView, QGridLayout, QFrame, QScrollArea, QPushButton)
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QIcon, QFont, QColor
-from datetime import datetime, timedelta
+from datetime import datetime
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import numpy as np
 
+# Activity entries shown at first, and added by each "Show older" click
+ACTIVITY_PAGE_SIZE = 10
+
 class TimelineEntry(QWidget):
     def __init__(self, action, details, timestamp, parent=None):
         super().__init__(parent)
@@ -43,9 +46,10 @@ class TimelineEntry(QWidget):
 class DashboardTab(QWidget):
     def __init__(self, db, parent=None):
         super().__init__(parent)
-        self.db = db
+        self.db = db  # A ScheduleRepository, so edits elsewhere arrive as change events
         self.init_ui()
         self.load_data()
+        self.db.subscribe(self.on_schedule_changed)
 
     def init_ui(self):
         layout = QVBoxLayout(self)
@@ -245,6 +249,11 @@ class DashboardTab(QWidget):
         self.activity_scroll.setStyleSheet("border: none;")
         activity_layout.addWidget(self.activity_scroll)
 
+        # Pages further back through the history, including archived entries
+        self.older_activity_button = QPushButton("Show older")
+        self.older_activity_button.clicked.connect(self.load_older_activities)
+        activity_layout.addWidget(self.older_activity_button)
+
         content_grid.addWidget(activity_card, 1, 1)
 
         layout.addLayout(content_grid)
@@ -255,76 +264,89 @@ class DashboardTab(QWidget):
     def filter_deadlines(self, key):
         if key != "upcoming_deadlines":
             return  # Only filter when clicking "Upcoming Deadlines"
-        today = datetime.now()
-        seven_days_later = today + timedelta(days=7)
+        today = datetime.now().toordinal()
+        seven_days_later = today + 7
         filtered_projects = []
-        for project in self.all_deadline_projects:
-            end_date = datetime.strptime(project[1], "%Y-%m-%d")
-            if today <= end_date <= seven_days_later:
+        for project in self.all_deadline_projects.values():
+            end_day = project[3]
+            if today <= end_day <= seven_days_later:
                 filtered_projects.append(project)
-        self.deadlines_table.setRowCount(len(filtered_projects))
-        for row, (project_name, end_date, artisans) in enumerate(filtered_projects):
-            self.deadlines_table.setItem(row, 0, QTableWidgetItem(project_name))
-            self.deadlines_table.setItem(row, 1, QTableWidgetItem(end_date))
-            self.deadlines_table.setItem(row, 2, QTableWidgetItem(artisans))
-            # Color code based on urgency
-            days_until_due = (datetime.strptime(end_date, "%Y-%m-%d") - today).days
-            color = "#e53e3e" if days_until_due <= 2 else "#d69e2e" if days_until_due <= 5 else "#38a169"
-            for col in range(3):
-                item = self.deadlines_table.item(row, col)
-                if item:
-                    item.setBackground(QColor(color))
-        self.deadlines_table.resizeColumnsToContents()
+        self.show_deadlines(filtered_projects, today)
 
     def load_data(self):
-        # Fetch active projects
-        active_projects = self.db.get_projects()
-        active_projects = [p for p in active_projects if p[4] == "Active"]
-        self.metrics[0] = ("Active Projects", "📋", "active_projects", len(active_projects))
-        self.findChild(QLabel, "active_projects_value").setText(str(len(active_projects)))
-
-        # Fetch total artisans
-        artisans = self.db.get_artisans()
-        self.metrics[1] = ("Total Artisans", "👥", "total_artisans", len(artisans))
-        self.findChild(QLabel, "total_artisans_value").setText(str(len(artisans)))
-
-        # Fetch upcoming deadlines (within 7 days)
-        today = datetime.now()
-        seven_days_later = today + timedelta(days=7)
-        upcoming_deadlines = 0
-        self.all_deadline_projects = []
-        for project in active_projects:
-            end_date = datetime.strptime(project[3], "%Y-%m-%d")
-            # Fetch assigned artisans
-            assignments = self.db.cursor.execute(
-                "SELECT a.name FROM artisans a JOIN assignments ass ON a.id = ass.artisan_id WHERE ass.project_id = ?",
-                (project[0],)
-            ).fetchall()
-            assigned_artisans = ", ".join(a[0] for a in assignments) if assignments else "None"
-            self.all_deadline_projects.append((project[1], project[3], assigned_artisans))
-            if today <= end_date <= seven_days_later:
-                upcoming_deadlines += 1
-        self.metrics[2] = ("Upcoming Deadlines (7 days)", "⏰", "upcoming_deadlines", upcoming_deadlines)
-        self.findChild(QLabel, "upcoming_deadlines_value").setText(str(upcoming_deadlines))
-
-        # Fetch artisan availability
-        assignments = self.db.get_assignments()
-        assigned_artisans = set(a[1] for a in assignments)  # artisan_id from assignments
-        total_artisans = len(artisans)
-        available_artisans = total_artisans - len(assigned_artisans)
-        self.metrics[3] = ("Artisans Available", "🟢", "artisan_availability", f"{available_artisans} / {total_artisans}")
-        self.findChild(QLabel, "artisan_availability_value").setText(f"{available_artisans} / {total_artisans}")
+        self.today = datetime.now().toordinal()
+        self.data = self.collect_dashboard_data(self.db, self.today)
+        self.all_deadline_projects = self.data["deadline_projects"]
+        self.update_metrics()
+        self.update_status_chart()
+        self.show_deadlines(self.all_deadline_projects.values(), self.today)
+        self.update_workload()
+        self.update_activity()
+
+    def on_schedule_changed(self, changes):
+        """Update just the sections (and rows) the committed changes affect."""
+        data = self.data
+        project_ids = set()
+        artisan_ids = set()
+        for change in changes:
+            if change.kind == "project":
+                project_ids.add(change.id)
+            elif change.kind == "assignment":
+                for row in (change.old, change.new):
+                    if row:
+                        project_ids.add(row[2])
+                        artisan_ids.add(row[1])
+            elif change.kind == "artisan":
+                artisan_ids.add(change.id)
+                # Artisan names appear in the deadline list
+                project_ids.update(a[2] for a in self.db.get_assignments_for_artisan(change.id))
+        if project_ids:
+            entries = {row[0]: row[1:] for row in self.db.get_deadline_projects(project_ids=project_ids)}
+            for project_id in project_ids:
+                if project_id in entries:
+                    data["deadline_projects"][project_id] = entries[project_id]
+                else:
+                    data["deadline_projects"].pop(project_id, None)
+            data["deadline_projects"] = dict(sorted(data["deadline_projects"].items()))
+            self.all_deadline_projects = data["deadline_projects"]
+            data["upcoming_deadlines"] = self.count_upcoming(data["deadline_projects"], self.today)
+            self.show_deadlines(self.all_deadline_projects.values(), self.today)
+        if any(change.kind == "project" for change in changes):
+            data["status_counts"] = self.count_statuses(self.db.get_project_status_counts())
+            data["active_projects"] = data["status_counts"]["Active"]
+            self.update_status_chart()
+        if artisan_ids:
+            entries = {row[0]: row[1:] for row in self.db.get_artisan_workload(self.today, self.today + 30, artisan_ids)}
+            for artisan_id in artisan_ids:
+                if artisan_id in entries:
+                    data["workload"][artisan_id] = entries[artisan_id]
+                else:
+                    data["workload"].pop(artisan_id, None)
+            data["workload"] = dict(sorted(data["workload"].items()))
+            data["total_artisans"] = len(data["workload"])
+            data["available_artisans"] = self.db.count_available_artisans(self.today)
+            self.update_workload()
+        self.update_metrics()
+        # Every write is logged, so the timeline always changes
+        data["activities"] = self.db.get_activities(limit=ACTIVITY_PAGE_SIZE)
+        self.update_activity()
+
+    def update_metrics(self):
+        data = self.data
+        total_artisans = data["total_artisans"]
+        values = {
+            "active_projects": data["active_projects"],
+            "total_artisans": total_artisans,
+            "upcoming_deadlines": data["upcoming_deadlines"],
+            "artisan_availability": f"{data['available_artisans']} / {total_artisans}",
+        }
+        for idx, (title, icon, key, value) in enumerate(self.metrics):
+            self.metrics[idx] = (title, icon, key, values[key])
+            self.findChild(QLabel, f"{key}_value").setText(str(values[key]))
 
+    def update_status_chart(self):
         # Project Status Breakdown (Donut Chart)
-        status_counts = {"Active": 0, "Completed": 0, "On Hold": 0, "Delayed": 0}
-        all_projects = self.db.get_projects()
-        for project in all_projects:
-            status = project[4]
-            if status in status_counts:
-                status_counts[status] += 1
-            else:
-                status_counts[status] = 1
-
+        status_counts = self.data["status_counts"]
         self.status_chart.figure.clear()
         ax = self.status_chart.figure.add_subplot(111)
         labels = [k for k, v in status_counts.items() if v > 0]
@@ -342,47 +364,28 @@ class DashboardTab(QWidget):
             autotext.set_fontsize(8)
         self.status_chart.draw()
 
-        # Populate deadlines table
-        self.deadlines_table.setRowCount(len(self.all_deadline_projects))
-        for row, (project_name, end_date, artisans) in enumerate(self.all_deadline_projects):
+    def show_deadlines(self, projects, today):
+        projects = list(projects)
+        self.deadlines_table.setSortingEnabled(False)  # Rows would re-sort while being filled
+        self.deadlines_table.setRowCount(len(projects))
+        for row, (project_name, end_date, artisan_names, end_day) in enumerate(projects):
             self.deadlines_table.setItem(row, 0, QTableWidgetItem(project_name))
             self.deadlines_table.setItem(row, 1, QTableWidgetItem(end_date))
-            self.deadlines_table.setItem(row, 2, QTableWidgetItem(artisans))
+            self.deadlines_table.setItem(row, 2, QTableWidgetItem(artisan_names))
             # Color code based on urgency
-            end_date_dt = datetime.strptime(end_date, "%Y-%m-%d")
-            days_until_due = (end_date_dt - today).days
+            days_until_due = end_day - today
             color = "#e53e3e" if days_until_due <= 2 else "#d69e2e" if days_until_due <= 5 else "#38a169"
             for col in range(3):
                 item = self.deadlines_table.item(row, col)
                 if item:
                     item.setBackground(QColor(color))
+        self.deadlines_table.setSortingEnabled(True)
         self.deadlines_table.resizeColumnsToContents()
 
+    def update_workload(self):
         # Artisan Workload Overview
-        thirty_days_later = today + timedelta(days=30)
-        workload_data = []
-        for artisan in artisans:
-            if not artisan:  # Skip if artisan is None or empty
-                continue
-            try:
-                artisan_id = artisan[0]  # id
-                artisan_name = artisan[1]  # name
-            except (IndexError, TypeError) as e:
-                print(f"Error processing artisan: {artisan}, {e}")
-                continue
-            artisan_assignments = [a for a in assignments if a[1] == artisan_id]
-            projects_assigned = len(artisan_assignments)
-            total_days = 0
-            for assignment in artisan_assignments:
-                start_date = datetime.strptime(assignment[3], "%Y-%m-%d")
-                end_date = datetime.strptime(assignment[4], "%Y-%m-%d")
-                start = max(start_date, today)
-                end = min(end_date, thirty_days_later)
-                if start <= end:
-                    days = (end - start).days + 1
-                    total_days += days
-            workload_data.append((artisan_name, projects_assigned, total_days))
-
+        workload_data = list(self.data["workload"].values())
+        self.workload_table.setSortingEnabled(False)
         self.workload_table.setRowCount(len(workload_data))
         for row, (artisan_name, projects_assigned, total_days) in enumerate(workload_data):
             self.workload_table.setItem(row, 0, QTableWidgetItem(artisan_name))
@@ -394,18 +397,73 @@ class DashboardTab(QWidget):
                 item = self.workload_table.item(row, col)
                 if item:
                     item.setBackground(QColor(color))
+        self.workload_table.setSortingEnabled(True)
         self.workload_table.resizeColumnsToContents()
 
+    def update_activity(self):
         # Recent Activity Log (Timeline)
-        activities = self.db.get_recent_activities(limit=10)
         for i in reversed(range(self.activity_layout.count())):
             widget = self.activity_layout.itemAt(i).widget()
             if widget:
                 widget.deleteLater()
-        for action, details, timestamp in activities:
+        self.add_activity_entries(self.data["activities"])
+
+    def add_activity_entries(self, activities):
+        for _, action, details, timestamp in activities:
             entry = TimelineEntry(action, details, timestamp)
             self.activity_layout.addWidget(entry)
+        # A short page means the start of the history has been reached
+        self.older_activity_button.setVisible(len(activities) == ACTIVITY_PAGE_SIZE)
+
+    def load_older_activities(self):
+        activities = self.data["activities"]
+        if not activities:
+            return
+        last = activities[-1]
+        page = self.db.get_activities(before=(last[3], last[0]), limit=ACTIVITY_PAGE_SIZE)
+        activities.extend(page)
+        self.add_activity_entries(page)
+
+    @staticmethod
+    def collect_dashboard_data(db, today):
+        """Data phase of load_data: gather everything the dashboard shows for day number today, without widgets.
+
+        Runs a fixed handful of aggregate queries whatever the data size.
+        deadline_projects and workload map project and artisan ids to their
+        table rows, so single rows can be replaced when something changes.
+        """
+        status_counts = DashboardTab.count_statuses(db.get_project_status_counts())
+        deadline_projects = {row[0]: row[1:] for row in db.get_deadline_projects("Active")}
+        # Artisan Workload Overview (Next 30 Days)
+        workload = {row[0]: row[1:] for row in db.get_artisan_workload(today, today + 30)}
+        return {
+            "active_projects": status_counts["Active"],
+            "total_artisans": len(workload),
+            "upcoming_deadlines": DashboardTab.count_upcoming(deadline_projects, today),
+            "deadline_projects": deadline_projects,
+            # Artisans with nothing booked today
+            "available_artisans": db.count_available_artisans(today),
+            "status_counts": status_counts,
+            "workload": workload,
+            "activities": db.get_activities(limit=ACTIVITY_PAGE_SIZE),
+        }
+
+    @staticmethod
+    def count_upcoming(deadline_projects, today):
+        # Deadlines within 7 days
+        return sum(1 for entry in deadline_projects.values() if today <= entry[3] <= today + 7)
+
+    @staticmethod
+    def count_statuses(counts):
+        # The four standard statuses always come first, in the chart's color order
+        status_counts = {"Active": 0, "Completed": 0, "On Hold": 0, "Delayed": 0}
+        status_counts.update(counts)
+        return status_counts
 
     def refresh(self):
         """Refresh the dashboard data."""
-        self.load_data()
\ No newline at end of file
+        self.load_data()
+
+    def detach(self):
+        """Stop listening for schedule changes; call before the tab is discarded."""
+        self.db.unsubscribe(self.on_schedule_changed)
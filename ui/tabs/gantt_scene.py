@@ -0,0 +1,291 @@
+# ui/tabs/gantt_scene.py
+from datetime import datetime
+from PyQt6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsRectItem, QMenu, QToolTip
+from PyQt6.QtCore import Qt, QRectF, QPointF
+from PyQt6.QtGui import QColor, QPainter, QPen, QFont, QCursor
+from db.conflicts import ConflictError
+from ui.tabs.calendar import (ALTERNATING_DAY_COLOR, ALTERNATING_ROW_COLOR, GRID_CELL_COLOR, HOLIDAY_COLOR,
+                              WEEKDAY_LABELS, WEEKEND_COLOR, dragged_span)
+
+# Scene geometry: day d of the window spans x = d * DAY_WIDTH onwards and
+# row r spans y = r * ROW_HEIGHT onwards. The header and the row labels are
+# painted over the view's top and left edges, so the scene leaves room for
+# them above and to the left of day 0 / row 0.
+DAY_WIDTH = 36.0
+BLOCK_HEIGHT = 22.0
+ROW_GAP = 3.0
+ROW_HEIGHT = BLOCK_HEIGHT + ROW_GAP
+HEADER_HEIGHT = 34.0
+LABEL_WIDTH = 240.0
+EDGE_GRAB = 6.0       # Pixels from either end of a bar that resize it rather than move it
+MIN_SCALE, MAX_SCALE = 0.05, 4.0
+
+class BarItem(QGraphicsRectItem):
+    """One assignment bar. Drag the middle to move it, either end to resize it."""
+
+    def __init__(self, view):
+        super().__init__()
+        self.view = view
+        self.assignment = None
+        self.row_index = None
+        self.color = QColor()
+        self.conflict = None
+        self.drag = None  # (mode, press scene x, rect at press) while dragging
+        self.setAcceptHoverEvents(True)
+        self.setPen(QPen(Qt.PenStyle.NoPen))
+        self.setZValue(1)
+        # Scrolling only moves the cached pixmap; zooming repaints it
+        self.setCacheMode(QGraphicsRectItem.CacheMode.DeviceCoordinateCache)
+
+    def set_assignment(self, assignment, row_index, color):
+        """Point this (possibly reused) item at an assignment and lay it out."""
+        self.assignment = assignment
+        self.row_index = row_index
+        self.color = QColor(color)
+        self.conflict = None
+        start, end = self.view.visible_span(assignment["start_day"], assignment["end_day"])
+        self.setRect(QRectF((start - self.view.window_start) * DAY_WIDTH, row_index * ROW_HEIGHT,
+                            (end - start + 1) * DAY_WIDTH, BLOCK_HEIGHT))
+        self.update()
+
+    def drag_span(self):
+        """Return the span the assignment would cover if the drag in progress ended now."""
+        mode, _, pressed = self.drag
+        edge = self.rect().right() - pressed.right() if mode == "right" else self.rect().left() - pressed.left()
+        return dragged_span(self.assignment, mode, round(edge / DAY_WIDTH))
+
+    def paint(self, painter, option, widget=None):
+        rect = self.rect()
+        fill = QColor(self.color)
+        fill.setAlphaF(0.55)
+        painter.fillRect(rect, fill)
+        if self.conflict:
+            painter.setPen(QPen(QColor("red"), 0))
+            painter.drawRect(rect)
+        # Level of detail: names only once they would be legible
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        if lod * rect.width() < 40 or lod * rect.height() < 10:
+            return
+        painter.setPen(QColor("#1a202c"))
+        painter.setFont(self.view.bar_font)
+        painter.drawText(rect.adjusted(4, 0, -2, 0), Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft,
+                         self.assignment["artisan_name"] or "")
+
+    def edge_at(self, x):
+        # Grab zones are in pixels, so they stay usable at any zoom
+        grab = EDGE_GRAB / max(self.view.transform().m11(), 1e-6)
+        rect = self.rect()
+        if x - rect.left() < grab:
+            return "left"
+        if rect.right() - x < grab:
+            return "right"
+        return "move"
+
+    def hoverMoveEvent(self, event):
+        mode = self.edge_at(event.pos().x())
+        self.setCursor(Qt.CursorShape.OpenHandCursor if mode == "move" else Qt.CursorShape.SizeHorCursor)
+
+    def mousePressEvent(self, event):
+        if event.button() != Qt.MouseButton.LeftButton:
+            event.ignore()
+            return
+        self.drag = (self.edge_at(event.pos().x()), event.scenePos().x(), QRectF(self.rect()))
+        self.setZValue(2)
+        event.accept()
+
+    def mouseMoveEvent(self, event):
+        if not self.drag:
+            return
+        mode, press_x, rect = self.drag
+        delta = event.scenePos().x() - press_x
+        rect = QRectF(rect)
+        if mode == "move":
+            rect.translate(delta, 0)
+        elif mode == "left":
+            rect.setLeft(min(rect.left() + delta, rect.right() - DAY_WIDTH))
+        else:
+            rect.setRight(max(rect.right() + delta, rect.left() + DAY_WIDTH))
+        self.setRect(rect)
+        self.view.show_drag_state(self)
+
+    def mouseReleaseEvent(self, event):
+        if not self.drag:
+            return
+        rect = self.drag[2]
+        start_day, end_day = self.drag_span()
+        self.drag = None
+        self.setZValue(1)
+        QToolTip.hideText()
+        if (start_day, end_day) == (self.assignment["start_day"], self.assignment["end_day"]):
+            self.setRect(rect)  # A click, or a drag back to where it began
+            return
+        self.view.tab.move_assignment(self.assignment, start_day, end_day)
+
+    def mouseDoubleClickEvent(self, event):
+        self.view.tab.on_double_click(self.row_index, self.assignment)
+
+class GanttView(QGraphicsView):
+    """QGraphicsScene Gantt chart, the CalendarTab renderer when config.GANTT_ENGINE is "scene".
+
+    Only the bars are scene items, so the scene's index does hit testing
+    and only bars in view are painted. Items are reused across set_rows()
+    calls, keyed by assignment id. The grid, the day header and the row
+    labels are painted for the exposed area alone, so a frame costs the
+    same with 50 rows as with 5,000. Ctrl+wheel zooms around the cursor,
+    and dragging the background pans.
+    """
+
+    def __init__(self, tab):
+        super().__init__(tab)
+        self.tab = tab
+        self.rows = []
+        self.window_start = 0
+        self.date_range = 0
+        self.holidays = set()
+        self.items = {}  # assignment id -> BarItem
+        self.bar_font = QFont("Roboto", 8)
+        self.header_font = QFont("Roboto", 8)
+        self.label_font = QFont("Roboto", 8, QFont.Weight.Bold)
+        self.setScene(QGraphicsScene(self))
+        self.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+        self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop)
+        # The header and labels stay put while the scene scrolls under them
+        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.FullViewportUpdate)
+        self.setOptimizationFlag(QGraphicsView.OptimizationFlag.DontAdjustForAntialiasing, True)
+
+    def set_rows(self, rows, window_start, date_range, holidays, project_color):
+        """Show load_gantt_view rows for the window, reusing the items of assignments still shown."""
+        self.rows = rows
+        self.window_start = window_start
+        self.date_range = date_range
+        self.holidays = set(holidays)
+        scene = self.scene()
+        seen = set()
+        for row_index, row in enumerate(rows):
+            color = project_color(row["id"])
+            for assignment in row["assignments"]:
+                start, end = self.visible_span(assignment["start_day"], assignment["end_day"])
+                if start > end:
+                    continue
+                item = self.items.get(assignment["id"])
+                if item is None:
+                    item = self.items[assignment["id"]] = BarItem(self)
+                    scene.addItem(item)
+                item.set_assignment(assignment, row_index, color)
+                seen.add(assignment["id"])
+        for assignment_id in set(self.items) - seen:
+            scene.removeItem(self.items.pop(assignment_id))
+        scene.setSceneRect(-LABEL_WIDTH, -HEADER_HEIGHT, LABEL_WIDTH + date_range * DAY_WIDTH,
+                           HEADER_HEIGHT + max(len(rows), 1) * ROW_HEIGHT)
+        self.viewport().update()
+
+    def visible_span(self, start_day, end_day):
+        """Clip a span of day numbers to the window."""
+        return max(start_day, self.window_start), min(end_day, self.window_start + self.date_range - 1)
+
+    def show_drag_state(self, item):
+        """Outline a dragged bar whose new span breaks the hours cap, and show its dates (and the reason) as a tooltip."""
+        start_day, end_day = item.drag_span()
+        assignment = item.assignment
+        item.conflict = self.tab.db.check_conflict(assignment["artisan_id"], start_day, end_day,
+                                                   assignment_id=assignment["id"])
+        days = end_day - start_day + 1
+        text = (f"{datetime.fromordinal(start_day):%a %d %b} – {datetime.fromordinal(end_day):%a %d %b}"
+                f" ({days} day{'s' if days != 1 else ''})")
+        if item.conflict:
+            text += f"\n{ConflictError(item.conflict, assignment['artisan_name'])}"
+        QToolTip.showText(QCursor.pos(), text, self)
+
+    def wheelEvent(self, event):
+        if not event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            super().wheelEvent(event)
+            return
+        factor = 1.15 ** (event.angleDelta().y() / 120)
+        scale = self.transform().m11()
+        factor = min(max(factor, MIN_SCALE / scale), MAX_SCALE / scale)
+        self.scale(factor, factor)
+
+    def contextMenuEvent(self, event):
+        menu = QMenu(self)
+        new_project_action = menu.addAction("Start New Project")
+        x = self.mapToScene(event.pos()).x()
+        day = self.window_start + min(max(int(x // DAY_WIDTH), 0), self.date_range - 1)
+        if menu.exec(event.globalPos()) == new_project_action:
+            self.tab.start_new_project(datetime.fromordinal(day))
+        event.accept()
+
+    def drawBackground(self, painter, rect):
+        painter.fillRect(rect, QColor(GRID_CELL_COLOR))
+        first_day, last_day = self.day_range_in(rect)
+        first_row = max(int(rect.top() // ROW_HEIGHT), 0)
+        last_row = int(rect.bottom() // ROW_HEIGHT)
+        if first_day > last_day or last_row < first_row:
+            return
+        top, bottom = first_row * ROW_HEIGHT, (last_row + 1) * ROW_HEIGHT
+        for row in range(first_row - first_row % 2, last_row + 1, 2):
+            painter.fillRect(QRectF(0, row * ROW_HEIGHT, self.date_range * DAY_WIDTH, BLOCK_HEIGHT),
+                             QColor(ALTERNATING_ROW_COLOR))
+        # Day shading as full-height columns; the row gaps are cut back out below
+        for day in range(first_day, last_day + 1):
+            index = day - self.window_start
+            x = index * DAY_WIDTH
+            column = QRectF(x, top, DAY_WIDTH * 0.8, bottom - top)
+            if index % 2 == 0:
+                painter.fillRect(column, self.translucent(ALTERNATING_DAY_COLOR, 0.3))
+            if (day - 1) % 7 >= 5:
+                painter.fillRect(column, self.translucent(WEEKEND_COLOR, 0.5))
+            if day in self.holidays:
+                painter.fillRect(column, self.translucent(HOLIDAY_COLOR, 0.5))
+        gap = QColor(GRID_CELL_COLOR)
+        for row in range(first_row, last_row + 1):
+            painter.fillRect(QRectF(0, row * ROW_HEIGHT + BLOCK_HEIGHT, self.date_range * DAY_WIDTH, ROW_GAP), gap)
+
+    def drawForeground(self, painter, rect):
+        # Drawn in viewport pixels so the header and labels keep their size at any zoom
+        painter.save()
+        painter.resetTransform()
+        viewport = self.viewport().rect()
+        first_day, last_day = self.day_range_in(self.mapToScene(viewport).boundingRect())
+        painter.fillRect(QRectF(0, 0, viewport.width(), HEADER_HEIGHT), QColor("#FFFFFF"))
+        painter.setFont(self.header_font)
+        painter.setPen(QColor("#2d3748"))
+        for day in range(first_day, last_day + 1):
+            left = self.mapFromScene(QPointF((day - self.window_start) * DAY_WIDTH, 0)).x()
+            right = self.mapFromScene(QPointF((day - self.window_start + 1) * DAY_WIDTH, 0)).x()
+            if right - left < 14:
+                continue  # Too narrow to label at this zoom
+            date = datetime.fromordinal(day)
+            cell = QRectF(left, 0, right - left, HEADER_HEIGHT)
+            painter.drawText(cell.adjusted(0, 2, 0, -HEADER_HEIGHT / 2), Qt.AlignmentFlag.AlignCenter, f"{date.day:02d}")
+            painter.drawText(cell.adjusted(0, HEADER_HEIGHT / 2, 0, -2), Qt.AlignmentFlag.AlignCenter,
+                             WEEKDAY_LABELS[date.weekday()])
+        painter.fillRect(QRectF(0, 0, LABEL_WIDTH, viewport.height()), QColor("#FFFFFF"))
+        scene_rect = self.mapToScene(viewport).boundingRect()
+        first_row = max(int(scene_rect.top() // ROW_HEIGHT), 0)
+        last_row = min(int(scene_rect.bottom() // ROW_HEIGHT), len(self.rows) - 1)
+        painter.setFont(self.label_font)
+        for row_index in range(first_row, last_row + 1):
+            top = self.mapFromScene(QPointF(0, row_index * ROW_HEIGHT)).y()
+            bottom = self.mapFromScene(QPointF(0, row_index * ROW_HEIGHT + BLOCK_HEIGHT)).y()
+            if bottom < HEADER_HEIGHT or bottom - top < 8:
+                continue
+            row = self.rows[row_index]
+            artisans = ", ".join(a["artisan_name"] for a in row["assignments"])
+            text = f"{row['name']}\n{row['team_name']}: {artisans}" if bottom - top >= 20 else row["name"]
+            painter.drawText(QRectF(6, top, LABEL_WIDTH - 12, bottom - top),
+                             Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignRight, text)
+        painter.restore()
+
+    def day_range_in(self, rect):
+        """Return the first and last day number of the window inside a scene rect."""
+        first = max(int(rect.left() // DAY_WIDTH), 0)
+        last = min(int(rect.right() // DAY_WIDTH), self.date_range - 1)
+        return self.window_start + first, self.window_start + last
+
+    @staticmethod
+    def translucent(color, alpha):
+        color = QColor(color)
+        color.setAlphaF(alpha)
+        return color